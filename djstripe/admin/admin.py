@@ -36,6 +36,35 @@ class IdempotencyKeyAdmin(ReadOnlyMixin, admin.ModelAdmin):
     search_fields = ("uuid", "action")
 
 
+@admin.register(models.HydrationTask)
+class HydrationTaskAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = (
+        "created",
+        "model",
+        "object_id",
+        "field_name",
+        "target_id",
+        "attempt_count",
+    )
+    list_filter = ("model", "field_name")
+    search_fields = ("object_id", "target_id")
+
+
+@admin.register(models.CustomerBillingState)
+class CustomerBillingStateAdmin(ReadOnlyMixin, admin.ModelAdmin):
+    list_display = (
+        "customer",
+        "subscriber",
+        "status",
+        "current_period_end",
+        "delinquent",
+        "livemode",
+        "updated",
+    )
+    list_filter = ("status", "delinquent", "livemode")
+    search_fields = ("customer__id", "subscription_id")
+
+
 @admin.register(models.WebhookEventTrigger)
 class WebhookEventTriggerAdmin(ReadOnlyMixin, admin.ModelAdmin):
     list_display = (
@@ -47,9 +76,10 @@ class WebhookEventTriggerAdmin(ReadOnlyMixin, admin.ModelAdmin):
         "processed",
         "valid",
         "exception",
+        "attempt_count",
         "djstripe_version",
     )
-    list_filter = ("created", "valid", "processed")
+    list_filter = ("created", "valid", "processed", "dead_lettered_at")
     list_select_related = ("event",)
     raw_id_fields = get_forward_relation_fields_for_model(models.WebhookEventTrigger)
 
@@ -12,6 +12,7 @@ from django.urls import reverse
 from stripe import AuthenticationError, InvalidRequestError, PermissionError
 
 from djstripe import enums, models, utils
+from djstripe.dispatch import get_enabled_events
 from djstripe.settings import djstripe_settings
 from djstripe.signals import ENABLED_EVENTS
 
@@ -162,7 +163,7 @@ class WebhookEndpointAdminCreateForm(WebhookEndpointAdminBaseForm):
             " events are enabled, except those that require explicit selection."
         ),
         choices=zip(ENABLED_EVENTS, ENABLED_EVENTS, strict=True),
-        initial=["*"],
+        initial=get_enabled_events,
     )
     livemode = forms.BooleanField(
         label="Live mode",
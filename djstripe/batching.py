@@ -0,0 +1,85 @@
+"""
+Group-commit buffering for high-volume writes.
+
+Under burst load, committing every webhook row on its own makes the database's
+fsync latency the bottleneck. :class:`GroupCommitBuffer` lets concurrent
+callers (eg. request threads of a threaded WSGI/ASGI server) share a single
+write: the first caller to arrive becomes the batch *leader*, waits a few
+milliseconds for followers to join, then flushes the whole batch at once. Every
+caller blocks until the batch containing its item has been flushed, so nothing
+is acknowledged before it is durable.
+
+With a single-threaded server every batch simply contains one item.
+"""
+
+import threading
+
+
+class _Batch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+        self.item_errors: dict[int, BaseException] = {}
+
+
+class GroupCommitBuffer:
+    """
+    Collects items from concurrent callers and hands them to ``flush`` in
+    batches.
+
+    :param flush: Callable receiving the list of items of a batch. It runs in
+        the leader's thread (and so on the leader's database connection). It
+        may return a dict mapping the index of items which failed on their own
+        to their exception, which is then only raised in their caller.
+    :param window: Maximum number of seconds the leader waits for followers.
+    :param max_size: A batch is flushed as soon as it holds this many items.
+    """
+
+    def __init__(self, flush, window: float = 0.005, max_size: int = 100):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._current: _Batch | None = None
+
+    def submit(self, item):
+        """
+        Add ``item`` to the current batch and block until it has been flushed.
+
+        If the flush fails, the exception is re-raised in every caller whose
+        item was part of the batch. If only ``item`` failed, its exception is
+        only raised here.
+        """
+        with self._lock:
+            batch = self._current
+            is_leader = batch is None
+            if is_leader:
+                batch = self._current = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_size:
+                # Close the batch: later callers start a new one.
+                self._current = None
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._current is batch:
+                    self._current = None
+            try:
+                batch.item_errors = self.flush(batch.items) or {}
+            except BaseException as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        if index in batch.item_errors:
+            raise batch.item_errors[index]
+        return item
@@ -0,0 +1,189 @@
+"""
+An in-process cache of the products and prices synced from Stripe.
+
+Each process keeps the whole catalog in memory, along with the version it was
+loaded at. The current version is kept in DJSTRIPE_CACHE and bumped whenever a
+price or product is synced or deleted, so reading the catalog costs a single
+cache lookup, and no database queries until the next change::
+
+    from djstripe.catalog import get_catalog
+
+    catalog = get_catalog()
+    price = catalog.get_price_by_lookup_key("pro_monthly")
+    for price in catalog.prices_for_product(price.product.id):
+        ...
+
+The products and prices of the catalog are shared between threads and must
+not be modified. Their ``product`` foreign keys point to the catalog's
+products, and ``stripe_data`` (eg. ``currency_options`` and ``tiers``) is
+loaded, so they can be used without further queries.
+"""
+
+import threading
+import uuid
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .settings import djstripe_settings
+
+CATALOG_VERSION_CACHE_KEY = "djstripe:catalog-version"
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """A snapshot of the products and prices in the database."""
+
+    version: str | None
+    products: dict = field(default_factory=dict)
+    prices: dict = field(default_factory=dict)
+    # By (owner account id, livemode, lookup key), as lookup keys are unique
+    # per owner account.
+    _prices_by_lookup_key: dict = field(default_factory=dict, repr=False)
+    _prices_by_product: dict = field(default_factory=dict, repr=False)
+    # The id of the platform account of each API key
+    _platform_accounts: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def load(cls, version: str | None) -> "Catalog":
+        from .models import Account, APIKey, Price, Product
+
+        # Foreign keys to accounts point to DJSTRIPE_FOREIGN_KEY_TO_FIELD too
+        account_to_field = Price._meta.get_field(
+            "djstripe_owner_account"
+        ).target_field.attname
+        account_ids = dict(Account.objects.values_list(account_to_field, "id"))
+        platform_accounts = {
+            secret: account_ids.get(owner)
+            for secret, owner in APIKey.objects.filter(
+                djstripe_owner_account__isnull=False
+            ).values_list("secret", "djstripe_owner_account")
+        }
+
+        products = {
+            product.id: product for product in Product.objects.order_by("djstripe_id")
+        }
+        # Price.product points to DJSTRIPE_FOREIGN_KEY_TO_FIELD
+        to_field = Price._meta.get_field("product").target_field.attname
+        products_by_key = {
+            getattr(product, to_field): product for product in products.values()
+        }
+
+        prices = {}
+        prices_by_lookup_key = {}
+        prices_by_product: dict[str, list] = {}
+        for price in Price.objects.order_by("djstripe_id"):
+            product = products_by_key.get(price.product_id)
+            if product is None:
+                continue
+            price.product = product
+            prices[price.id] = price
+            prices_by_product.setdefault(product.id, []).append(price)
+            if price.lookup_key:
+                owner_id = account_ids.get(price.djstripe_owner_account_id)
+                prices_by_lookup_key[(owner_id, price.livemode, price.lookup_key)] = (
+                    price
+                )
+
+        return cls(
+            version=version,
+            products=products,
+            prices=prices,
+            _prices_by_lookup_key=prices_by_lookup_key,
+            _prices_by_product=prices_by_product,
+            _platform_accounts=platform_accounts,
+        )
+
+    def get_product(self, id: str):
+        """Return the product with the given id, or None."""
+        return self.products.get(id)
+
+    def get_price(self, id: str):
+        """Return the price with the given id, or None."""
+        return self.prices.get(id)
+
+    def get_price_by_lookup_key(
+        self, lookup_key: str, livemode=None, stripe_account: str | None = None
+    ):
+        """
+        Return the price with the given lookup key, or None.
+
+        :param livemode: The mode of the price, STRIPE_LIVE_MODE by default.
+        :param stripe_account: The id of the connected account the price
+            belongs to. By default, the platform account of the default API key
+            of ``livemode``.
+        """
+        if livemode is None:
+            livemode = djstripe_settings.STRIPE_LIVE_MODE
+        if stripe_account is None:
+            stripe_account = self._platform_accounts.get(
+                djstripe_settings.get_default_api_key(livemode)
+            )
+        return self._prices_by_lookup_key.get((stripe_account, livemode, lookup_key))
+
+    def prices_for_product(self, product_id: str, active=None) -> list:
+        """
+        Return the prices of the product with the given id, optionally only
+        the active (or inactive) ones.
+        """
+        prices = self._prices_by_product.get(product_id, [])
+        if active is None:
+            return list(prices)
+        return [price for price in prices if price.active == active]
+
+    def default_price(self, product_id: str):
+        """Return the default price of the product with the given id, or None."""
+        product = self.products.get(product_id)
+        if product is None:
+            return None
+        default_price_id = product.stripe_data.get("default_price")
+        if isinstance(default_price_id, dict):
+            default_price_id = default_price_id["id"]
+        return self.prices.get(default_price_id)
+
+
+def get_catalog_version() -> str | None:
+    """
+    Return the current version of the catalog, setting one if there's none.
+    None if DJSTRIPE_CACHE doesn't store anything (eg. a DummyCache).
+    """
+    cache = djstripe_settings.get_cache()
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        # The version was evicted (or never set): every process reloads.
+        cache.add(CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    """
+    Make every process reload the catalog on its next read, once the current
+    transaction (if any) is committed.
+    """
+    transaction.on_commit(
+        lambda: djstripe_settings.get_cache().set(
+            CATALOG_VERSION_CACHE_KEY, uuid.uuid4().hex, None
+        )
+    )
+
+
+def get_catalog() -> Catalog:
+    """Return the catalog, reloading it if a price or product changed."""
+    global _catalog
+
+    version = get_catalog_version()
+    if version is None:
+        # Changes can't be detected without a cache
+        return Catalog.load(version)
+
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                catalog = _catalog = Catalog.load(version)
+    return catalog
@@ -235,3 +235,88 @@ def check_djstripe_settings_foreign_key_to_field(app_configs=None, **kwargs):
         )
 
     return messages
+
+
+@checks.register("djstripe")
+def check_webhook_processing_mode(app_configs=None, **kwargs):
+    """
+    Check that DJSTRIPE_WEBHOOK_PROCESSING_MODE is set to a valid value.
+    """
+    from .settings import djstripe_settings
+
+    messages = []
+
+    mode = djstripe_settings.WEBHOOK_PROCESSING_MODE
+    if mode not in ("sync", "deferred"):
+        messages.append(
+            checks.Error(
+                f"{mode!r} is not a valid value for DJSTRIPE_WEBHOOK_PROCESSING_MODE.",
+                hint='Set it to "sync" (the default) or "deferred".',
+                id="djstripe.E004",
+            )
+        )
+
+    return messages
+
+
+@checks.register("djstripe")
+def check_webhook_enabled_events(app_configs=None, **kwargs):
+    """
+    Check DJSTRIPE_WEBHOOK_ENABLED_EVENTS and DJSTRIPE_WEBHOOK_EXTRA_EVENTS,
+    and that webhook endpoints are subscribed to the events dj-stripe expects.
+    """
+    from .dispatch import get_enabled_events
+    from .models import WebhookEndpoint
+    from .settings import djstripe_settings
+    from .signals import ENABLED_EVENTS
+
+    messages = []
+
+    mode = djstripe_settings.WEBHOOK_ENABLED_EVENTS
+    if mode not in ("all", "handled"):
+        messages.append(
+            checks.Error(
+                f"{mode!r} is not a valid value for DJSTRIPE_WEBHOOK_ENABLED_EVENTS.",
+                hint='Set it to "all" (the default) or "handled".',
+                id="djstripe.E005",
+            )
+        )
+        return messages
+
+    unknown = sorted(set(djstripe_settings.WEBHOOK_EXTRA_EVENTS) - set(ENABLED_EVENTS))
+    if unknown:
+        messages.append(
+            checks.Error(
+                "DJSTRIPE_WEBHOOK_EXTRA_EVENTS contains unknown event types.",
+                hint=f"Unknown event types: {', '.join(unknown)}",
+                id="djstripe.E006",
+            )
+        )
+        return messages
+
+    if mode != "handled":
+        return messages
+
+    try:
+        endpoints = list(
+            WebhookEndpoint.objects.exclude(id__startswith="djstripe_whfwd_")
+        )
+    except DatabaseError:
+        # Skip the check - Database most likely not migrated yet
+        return messages
+
+    enabled_events = get_enabled_events()
+    for endpoint in endpoints:
+        if sorted(endpoint.enabled_events or []) != enabled_events:
+            messages.append(
+                checks.Warning(
+                    (
+                        f"The enabled events of Webhook Endpoint: {endpoint} "
+                        "differ from the event types dj-stripe handles."
+                    ),
+                    hint="Run `manage.py djstripe_update_webhook_events`.",
+                    id="djstripe.W006",
+                )
+            )
+
+    return messages
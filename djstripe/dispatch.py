@@ -0,0 +1,133 @@
+"""
+Routing of Stripe events to their webhook handlers.
+
+The registry is compiled once, when dj-stripe's event handlers are imported,
+and maps every event type in ``signals.ENABLED_EVENTS`` to an
+:class:`EventRoute`: the signal sent for it, the handlers registered through
+``djstripe_receiver``, the model they sync and the event's CRUD type. It can
+be inspected, eg. to find out which event types are handled at all::
+
+    from djstripe.dispatch import event_registry
+
+    handled = [route.type for route in event_registry if route.has_receivers]
+"""
+
+import builtins
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import cache
+
+from django.dispatch import Signal
+
+from .settings import djstripe_settings
+from .signals import WEBHOOK_SIGNALS
+
+
+class CrudType(Enum):
+    """Helper object to determine CRUD-like event state."""
+
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    @classmethod
+    def determine(cls, event, verb=None):
+        """
+        Determine if the event verb is a crud_type (without the 'R') event.
+
+        :param event:
+        :type event: models.Event
+        :param verb: The event verb to examine.
+        :type verb: str
+        :returns: The CrudType state object.
+        :rtype: CrudType
+        """
+        return _crud_type_for_verb(verb or event.verb)
+
+
+@cache
+def _crud_type_for_verb(verb: str) -> CrudType | None:
+    for crud_type in CrudType:
+        if verb.endswith(crud_type.value):
+            return crud_type
+    return None
+
+
+@dataclass
+class EventRoute:
+    """Where an event type is dispatched to."""
+
+    type: str
+    signal: Signal
+    crud_type: CrudType | None
+    # builtins.type, as the type field shadows it in the class body
+    target_model: builtins.type | None = None
+    handlers: list = field(default_factory=list)
+
+    @property
+    def has_receivers(self) -> bool:
+        """
+        Whether anything is connected to the signal, including receivers
+        connected without ``djstripe_receiver``.
+        """
+        from .models import Event
+
+        return self.signal.has_listeners(sender=Event)
+
+
+class EventRegistry:
+    """A read-mostly mapping of event types to their :class:`EventRoute`."""
+
+    def __init__(self, signals: dict[str, Signal]):
+        self._routes = {
+            event_type: EventRoute(
+                type=event_type,
+                signal=signal,
+                crud_type=_crud_type_for_verb(event_type.rsplit(".", 1)[-1]),
+            )
+            for event_type, signal in signals.items()
+        }
+
+    def __contains__(self, event_type) -> bool:
+        return event_type in self._routes
+
+    def __iter__(self):
+        return iter(self._routes.values())
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def get(self, event_type: str) -> EventRoute | None:
+        """Return the route for ``event_type``, or None if it isn't enabled."""
+        return self._routes.get(event_type)
+
+    def handled_event_types(self) -> list[str]:
+        """The sorted event types that have at least one receiver connected."""
+        return sorted(route.type for route in self if route.has_receivers)
+
+    def register(self, event_type: str, handler, target_model=None) -> EventRoute:
+        """
+        Record ``handler`` (and the model it syncs, if any) on the route of
+        ``event_type``. This does not connect the handler to the signal.
+        """
+        route = self._routes[event_type]
+        if handler not in route.handlers:
+            route.handlers.append(handler)
+        if target_model is not None:
+            route.target_model = target_model
+        return route
+
+
+event_registry = EventRegistry(WEBHOOK_SIGNALS)
+
+
+def get_enabled_events() -> list[str]:
+    """
+    Return the ``enabled_events`` webhook endpoints should be subscribed to,
+    according to DJSTRIPE_WEBHOOK_ENABLED_EVENTS.
+    """
+    if djstripe_settings.WEBHOOK_ENABLED_EVENTS != "handled":
+        return ["*"]
+    return sorted(
+        set(event_registry.handled_event_types())
+        | set(djstripe_settings.WEBHOOK_EXTRA_EVENTS)
+    )
@@ -11,7 +11,6 @@ NOTE:
 """
 
 import logging
-from enum import Enum
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.dispatch import receiver
@@ -22,7 +21,10 @@ from djstripe.settings import djstripe_settings
 
 from . import models
 from ._stripe_errors import object_is_absent
+from .catalog import bump_catalog_version
+from .dispatch import CrudType, event_registry
 from .enums import PayoutType
+from .models.base import _discard_from_sync_scope
 from .signals import WEBHOOK_SIGNALS
 
 logger = logging.getLogger(__name__)
@@ -84,12 +86,11 @@ def djstripe_receiver(signal_names):
             )
         return signal
 
-    signals = []
     if isinstance(signal_names, (list, tuple)):
-        for signal_name in signal_names:
-            signals.append(_check_signal_exists(signal_name))
+        signal_names_list = list(signal_names)
     else:
-        signals.append(_check_signal_exists(signal_names))
+        signal_names_list = [signal_names]
+    signals = [_check_signal_exists(signal_name) for signal_name in signal_names_list]
 
     def inner(handler, **kwargs):
         """
@@ -97,6 +98,8 @@ def djstripe_receiver(signal_names):
         """
         # same as decorating the handler with receiver
         handler = receiver(signals, sender=Event, **kwargs)(handler)
+        for signal_name in signal_names_list:
+            event_registry.register(signal_name, handler)
         return handler
 
     return inner
@@ -377,54 +380,31 @@ def handle_other_event(sender, event, **kwargs):
     - promotion_code: https://docs.stripe.com/api/promotion_codes
     """
 
-    target_cls = {
-        "checkout": models.Session,
-        "coupon": models.Coupon,
-        "file": models.File,
-        "invoice": models.Invoice,
-        "invoiceitem": models.InvoiceItem,
-        "payment_intent": models.PaymentIntent,
-        "payout": models.Payout,
-        "price": models.Price,
-        "product": models.Product,
-        "transfer": models.Transfer,
-        "setup_intent": models.SetupIntent,
-        "subscription_schedule": models.SubscriptionSchedule,
-        "tax_rate": models.TaxRate,
-        "promotion_code": models.PromotionCode,
-    }.get(event.category)
+    target_cls = event_registry.get(event.type).target_model
 
     _handle_crud_like_event(target_cls=target_cls, event=event)
 
+    if target_cls in (models.Price, models.Product):
+        # Syncing bumps it too, but deleting doesn't
+        bump_catalog_version()
+
 
 #
 # Helpers
 #
 
 
-class CrudType(Enum):
-    """Helper object to determine CRUD-like event state."""
-
-    UPDATED = "updated"
-    DELETED = "deleted"
-
-    @classmethod
-    def determine(cls, event, verb=None):
-        """
-        Determine if the event verb is a crud_type (without the 'R') event.
-
-        :param event:
-        :type event: models.Event
-        :param verb: The event verb to examine.
-        :type verb: str
-        :returns: The CrudType state object.
-        :rtype: CrudType
-        """
-        verb = verb or event.verb
-
-        for enum in CrudType:
-            if verb.endswith(enum.value):
-                return enum
+def _has_newer_stored_event(event: "models.Event", id: str) -> bool:
+    """
+    Whether an Event created after ``event`` and about object ``id`` is stored.
+    """
+    if event.created is None:
+        return False
+    return (
+        models.Event.objects.filter(data__object__id=id, created__gt=event.created)
+        .exclude(id=event.id)
+        .exists()
+    )
 
 
 def _handle_crud_like_event(
@@ -435,7 +415,9 @@ def _handle_crud_like_event(
 
     Non-deletes (creates, updates and "anything else" events) are treated as
     update_or_create events - The object will be retrieved locally, then it is
-    synchronised with the Stripe API for parity.
+    synchronised with the Stripe API for parity (or with the event payload, if
+    ``event.use_stored_payload`` is set and no newer event about the object is
+    stored).
 
     Deletes only occur for delete events and cause the object to be deleted
     from the local database, if it existed.  If it doesn't exist then it is
@@ -464,6 +446,7 @@ def _handle_crud_like_event(
     crud_type = crud_type or CrudType.determine(event=event, verb=event.verb)
 
     if crud_type is CrudType.DELETED:
+        _discard_from_sync_scope(target_cls, id)
         qs = target_cls.objects.filter(id=id)
         if target_cls is models.Customer and qs.exists():
             qs.get().purge()
@@ -482,8 +465,9 @@ def _handle_crud_like_event(
         if event.parts[:2] == ["account", "external_account"] and stripe_account:
             kwargs["account"] = models.Account._get_or_retrieve(id=stripe_account)
 
-        # Stripe doesn't allow direct retrieval of Discount Objects
-        if target_cls != models.Discount:
+        # Stripe doesn't allow direct retrieval of Discount Objects. When
+        # replaying stored events, the stored payload is used as is.
+        if target_cls != models.Discount and not event.use_stored_payload:
             try:
                 data = target_cls(**kwargs).api_retrieve(
                     stripe_account=stripe_account, api_key=event.default_api_key
@@ -505,6 +489,15 @@ def _handle_crud_like_event(
                     return None
                 raise
         else:
+            if _has_newer_stored_event(event, id):
+                # A later event carries a more recent state of the object, so
+                # syncing this payload would roll the local copy back.
+                logger.debug(
+                    "Not syncing %r from event %r: a newer event is stored",
+                    id,
+                    event.id,
+                )
+                return target_cls.objects.filter(id=id).first()
             data = data.get("object")
 
         # create or update the object from the retrieved Stripe Data
@@ -518,8 +511,10 @@ def handle_customer_entitlements_event(sender, event, **kwargs):
     """
     Handle entitlements.active_entitlement_summary.updated events.
 
-    This event tracks changes to a customer's active entitlements. We sync the
-    Customer object to update the entitlements data stored in stripe_data.
+    This event tracks changes to a customer's active entitlements. We cache
+    their lookup keys for Customer.has_entitlement(), unless a newer summary
+    is cached, and sync the Customer object to update the entitlements data
+    stored in stripe_data. Replayed events clear the cached keys instead.
     """
     object = event.data["object"]
     customer_id = object.get("customer")
@@ -528,6 +523,16 @@ def handle_customer_entitlements_event(sender, event, **kwargs):
         logger.debug(f"Ignoring malformed event id {event.id!r}")
         return
 
+    entitlements = object.get("entitlements") or {}
+    if entitlements.get("has_more") or event.replayed:
+        # Only part of the entitlements, or possibly outdated ones: list them
+        # all on the next lookup
+        models.ActiveEntitlement.clear_cached_lookup_keys(customer_id)
+    else:
+        models.ActiveEntitlement.cache_lookup_keys(
+            customer_id, entitlements.get("data", []), as_of=event.created
+        )
+
     # Check if customer exists locally - we don't create customers that don't exist
     if not models.Customer.objects.filter(id=customer_id).exists():
         logger.warning(
@@ -542,3 +547,36 @@ def handle_customer_entitlements_event(sender, event, **kwargs):
         id=customer_id,
         crud_type=CrudType.UPDATED,
     )
+
+
+# The model synced by dj-stripe for each object type (the event type without
+# its verb), eg. "customer.subscription" for "customer.subscription.updated".
+EVENT_TARGET_MODELS = {
+    "account": models.Account,
+    "charge": models.Charge,
+    "charge.dispute": models.Dispute,
+    "charge.refund": models.Charge,
+    "checkout.session": models.Session,
+    "coupon": models.Coupon,
+    "customer": models.Customer,
+    "customer.subscription": models.Subscription,
+    "customer.tax_id": models.TaxId,
+    "entitlements.active_entitlement_summary": models.Customer,
+    "file": models.File,
+    "identity.verification_session": models.VerificationSession,
+    "invoice": models.Invoice,
+    "invoiceitem": models.InvoiceItem,
+    "payment_intent": models.PaymentIntent,
+    "payment_method": models.PaymentMethod,
+    "payout": models.Payout,
+    "price": models.Price,
+    "product": models.Product,
+    "promotion_code": models.PromotionCode,
+    "setup_intent": models.SetupIntent,
+    "subscription_schedule": models.SubscriptionSchedule,
+    "tax_rate": models.TaxRate,
+    "transfer": models.Transfer,
+}
+
+for _route in event_registry:
+    _route.target_model = EVENT_TARGET_MODELS.get(_route.type.rsplit(".", 1)[0])
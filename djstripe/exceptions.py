@@ -32,3 +32,12 @@ class ImpossibleAPIRequest(Exception):
     """
 
     pass
+
+
+class ReplayError(Exception):
+    """
+    Raised when replaying a stored WebhookEventTrigger fails. The original
+    exception is recorded on the trigger.
+    """
+
+    pass
@@ -3,14 +3,25 @@ dj-stripe Custom Field Definitions
 """
 
 import decimal
+import json
+from collections.abc import MutableMapping
+from contextvars import ContextVar
 
 from django.conf import SettingsReference, settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import JSONField as BaseJSONField
+from django.db.models.expressions import Col
+from django.db.models.query_utils import DeferredAttribute
 
 from .utils import convert_tstamp
 
+# orjson is optional (dj-stripe[orjson]), so it may not be installed for mypy
+try:
+    import orjson  # type: ignore[import-not-found, unused-ignore]
+except ImportError:
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
 
 class FieldDeconstructMixin:
     IGNORED_ATTRS = [
@@ -168,7 +179,229 @@ class StripeDateTimeField(FieldDeconstructMixin, models.DateTimeField):
             return convert_tstamp(val)
 
 
-class JSONField(FieldDeconstructMixin, BaseJSONField):
-    """A field used to define a JSONField value according to djstripe logic."""
+class StripePromotedFieldMixin(FieldDeconstructMixin):
+    """
+    A typed, indexed column mirroring a top-level ``stripe_data`` key, so it
+    can be filtered on without a JSON lookup.
+
+    The value is derived from ``stripe_data`` whenever the object is saved
+    (including ``save(update_fields=["stripe_data"])``) or synced from Stripe,
+    and can't be edited on its own. Writes bypassing ``save()``, such as
+    ``QuerySet.update(stripe_data=...)``, leave it stale.
+    """
+
+    def __init__(self, *args, key, **kwargs):
+        self.key = key
+        defaults = {"null": True, "blank": True, "editable": False, "db_index": True}
+        defaults.update(kwargs)
+        super().__init__(*args, **defaults)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["key"] = self.key
+        return name, path, args, kwargs
+
+    def stripe_to_db(self, data):
+        val = data.get(self.key)
+        if val is None and self.has_default():
+            return self.get_default()
+        return val
 
+    def pre_save(self, model_instance, add):
+        value = self.stripe_to_db(model_instance.stripe_data or {})
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class StripePromotedCharField(StripePromotedFieldMixin, models.CharField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 255)
+        super().__init__(*args, **kwargs)
+
+
+class StripePromotedBooleanField(StripePromotedFieldMixin, models.BooleanField):
+    pass
+
+
+class StripePromotedAmountField(StripePromotedFieldMixin, models.BigIntegerField):
     pass
+
+
+class StripePromotedDateTimeField(StripePromotedFieldMixin, models.DateTimeField):
+    def stripe_to_db(self, data):
+        return convert_tstamp(super().stripe_to_db(data))
+
+
+def projected_key_alias(field_name: str, key: str) -> str:
+    """The annotation a key of a JSONField is projected under, see JSONAttribute."""
+    return f"_{field_name}_{key}"
+
+
+def projected_has_key_alias(field_name: str, key: str) -> str:
+    """The annotation telling whether a projected key is in the JSON."""
+    return f"_has_{field_name}_{key}"
+
+
+class ProjectedJSON(MutableMapping):
+    """
+    Stands in for a deferred JSONField value whose keys were annotated with
+    ``projected_key_alias()`` and ``projected_has_key_alias()``. The projected
+    keys are read from the annotations, a projected key missing from the JSON
+    being missing here too, and anything else loads the value from the
+    database first.
+    """
+
+    def __init__(self, instance, field_name, values, missing=frozenset()):
+        self._instance = instance
+        self._field_name = field_name
+        self._values = values
+        self._missing = missing
+
+    def _load(self):
+        instance_dict = self._instance.__dict__
+        if self._field_name not in instance_dict:
+            self._instance.refresh_from_db(fields=[self._field_name])
+        # Keep the decoded value on the instance, so it's loaded only once
+        # (and changes made through this mapping aren't lost)
+        value = instance_dict[self._field_name] = decode_lazy_json(
+            instance_dict[self._field_name]
+        )
+        return value
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        if key in self._missing:
+            raise KeyError(key)
+        return self._load()[key]
+
+    def get(self, key, default=None):
+        if key in self._values:
+            return self._values[key]
+        if key in self._missing:
+            return default
+        return self._load().get(key, default)
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __repr__(self):
+        return f"<ProjectedJSON {self._values!r}>"
+
+
+class LazyJSON:
+    """The raw value of a lazy JSONField, as loaded from the database."""
+
+    __slots__ = ("raw", "decoder")
+
+    def __init__(self, raw, decoder=None):
+        self.raw = raw
+        self.decoder = decoder
+
+    def decode(self):
+        if orjson is not None and self.decoder is None:
+            try:
+                return orjson.loads(self.raw)
+            except orjson.JSONDecodeError:
+                # eg. integers over 64 bits, which json handles
+                pass
+        try:
+            return json.loads(self.raw, cls=self.decoder)
+        except json.JSONDecodeError:
+            return self.raw
+
+    def __repr__(self):
+        return f"<LazyJSON {len(self.raw)} characters>"
+
+
+# Set while StripeModelIterable builds model instances, the only values a lazy
+# JSONField loads undecoded, see JSONField.from_db_value().
+lazy_json_loading: ContextVar[bool] = ContextVar(
+    "djstripe_lazy_json_loading", default=False
+)
+
+
+def decode_lazy_json(value):
+    """Return ``value``, decoded if it's a LazyJSON."""
+    return value.decode() if isinstance(value, LazyJSON) else value
+
+
+class JSONAttribute(DeferredAttribute):
+    """
+    The attribute of a JSONField. Decodes a lazy field's value on first access.
+
+    When the field is deferred but some of its keys were projected (eg. by
+    ``StripeQuerySet.with_stripe_fields()``), returns a ProjectedJSON instead
+    of loading the whole value.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        field_name = self.field.attname
+        if field_name in instance.__dict__:
+            value = instance.__dict__[field_name]
+            if isinstance(value, LazyJSON):
+                value = instance.__dict__[field_name] = value.decode()
+            return value
+        prefix = projected_key_alias(field_name, "")
+        values = {
+            name[len(prefix) :]: value
+            for name, value in instance.__dict__.items()
+            if name.startswith(prefix)
+        }
+        if values:
+            has_prefix = projected_has_key_alias(field_name, "")
+            missing = {
+                name[len(has_prefix) :]
+                for name, present in instance.__dict__.items()
+                if name.startswith(has_prefix) and not present
+            }
+            for key in missing:
+                values.pop(key, None)
+            return ProjectedJSON(instance, field_name, values, missing)
+        return super().__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        # A data descriptor, so that __get__() sees lazy values
+        instance.__dict__[self.field.attname] = value
+
+
+class JSONField(FieldDeconstructMixin, BaseJSONField):
+    """
+    A field used to define a JSONField value according to djstripe logic.
+
+    With ``lazy=True``, values loaded into model instances by a StripeQuerySet
+    while ``DJSTRIPE_LAZY_STRIPE_DATA`` is enabled are kept as they are and
+    decoded (with orjson, if it's installed) when the attribute is first
+    read, so objects whose value is never read don't pay for decoding it.
+    Values loaded any other way, eg. by ``values()``, are decoded as usual.
+    ``lazy`` doesn't change the column, so it isn't part of migrations.
+    """
+
+    descriptor_class = JSONAttribute
+
+    def __init__(self, *args, lazy=False, **kwargs):
+        self.lazy = lazy
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        # Only whole columns: key transforms (eg. with_stripe_fields()) are
+        # decoded as usual.
+        if (
+            self.lazy
+            and lazy_json_loading.get()
+            and isinstance(value, (str, bytes))
+            and isinstance(expression, Col)
+        ):
+            return LazyJSON(value, self.decoder)
+        return super().from_db_value(value, expression, connection)
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import Event, WebhookEventTrigger
+from ...settings import djstripe_settings
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to convert stored webhooks and events to compact storage.
+
+    See DJSTRIPE_WEBHOOK_STORAGE. Rows are converted in primary-key-ordered
+    chunks, each in its own transaction, so the command can be interrupted and
+    re-run safely.
+    """
+
+    help = (
+        "Convert existing WebhookEventTriggers and Events to compact storage "
+        '(DJSTRIPE_WEBHOOK_STORAGE = "compact").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows converted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        if djstripe_settings.WEBHOOK_STORAGE != "compact":
+            raise CommandError(
+                'Set DJSTRIPE_WEBHOOK_STORAGE = "compact" before converting rows.'
+            )
+
+        self.batch_size = options["batch_size"]
+        self.sleep = options["sleep"]
+
+        count = self.compact_triggers()
+        self.output(f"Compacted {count} webhook event triggers")
+        count = self.compact_events()
+        self.output(f"Compacted {count} events")
+
+    def _iter_batches(self, queryset):
+        last_pk = None
+        while True:
+            qs = queryset.order_by("pk")
+            if last_pk is not None:
+                qs = qs.filter(pk__gt=last_pk)
+            batch = list(qs[: self.batch_size])
+            if not batch:
+                return
+            last_pk = batch[-1].pk
+            yield batch
+            if self.sleep:
+                time.sleep(self.sleep)
+
+    def compact_triggers(self):
+        count = 0
+        queryset = WebhookEventTrigger.objects.filter(compacted=False)
+        for batch in self._iter_batches(queryset):
+            # Small bodies are left as they are, but still marked as compacted
+            changed = [trigger for trigger in batch if trigger.compact()]
+            with transaction.atomic():
+                WebhookEventTrigger.objects.filter(
+                    pk__in=[trigger.pk for trigger in batch]
+                ).update(compacted=True)
+                WebhookEventTrigger.objects.bulk_update(
+                    changed, ["headers", "body", "compressed_body"]
+                )
+            count += len(changed)
+            self.verbose_output(f"\tCompacted triggers up to id {batch[-1].pk}")
+        return count
+
+    def compact_events(self):
+        count = 0
+        queryset = Event.objects.filter(stripe_data__has_key="data").only(
+            "pk", "stripe_data"
+        )
+        for batch in self._iter_batches(queryset):
+            for event in batch:
+                del event.stripe_data["data"]
+            with transaction.atomic():
+                Event.objects.bulk_update(batch, ["stripe_data"])
+            count += len(batch)
+            self.verbose_output(f"\tCompacted events up to id {batch[-1].pk}")
+        return count
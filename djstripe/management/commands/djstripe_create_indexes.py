@@ -0,0 +1,118 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models import F, Q
+from django.db.models.fields.json import KeyTransform
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import StripeModel, Subscription, Transfer
+
+
+def get_indexes():
+    """
+    Return the (model, index) pairs for the JSON lookups of the model managers
+    that no promoted column covers, and for ``metadata__contains`` lookups.
+    """
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+
+    indexes = [
+        # SubscriptionManager.expiring_trials()
+        (
+            Subscription,
+            models.Index(
+                KeyTransform("trial_end", "stripe_data"),
+                name="djstripe_subscription_trial_end_idx",
+                condition=Q(stripe_status="trialing"),
+            ),
+        ),
+        # TransferManager.pending()
+        (
+            Transfer,
+            models.Index(
+                KeyTransform("status", "stripe_data"),
+                name="djstripe_transfer_status_idx",
+            ),
+        ),
+    ]
+    for model in apps.get_app_config("djstripe").get_models():
+        if issubclass(model, StripeModel):
+            indexes.append(
+                (
+                    model,
+                    GinIndex(
+                        OpClass(F("metadata"), name="jsonb_path_ops"),
+                        name=f"{model._meta.db_table}_metadata_gin",
+                    ),
+                )
+            )
+    return indexes
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to create the PostgreSQL indexes for dj-stripe's JSON lookups.
+
+    They aren't part of the migrations since expression and GIN indexes are
+    PostgreSQL specific. Indexes are created concurrently, so the command can
+    be run against a live database, and existing ones are skipped.
+    """
+
+    help = (
+        "Create (or, with --drop, remove) PostgreSQL expression and GIN indexes "
+        "for the stripe_data and metadata lookups of dj-stripe's managers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to create the indexes in (default: default).",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Remove the indexes instead of creating them.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the SQL statements without running them.",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            self.output(
+                f"Skipping: the indexes are only supported on PostgreSQL, "
+                f"not {connection.vendor}."
+            )
+            return
+
+        indexes = get_indexes()
+        with connection.cursor() as cursor:
+            existing = {
+                table: set(connection.introspection.get_constraints(cursor, table))
+                for table in {model._meta.db_table for model, _ in indexes}
+            }
+
+        with connection.schema_editor(
+            collect_sql=options["dry_run"], atomic=False
+        ) as schema_editor:
+            for model, index in indexes:
+                exists = index.name in existing[model._meta.db_table]
+                if exists != options["drop"]:
+                    self.verbose_output(f"Skipping {index.name}")
+                    continue
+                if options["drop"]:
+                    schema_editor.remove_index(model, index, concurrently=True)
+                    action = "Dropped"
+                else:
+                    schema_editor.add_index(model, index, concurrently=True)
+                    action = "Created"
+                if not options["dry_run"]:
+                    self.output(f"{action} {index.name}")
+
+        if options["dry_run"]:
+            for statement in schema_editor.collected_sql:
+                self.output(statement)
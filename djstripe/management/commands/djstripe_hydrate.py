@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import HydrationTask
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to link the foreign keys left null while processing events.
+
+    Used with DJSTRIPE_DEFERRED_HYDRATION, where event processing queues
+    references to objects missing from the database instead of retrieving
+    them from Stripe.
+    """
+
+    help = (
+        "Retrieve the objects queued for hydration while processing events "
+        "(see DJSTRIPE_DEFERRED_HYDRATION) and link them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=100,
+            help="Maximum number of foreign keys to hydrate per pass (default: 100).",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=5,
+            help="Give up on a foreign key after this many failures (default: 5).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for new foreign keys to hydrate.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between passes when --loop is used (default: 1).",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        while True:
+            hydrated, failed = HydrationTask.hydrate_pending(
+                limit=options["limit"], max_attempts=options["max_attempts"]
+            )
+            if hydrated or failed:
+                self.output(f"Hydrated {hydrated} foreign keys, {failed} failed")
+            else:
+                self.verbose_output("Nothing to hydrate")
+
+            if not options["loop"]:
+                break
+            if not (hydrated or failed):
+                time.sleep(options["interval"])
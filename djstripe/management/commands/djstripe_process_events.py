@@ -1,15 +1,30 @@
-from django.core.management.base import BaseCommand
+import json
+import os
+import threading
+import time
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
 
 from ... import models
 from ...mixins import VerbosityAwareOutputMixin
+from ...processing import PartitionedExecutor, count_api_calls, get_partition_key
 from ...settings import djstripe_settings
 
+# The cursor is saved at most once per this many processed events.
+CURSOR_SAVE_INTERVAL = 100
+
 
 class Command(VerbosityAwareOutputMixin, BaseCommand):
     """Command to process all Events.
 
     Optional arguments are provided to limit the number of Events processed.
 
+    Events can be processed on several worker threads (--workers). Events about
+    the same Stripe object are always handled by the same worker, in the order
+    they were listed. When listing from the API, progress is saved to a cursor
+    file so that an interrupted run can continue with --resume.
+
     Note: this is only guaranteed go back at most 30 days based on the
     current limitation of stripe's events API. See: https://stripe.com/docs/api/events
     """
@@ -44,6 +59,25 @@ class Command(VerbosityAwareOutputMixin, BaseCommand):
                 " events with a matching event property."
             ),
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of threads processing events concurrently (default: 1).",
+        )
+        parser.add_argument(
+            "--cursor-file",
+            default="djstripe_process_events.cursor",
+            help=(
+                "File the listing progress is saved to "
+                "(default: djstripe_process_events.cursor)."
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted run from the saved cursor file.",
+        )
 
     def handle(self, *args, **options):
         """Try to process Events listed from the API."""
@@ -53,6 +87,8 @@ class Command(VerbosityAwareOutputMixin, BaseCommand):
         event_ids = options["ids"]
         failed = options["failed"]
         type_filter = options["type"]
+        self.workers = options["workers"]
+        self.cursor_file = None
 
         # Args are mutually exclusive,
         # so output what we are doing based on that assumption.
@@ -68,6 +104,8 @@ class Command(VerbosityAwareOutputMixin, BaseCommand):
         # Either use the specific event IDs to retrieve data, or use the api_list
         # if no specific event IDs are specified.
         if event_ids:
+            if options["resume"]:
+                raise CommandError("--resume cannot be used with --ids.")
             listed_events = (
                 models.Event.stripe_class.retrieve(
                     id=event_id,
@@ -84,27 +122,98 @@ class Command(VerbosityAwareOutputMixin, BaseCommand):
             if type_filter:
                 list_kwargs["type"] = type_filter
 
+            self.cursor_file = options["cursor_file"]
+            if options["resume"]:
+                list_kwargs.update(self.load_cursor(list_kwargs))
+
             listed_events = models.Event.api_list(**list_kwargs)
+            self.list_kwargs = list_kwargs
 
         self.process_events(listed_events)
 
+    def load_cursor(self, list_kwargs):
+        """Return the list kwargs needed to continue from the saved cursor."""
+        try:
+            with open(self.cursor_file) as f:
+                cursor = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No cursor file found: {self.cursor_file}") from None
+
+        filters = {k: v for k, v in list_kwargs.items() if k != "starting_after"}
+        if cursor["filters"] != filters:
+            raise CommandError(
+                "The saved cursor was created with different filters "
+                f"({cursor['filters']})."
+            )
+        self.output(f"Resuming after Event {cursor['starting_after']}")
+        return {"starting_after": cursor["starting_after"]}
+
+    def save_cursor(self, event_id):
+        filters = {k: v for k, v in self.list_kwargs.items() if k != "starting_after"}
+        tmp_file = f"{self.cursor_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"starting_after": event_id, "filters": filters}, f)
+        os.replace(tmp_file, self.cursor_file)
+
     def process_events(self, listed_events):
         # Process each listed event. Capture failures and continue,
         # outputting debug information as verbosity dictates.
+        lock = threading.Lock()
         count = 0
         total = 0
-        for event_data in listed_events:
-            try:
-                total += 1
-                event = models.Event.process(data=event_data)
-                count += 1
-                self.verbose_output(f"\tSynced Event {event.id}")
-            except Exception as exception:
+        saved = 0
+
+        def on_done(event_data, exception):
+            nonlocal count
+            if exception is None:
+                with lock:
+                    count += 1
+                self.verbose_output(f"\tSynced Event {event_data['id']}")
+            else:
                 self.verbose_output(f"\tFailed processing Event {event_data['id']}")
                 self.output(f"\t{exception}")
-                self.verbose_traceback()
+                if self.verbosity > 1:
+                    traceback.print_exception(exception)
+
+        start = time.monotonic()
+        executor = PartitionedExecutor(
+            lambda event_data: models.Event.process(data=event_data),
+            workers=self.workers,
+            on_done=on_done,
+        )
+        finished = False
+        with count_api_calls() as api_calls:
+            try:
+                with executor:
+                    for event_data in listed_events:
+                        total += 1
+                        executor.submit(get_partition_key(event_data), event_data)
+
+                        if self.cursor_file and total - saved >= CURSOR_SAVE_INTERVAL:
+                            done = executor.watermark
+                            if done is not None:
+                                self.save_cursor(done["id"])
+                                saved = total
+                finished = True
+            finally:
+                if self.cursor_file and not finished:
+                    # Interrupted: save how far we got, for --resume.
+                    done = executor.watermark
+                    if done is not None:
+                        self.save_cursor(done["id"])
+            api_call_count = api_calls()
+        elapsed = time.monotonic() - start
+
+        if self.cursor_file and os.path.exists(self.cursor_file):
+            # The run went through, there is nothing left to resume.
+            os.remove(self.cursor_file)
 
         if total == 0:
             self.output("\t(no results)")
         else:
             self.output(f"\tProcessed {count} out of {total} Events")
+            self.output(
+                f"\t{total / max(elapsed, 1e-6):.1f} events/s, "
+                f"{api_call_count / total:.2f} API calls/event, "
+                f"{total - count} failed"
+            )
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import WebhookEventTrigger
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to process stored WebhookEventTriggers.
+
+    Used with DJSTRIPE_WEBHOOK_PROCESSING_MODE = "deferred", where the webhook
+    view only stores and validates incoming webhooks. It also retries failed
+    webhooks, with exponential backoff, until DJSTRIPE_WEBHOOK_MAX_ATTEMPTS.
+    """
+
+    help = (
+        "Process valid webhooks that have been stored but not processed yet "
+        '(see DJSTRIPE_WEBHOOK_PROCESSING_MODE = "deferred"), and retry failed '
+        "webhooks that are due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Maximum number of webhooks to process per pass.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling for new webhooks.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between passes when --loop is used (default: 1).",
+        )
+        parser.add_argument(
+            "--requeue-dead-letters",
+            action="store_true",
+            help=(
+                "Give dead-lettered webhooks a fresh set of attempts before processing."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        if options["requeue_dead_letters"]:
+            count = WebhookEventTrigger.requeue_dead_letters()
+            self.output(f"Requeued {count} dead-lettered webhooks")
+
+        while True:
+            processed, failed = WebhookEventTrigger.process_pending(
+                limit=options["limit"]
+            )
+            if processed or failed:
+                self.output(f"Processed {processed} webhooks, {failed} failed")
+            else:
+                self.verbose_output("No pending webhooks")
+
+            if not options["loop"]:
+                break
+            if not (processed or failed):
+                time.sleep(options["interval"])
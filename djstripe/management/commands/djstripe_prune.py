@@ -0,0 +1,143 @@
+import datetime
+import os
+import time
+
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import Event, WebhookEventTrigger
+from ...settings import djstripe_settings
+
+# The outcomes a WebhookEventTrigger can end up in, for retention purposes.
+# Failed triggers due to be retried are left out of "failed", and in deferred
+# mode "valid" triggers are waiting to be processed, so they're never pruned.
+TRIGGER_OUTCOMES = {
+    "processed": Q(processed=True),
+    "valid": Q(valid=True, processed=False, exception=""),
+    "failed": Q(processed=False, next_attempt_at__isnull=True) & ~Q(exception=""),
+    "invalid": Q(valid=False, exception=""),
+}
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to delete old Events and WebhookEventTriggers.
+
+    Retention periods are configured with DJSTRIPE_EVENT_RETENTION_DAYS and
+    DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS. Rows are deleted in
+    primary-key-ordered batches, each in its own short transaction, so that
+    the tables are never locked for long.
+    """
+
+    help = (
+        "Delete Events and WebhookEventTriggers older than their configured "
+        "retention period, in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows deleted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches (default: 0).",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help=(
+                "Write every batch to a JSON Lines file in this directory "
+                "before deleting it."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows would be deleted.",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+        self.batch_size = options["batch_size"]
+        self.sleep = options["sleep"]
+        self.archive_dir = options["archive_dir"]
+        self.dry_run = options["dry_run"]
+
+        if self.archive_dir and not os.path.isdir(self.archive_dir):
+            raise CommandError(f"{self.archive_dir!r} is not a directory.")
+
+        trigger_retention = djstripe_settings.WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS
+        if isinstance(trigger_retention, int):
+            trigger_retention = dict.fromkeys(TRIGGER_OUTCOMES, trigger_retention)
+        for outcome, days in (trigger_retention or {}).items():
+            if outcome not in TRIGGER_OUTCOMES:
+                raise CommandError(
+                    f"Unknown webhook event trigger outcome {outcome!r} in "
+                    "DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS."
+                )
+            if days is None:
+                continue
+            if (
+                outcome == "valid"
+                and djstripe_settings.WEBHOOK_PROCESSING_MODE == "deferred"
+            ):
+                self.output(
+                    "Kept valid webhook event triggers, which are waiting to be "
+                    "processed"
+                )
+                continue
+            queryset = WebhookEventTrigger.objects.filter(
+                TRIGGER_OUTCOMES[outcome], created__lt=self._cutoff(days)
+            )
+            count = self.prune(queryset, label=f"{outcome} webhook event triggers")
+            self.output(f"Pruned {count} {outcome} webhook event triggers")
+
+        event_retention = djstripe_settings.EVENT_RETENTION_DAYS
+        if event_retention is not None:
+            queryset = Event.objects.filter(created__lt=self._cutoff(event_retention))
+            count = self.prune(queryset, label="events")
+            self.output(f"Pruned {count} events")
+
+    def _cutoff(self, days):
+        return timezone.now() - datetime.timedelta(days=days)
+
+    def prune(self, queryset, label):
+        if self.dry_run:
+            return queryset.count()
+
+        model = queryset.model
+        archive_path = None
+        if self.archive_dir:
+            timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
+            archive_path = os.path.join(
+                self.archive_dir, f"{model._meta.db_table}-{timestamp}.jsonl"
+            )
+
+        count = 0
+        while True:
+            pks = list(
+                queryset.order_by("pk").values_list("pk", flat=True)[: self.batch_size]
+            )
+            if not pks:
+                break
+
+            with transaction.atomic():
+                batch = model.objects.filter(pk__in=pks)
+                if archive_path:
+                    with open(archive_path, "a") as archive:
+                        serializers.serialize("jsonl", batch, stream=archive)
+                batch.delete()
+
+            count += len(pks)
+            self.verbose_output(f"\tDeleted {count} {label}")
+            if self.sleep:
+                time.sleep(self.sleep)
+
+        return count
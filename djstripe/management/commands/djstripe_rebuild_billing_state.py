@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import Customer, CustomerBillingState
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to recompute the CustomerBillingState rows from the database.
+
+    Used to backfill them after enabling DJSTRIPE_CUSTOMER_BILLING_STATE, or
+    to repair them after objects were changed without being synced.
+    """
+
+    help = (
+        "Recompute the billing state of customers (see "
+        "DJSTRIPE_CUSTOMER_BILLING_STATE) from their synced subscriptions "
+        "and invoices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "ids",
+            nargs="*",
+            metavar="ID",
+            help="The ids of the customers to rebuild (default: all).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of customers to load at a time (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        customers = Customer.objects.filter(date_purged__isnull=True)
+        if options["ids"]:
+            customers = customers.filter(id__in=options["ids"])
+
+        count = 0
+        for customer in customers.order_by("djstripe_id").iterator(
+            chunk_size=options["chunk_size"]
+        ):
+            state = CustomerBillingState.refresh_for(customer)
+            self.verbose_output(f"{customer.id}: {state.status or 'no subscription'}")
+            count += 1
+
+        self.output(f"Rebuilt the billing state of {count} customers")
@@ -0,0 +1,148 @@
+import argparse
+import datetime
+import threading
+import time
+import traceback
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import Event, WebhookEventTrigger
+from ...processing import (
+    count_api_calls,
+    replay_events,
+    replay_webhook_event_triggers,
+)
+
+
+def _parse_datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            raise argparse.ArgumentTypeError(f"Invalid date: {value!r}")
+        parsed = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to replay stored Events and WebhookEventTriggers.
+
+    Unlike djstripe_process_events, this works from the database only, so it
+    can go back further than Stripe's 30 days of events. With
+    --use-stored-payload, objects are synced from the stored payloads instead
+    of being retrieved (unless a newer event about them is stored, in which
+    case they are left alone), though related objects such as customers or
+    accounts may still be retrieved from Stripe.
+    """
+
+    help = (
+        "Run the webhook handlers again for stored Events, or for stored "
+        "WebhookEventTriggers whose processing failed (--failed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--type",
+            help=(
+                "Only replay events of this type. Use * as a wildcard, "
+                "eg. customer.subscription.*"
+            ),
+        )
+        parser.add_argument(
+            "--since",
+            type=_parse_datetime,
+            help="Only replay events created at or after this date/datetime.",
+        )
+        parser.add_argument(
+            "--until",
+            type=_parse_datetime,
+            help="Only replay events created before this date/datetime.",
+        )
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help=(
+                "Replay valid webhooks whose processing failed, instead of "
+                "stored Events. Webhooks still waiting for "
+                "djstripe_process_webhooks are left to it."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of threads replaying events concurrently (default: 1).",
+        )
+        parser.add_argument(
+            "--use-stored-payload",
+            action="store_true",
+            help=(
+                "Sync objects from the stored event payloads instead of "
+                "retrieving them from Stripe."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        lock = threading.Lock()
+        count = 0
+        failed = 0
+
+        def on_done(item, exception):
+            nonlocal count, failed
+            with lock:
+                count += 1
+                if exception is not None:
+                    failed += 1
+            if exception is None:
+                self.verbose_output(f"\tReplayed {item}")
+            else:
+                self.verbose_output(f"\tFailed replaying {item}")
+                self.output(f"\t{exception}")
+                if self.verbosity > 1:
+                    traceback.print_exception(exception)
+
+        kwargs = {
+            "event_type": options["type"],
+            "workers": options["workers"],
+            "use_stored_payload": options["use_stored_payload"],
+            "on_done": on_done,
+        }
+        date_filters = {}
+        if options["since"]:
+            date_filters["created__gte"] = options["since"]
+        if options["until"]:
+            date_filters["created__lt"] = options["until"]
+
+        start = time.monotonic()
+        with count_api_calls() as api_calls:
+            if options["failed"]:
+                self.output("Replaying failed webhooks")
+                # Unprocessed triggers without an exception are pending deferred
+                # processing, not failed.
+                queryset = WebhookEventTrigger.objects.filter(
+                    processed=False, **date_filters
+                ).exclude(exception="")
+                replay_webhook_event_triggers(queryset, **kwargs)
+            else:
+                self.output("Replaying stored events")
+                queryset = Event.objects.filter(**date_filters)
+                replay_events(queryset, **kwargs)
+            api_call_count = api_calls()
+        elapsed = time.monotonic() - start
+
+        if count == 0:
+            self.output("\t(no results)")
+        else:
+            self.output(f"\tReplayed {count - failed} out of {count} events")
+            self.output(
+                f"\t{count / max(elapsed, 1e-6):.1f} events/s, "
+                f"{api_call_count / count:.2f} API calls/event, "
+                f"{failed} failed"
+            )
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from stripe import StripeError
+
+from ...dispatch import get_enabled_events
+from ...mixins import VerbosityAwareOutputMixin
+from ...models import WebhookEndpoint
+
+
+class Command(VerbosityAwareOutputMixin, BaseCommand):
+    """Command to subscribe webhook endpoints to the events dj-stripe expects.
+
+    See DJSTRIPE_WEBHOOK_ENABLED_EVENTS. Endpoints forwarded to by
+    stripe_listen only exist locally and are skipped.
+    """
+
+    help = (
+        "Update the enabled events of webhook endpoints on Stripe to match "
+        "DJSTRIPE_WEBHOOK_ENABLED_EVENTS, reporting the differences."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "ids",
+            nargs="*",
+            metavar="ID",
+            help="The ids of the webhook endpoints to update (default: all).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the differences, without updating the endpoints.",
+        )
+
+    def handle(self, *args, **options):
+        self.set_verbosity(options)
+
+        enabled_events = get_enabled_events()
+        endpoints = WebhookEndpoint.objects.exclude(id__startswith="djstripe_whfwd_")
+        if options["ids"]:
+            endpoints = endpoints.filter(id__in=options["ids"])
+
+        for endpoint in endpoints.order_by("id"):
+            current = endpoint.enabled_events or []
+            if sorted(current) == enabled_events:
+                self.verbose_output(f"{endpoint.id} is up to date")
+                continue
+
+            self.output(
+                f"Warning: {endpoint.id} is subscribed to different events "
+                "than expected"
+            )
+            missing = set(enabled_events) - set(current)
+            if missing and "*" not in current:
+                self.output(f"\tMissing: {', '.join(sorted(missing))}")
+            unneeded = set(current) - set(enabled_events)
+            if unneeded and "*" not in enabled_events:
+                self.output(f"\tUnneeded: {', '.join(sorted(unneeded))}")
+
+            if options["dry_run"]:
+                continue
+
+            try:
+                endpoint._api_update(enabled_events=enabled_events)
+            except StripeError as e:
+                self.output(f"\tFailed updating {endpoint.id}: {e}")
+                continue
+
+            endpoint.enabled_events = enabled_events
+            endpoint.save(update_fields=["enabled_events"])
+            self.output(f"\tUpdated {endpoint.id}")
@@ -6,6 +6,7 @@ from uuid import uuid4
 from django.core.management.base import BaseCommand
 from django.urls import reverse
 
+from djstripe.dispatch import get_enabled_events
 from djstripe.enums import WebhookEndpointStatus
 from djstripe.models import Account, WebhookEndpoint
 from djstripe.settings import djstripe_settings
@@ -83,7 +84,7 @@ class Command(BaseCommand):
             endpoint = WebhookEndpoint.objects.create(
                 id=f"djstripe_whfwd_{endpoint_uuid.hex}",
                 api_version=djstripe_settings.STRIPE_API_VERSION,
-                enabled_events=["*"],
+                enabled_events=get_enabled_events(),
                 secret=secret,
                 status=WebhookEndpointStatus.enabled,
                 url=base_url + path,
@@ -93,18 +94,19 @@ class Command(BaseCommand):
             )
 
         endpoint_url = endpoint.url
+        listen_args = [
+            STRIPE_BINARY_NAME,
+            "listen",
+            "--skip-update",
+            "--forward-to",
+            endpoint_url,
+        ]
+        if endpoint.enabled_events and "*" not in endpoint.enabled_events:
+            listen_args += ["--events", ",".join(endpoint.enabled_events)]
 
         try:
             self.stdout.write(f"Forwarding Stripe webhooks to {endpoint_url}")
-            subprocess.run(
-                [
-                    STRIPE_BINARY_NAME,
-                    "listen",
-                    "--skip-update",
-                    "--forward-to",
-                    endpoint_url,
-                ]
-            )
+            subprocess.run(listen_args)
         except KeyboardInterrupt:
             pass
         finally:
@@ -4,11 +4,25 @@ dj-stripe model managers
 
 import decimal
 from datetime import datetime, timedelta, UTC
+from typing import TYPE_CHECKING
 
 from django.db import models
+from django.db.models.fields.json import HasKey, KeyTransform
 from django.db.models.functions import Cast
+from django.db.models.query import ModelIterable
 from django.utils import timezone
 
+from .fields import (
+    LazyJSON,
+    lazy_json_loading,
+    projected_has_key_alias,
+    projected_key_alias,
+)
+from .settings import djstripe_settings
+
+if TYPE_CHECKING:
+    from .models import Price  # noqa: F401  # used as PriceManager's model type
+
 
 def _month_utc_range(year, month):
     """Return (start, end) UTC datetimes spanning the given month.
@@ -29,18 +43,93 @@ def _month_unix_range(year, month):
     return int(start.timestamp()), int(end.timestamp())
 
 
-class StripeModelManager(models.Manager):
+class StripeModelIterable(ModelIterable):
+    """
+    Yields model instances, keeping their lazy JSONFields undecoded while
+    ``DJSTRIPE_LAZY_STRIPE_DATA`` is enabled.
+    """
+
+    def __iter__(self):
+        if not djstripe_settings.LAZY_STRIPE_DATA:
+            yield from super().__iter__()
+            return
+
+        annotations = list(self.queryset.query.annotation_select)
+        objects = super().__iter__()
+        while True:
+            # Only the values converted while building an instance are lazy.
+            token = lazy_json_loading.set(True)
+            try:
+                obj = next(objects, None)
+            finally:
+                lazy_json_loading.reset(token)
+            if obj is None:
+                return
+            # Annotations (eg. F("customer__stripe_data")) have no attribute
+            # to decode them on access.
+            for name in annotations:
+                value = obj.__dict__.get(name)
+                if isinstance(value, LazyJSON):
+                    obj.__dict__[name] = value.decode()
+            yield obj
+
+
+class StripeQuerySet(models.QuerySet):
+    """QuerySet used by the managers of StripeModel."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = StripeModelIterable
+
+    def with_stripe_fields(self, *keys):
+        """
+        Defer ``stripe_data``, selecting only the given top-level keys of it.
+
+        The properties reading those keys from ``stripe_data`` (eg.
+        ``Transfer.amount``) don't load it, so listing many objects doesn't
+        transfer and decode their whole ``stripe_data``. Reading any other key
+        loads ``stripe_data``, with one query per object.
+        """
+        annotations = {}
+        for key in keys:
+            annotations[projected_key_alias("stripe_data", key)] = KeyTransform(
+                key, "stripe_data"
+            )
+            # Tells a missing key from a JSON null
+            annotations[projected_has_key_alias("stripe_data", key)] = HasKey(
+                models.F("stripe_data"), key
+            )
+        return self.defer("stripe_data").annotate(**annotations)
+
+
+_StripeModelManagerBase = models.Manager.from_queryset(StripeQuerySet)
+
+
+class StripeModelManager(_StripeModelManagerBase):
     """Manager used in StripeModel."""
 
     pass
 
 
-class SubscriptionManager(models.Manager):
+class CustomerManager(StripeModelManager):
+    """Manager used in models.Customer."""
+
+    def with_subscriptions(self):
+        """
+        Prefetch the subscriptions of the Customers, with their items, prices
+        and products, so that subscription checks such as
+        ``Customer.is_subscribed_to()`` don't query the database per Customer.
+        """
+        return self.prefetch_related("subscriptions__items__price__product")
+
+
+class SubscriptionManager(StripeModelManager):
     """Manager used in models.Subscription.
 
     Most Subscription fields are read from ``stripe_data`` (a JSONField) since
     the dj-stripe 2.10 refactor removed them as concrete columns. ORM filters
-    must therefore use ``stripe_data__<key>`` lookups. Date-like fields
+    must therefore use ``stripe_data__<key>`` lookups, except for ``status``
+    which is promoted to the indexed ``stripe_status`` column. Date-like fields
     (``start_date``, ``canceled_at``, ``trial_end``) are stored as Unix
     timestamps in the JSON, so range filters are expressed against integer
     bounds.
@@ -49,18 +138,18 @@ class SubscriptionManager(models.Manager):
     def started_during(self, year, month):
         """Return Subscriptions not in trial status between a certain time range."""
         start, end = _month_unix_range(year, month)
-        return self.exclude(stripe_data__status="trialing").filter(
+        return self.exclude(stripe_status="trialing").filter(
             stripe_data__start_date__gte=start,
             stripe_data__start_date__lt=end,
         )
 
     def active(self):
         """Return active Subscriptions."""
-        return self.filter(stripe_data__status="active")
+        return self.filter(stripe_status="active")
 
     def canceled(self):
         """Return canceled Subscriptions."""
-        return self.filter(stripe_data__status="canceled")
+        return self.filter(stripe_status="canceled")
 
     def canceled_during(self, year, month):
         """Return Subscriptions canceled during a certain time range."""
@@ -106,8 +195,23 @@ class SubscriptionManager(models.Manager):
             return decimal.Decimal(0)
         return decimal.Decimal(str(canceled)) / decimal.Decimal(str(active))
 
+    def current(self, now=None):
+        """
+        Return Subscriptions whose status and period are current, the queryset
+        counterpart of ``Subscription.is_valid()``.
+        """
+        now = now or timezone.now()
+        # JSON null is excluded explicitly: SQLite compares it as a string,
+        # which sorts after any number.
+        in_trial = models.Q(stripe_data__trial_end__gt=int(now.timestamp())) & ~(
+            models.Q(stripe_data__trial_end=None)
+        )
+        return self.filter(stripe_status__in=("trialing", "active")).filter(
+            models.Q(stripe_current_period_end__gt=now) | in_trial
+        )
+
     def trialing(self):
-        return self.filter(stripe_data__status="trialing")
+        return self.filter(stripe_status="trialing")
 
     def expiring_trials(self, days=7):
         now = timezone.now()
@@ -118,13 +222,129 @@ class SubscriptionManager(models.Manager):
         )
 
     def past_due(self):
-        return self.filter(stripe_data__status="past_due")
+        return self.filter(stripe_status="past_due")
 
     def incomplete(self):
-        return self.filter(stripe_data__status="incomplete")
+        return self.filter(stripe_status="incomplete")
+
+
+class PriceManager(StripeModelManager["Price"]):
+    """Manager used in models.Price.
+
+    ``lookup_key`` is promoted to a uniquely indexed column, so prices are
+    resolved by lookup key without a JSON lookup.
+    """
+
+    # The most lookup keys Stripe's Price.list() accepts at once
+    LOOKUP_KEYS_PER_LIST = 10
+
+    @staticmethod
+    def _missing_lookup_key_cache_key(lookup_key, livemode, stripe_account) -> str:
+        return (
+            f"djstripe:price-lookup-key-missing:{stripe_account or ''}:"
+            f"{livemode}:{lookup_key}"
+        )
+
+    def clear_missing_lookup_key(self, lookup_key, livemode, stripe_account) -> None:
+        """
+        Forget that ``lookup_key`` is missing for ``stripe_account`` (the id of
+        the price's owner account), and for the platform account.
+        """
+        djstripe_settings.get_cache().delete_many(
+            [
+                self._missing_lookup_key_cache_key(lookup_key, livemode, account)
+                for account in (stripe_account, None)
+            ]
+        )
+
+    def by_lookup_key(
+        self, lookup_key, livemode=None, api_key=None, stripe_account=None
+    ):
+        """
+        Return the price with the given lookup key, or None.
+
+        See :meth:`by_lookup_keys`.
+        """
+        return self.by_lookup_keys(
+            [lookup_key],
+            livemode=livemode,
+            api_key=api_key,
+            stripe_account=stripe_account,
+        ).get(lookup_key)
+
+    def by_lookup_keys(
+        self, lookup_keys, livemode=None, api_key=None, stripe_account=None
+    ) -> dict:
+        """
+        Return the prices with the given lookup keys, by lookup key.
+
+        Lookup keys are unique per owner account, so only the prices of
+        ``stripe_account`` are returned, or by default those of the platform
+        account ``api_key`` belongs to. Prices without an owner account are
+        never returned.
+
+        The lookup keys missing from the database are listed from Stripe, ten
+        per request, and synced. Those Stripe doesn't have either are left out
+        of the result, and not looked up again for
+        DJSTRIPE_PRICE_LOOKUP_KEY_MISSING_TIMEOUT seconds.
+
+        :param livemode: The mode of the prices, STRIPE_LIVE_MODE by default.
+        :param api_key: The API key to list missing prices with, the default
+            key of ``livemode`` by default.
+        :param stripe_account: The id of the connected account the prices
+            belong to.
+        """
+        from .models import APIKey
+
+        if livemode is None:
+            livemode = djstripe_settings.STRIPE_LIVE_MODE
+        api_key = api_key or djstripe_settings.get_default_api_key(livemode)
+        lookup_keys = list(dict.fromkeys(lookup_keys))
+
+        if stripe_account:
+            owned = models.Q(djstripe_owner_account__id=stripe_account)
+        else:
+            owned = models.Q(
+                djstripe_owner_account__in=APIKey.objects.filter(secret=api_key).values(
+                    "djstripe_owner_account"
+                )
+            )
+        prices = {
+            price.lookup_key: price
+            for price in self.filter(
+                owned, livemode=livemode, lookup_key__in=lookup_keys
+            )
+        }
+
+        def cache_key(key):
+            return self._missing_lookup_key_cache_key(key, livemode, stripe_account)
+
+        missing = [key for key in lookup_keys if key not in prices]
+        if missing:
+            cache = djstripe_settings.get_cache()
+            known_missing = cache.get_many([cache_key(key) for key in missing])
+            missing = [key for key in missing if cache_key(key) not in known_missing]
+
+        if missing:
+            list_kwargs = {"stripe_account": stripe_account} if stripe_account else {}
+            for i in range(0, len(missing), self.LOOKUP_KEYS_PER_LIST):
+                for data in self.model.api_list(
+                    api_key=api_key,
+                    lookup_keys=missing[i : i + self.LOOKUP_KEYS_PER_LIST],
+                    **list_kwargs,
+                ):
+                    price = self.model.sync_from_stripe_data(data, api_key=api_key)
+                    prices[price.lookup_key] = price
+
+            cache.set_many(
+                {cache_key(key): True for key in missing if key not in prices},
+                djstripe_settings.PRICE_LOOKUP_KEY_MISSING_TIMEOUT,
+            )
+
+        return prices
 
 
-class TransferManager(models.Manager):
+class TransferManager(StripeModelManager):
     """Manager used by models.Transfer.
 
     Transfer-level fields (``status``, ``amount``, ``failure_code``) live in
@@ -155,12 +375,14 @@ class TransferManager(models.Manager):
         return self.filter(stripe_data__status="pending")
 
 
-class ChargeManager(models.Manager):
+class ChargeManager(StripeModelManager):
     """Manager used by models.Charge.
 
     ``status`` is still a concrete column on Charge, but ``paid``,
     ``refunded``, ``disputed``, and ``amount_refunded`` were moved to
-    ``stripe_data`` in dj-stripe 2.10 and require JSON lookups.
+    ``stripe_data`` in dj-stripe 2.10. The first three are promoted to the
+    ``stripe_paid``, ``stripe_refunded`` and ``stripe_disputed`` columns;
+    ``amount_refunded`` still requires a JSON lookup.
     """
 
     def during(self, year, month):
@@ -176,7 +398,7 @@ class ChargeManager(models.Manager):
     def paid_totals_for(self, year, month):
         return (
             self.during(year, month)
-            .filter(stripe_data__paid=True)
+            .filter(stripe_paid=True)
             .aggregate(
                 total_amount=models.Sum("amount"),
                 total_refunded=models.Sum(
@@ -192,7 +414,7 @@ class ChargeManager(models.Manager):
         return self.filter(status="failed")
 
     def refunded(self):
-        return self.filter(stripe_data__refunded=True)
+        return self.filter(stripe_refunded=True)
 
     def disputed(self):
-        return self.filter(stripe_data__disputed=True)
+        return self.filter(stripe_disputed=True)
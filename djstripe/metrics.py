@@ -0,0 +1,41 @@
+"""
+In-process counters for dj-stripe's webhook and sync hot paths.
+
+These are deliberately minimal: plain integer counters kept per process, so
+that reading or incrementing them never touches the database or the cache.
+Export them to your monitoring system of choice by polling
+:func:`get_counts` (for example from a health-check view or a periodic task).
+"""
+
+import threading
+from collections import Counter
+
+_counters: Counter = Counter()
+_lock = threading.Lock()
+
+
+def increment(name: str, key: str | None = None, amount: int = 1) -> None:
+    """
+    Increment the counter ``name``, optionally scoped to ``key``
+    (eg. the djstripe_uuid of a WebhookEndpoint).
+    """
+    with _lock:
+        _counters[(name, key)] += amount
+
+
+def get_count(name: str, key: str | None = None) -> int:
+    """Return the current value of the counter ``name`` for ``key``."""
+    with _lock:
+        return _counters[(name, key)]
+
+
+def get_counts(name: str) -> dict[str | None, int]:
+    """Return every value of the counter ``name``, keyed by scope."""
+    with _lock:
+        return {key: value for (n, key), value in _counters.items() if n == name}
+
+
+def reset() -> None:
+    """Reset all counters to zero."""
+    with _lock:
+        _counters.clear()
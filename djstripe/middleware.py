@@ -0,0 +1,55 @@
+"""
+dj-stripe middleware
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+from .models import Customer
+from .settings import djstripe_settings
+
+
+def get_customer(request, create=False):
+    """
+    Return the Customer of the request's subscriber (see
+    DJSTRIPE_SUBSCRIBER_MODEL_REQUEST_CALLBACK), resolved once per request.
+
+    Returns None if there is no authenticated subscriber or, unless ``create``
+    is set, if the subscriber has no customer yet.
+    """
+    customer = getattr(request, "_djstripe_customer", None)
+    if customer is not None:
+        return customer
+
+    subscriber = djstripe_settings.subscriber_request_callback(request)
+    if getattr(subscriber, "pk", None) is None:
+        return None
+
+    customer = Customer.get_cached_for_subscriber(subscriber)
+    if customer is None and create:
+        customer, _created = Customer.get_or_create(
+            subscriber=subscriber, livemode=djstripe_settings.STRIPE_LIVE_MODE
+        )
+    request._djstripe_customer = customer
+    return customer
+
+
+class CustomerMiddleware:
+    """
+    Sets a lazy ``request.djstripe_customer``, the Customer of the request's
+    subscriber, or a falsy value if it has none.
+
+    ``request.djstripe_customer`` is a SimpleLazyObject, so it is never None
+    itself: test it with ``if request.djstripe_customer:``, not with
+    ``is None``. Use ``get_customer(request)`` where an actual Customer or
+    None is needed.
+
+    Must come after ``AuthenticationMiddleware`` (or whatever sets the
+    attribute DJSTRIPE_SUBSCRIBER_MODEL_REQUEST_CALLBACK reads).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.djstripe_customer = SimpleLazyObject(lambda: get_customer(request))
+        return self.get_response(request)
@@ -1,6 +1,57 @@
 # Generated by Django 6.0.6 on 2026-06-28 20:58
 
-from django.db import migrations
+import django.db.models.deletion
+import djstripe.fields
+from django.conf import settings
+from django.db import migrations, models
+
+DJSTRIPE_SUBSCRIBER_MODEL: str = getattr(
+    settings, "DJSTRIPE_SUBSCRIBER_MODEL", settings.AUTH_USER_MODEL
+)
+
+
+def populate_promoted_fields(apps, schema_editor):
+    """Fill the promoted columns of existing objects from their stripe_data."""
+    for model_name in ("Charge", "Invoice", "Subscription"):
+        model = apps.get_model("djstripe", model_name)
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if isinstance(field, djstripe.fields.StripePromotedFieldMixin)
+        ]
+        batch = []
+        for obj in model.objects.only("pk", "stripe_data").iterator(chunk_size=1000):
+            for field in fields:
+                setattr(obj, field.attname, field.stripe_to_db(obj.stripe_data or {}))
+            batch.append(obj)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, [field.name for field in fields])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, [field.name for field in fields])
+
+
+def clean_price_lookup_keys(apps, schema_editor):
+    """
+    Store missing lookup keys as NULL instead of "", and release the lookup
+    keys of all but the most recently updated price sharing one, ahead of the
+    unique constraint.
+    """
+    Price = apps.get_model("djstripe", "Price")
+    Price.objects.filter(lookup_key="").update(lookup_key=None)
+
+    seen = set()
+    for price in (
+        Price.objects.filter(lookup_key__isnull=False)
+        .order_by("-djstripe_updated")
+        .iterator(chunk_size=1000)
+    ):
+        key = (price.djstripe_owner_account_id, price.livemode, price.lookup_key)
+        if key in seen:
+            price.lookup_key = None
+            price.stripe_data["lookup_key"] = None
+            price.save(update_fields=["lookup_key", "stripe_data"])
+        seen.add(key)
 
 
 class Migration(migrations.Migration):
@@ -23,4 +74,307 @@ class Migration(migrations.Migration):
         migrations.DeleteModel(
             name="SourceTransaction",
         ),
+        migrations.AddField(
+            model_name="webhookeventtrigger",
+            name="compressed_body",
+            field=models.BinaryField(
+                blank=True,
+                help_text=(
+                    "The compressed request body, used instead of body when "
+                    "DJSTRIPE_WEBHOOK_STORAGE is set to compact"
+                ),
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookeventtrigger",
+            name="compacted",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the webhook is stored in compact storage",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["created"], name="djstripe_event_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="webhookeventtrigger",
+            index=models.Index(fields=["created"], name="djstripe_wet_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="webhookeventtrigger",
+            index=models.Index(
+                fields=["processed", "valid", "created"],
+                name="djstripe_wet_outcome_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookeventtrigger",
+            name="attempt_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of times processing the webhook has been attempted",
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookeventtrigger",
+            name="next_attempt_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When processing the (failed) webhook will be retried",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhookeventtrigger",
+            name="dead_lettered_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text=(
+                    "When the webhook was given up on after "
+                    "DJSTRIPE_WEBHOOK_MAX_ATTEMPTS failed processing attempts"
+                ),
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="webhookeventtrigger",
+            index=models.Index(
+                fields=["next_attempt_at"], name="djstripe_wet_retry_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="HydrationTask",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "model",
+                    models.CharField(
+                        help_text="The model holding the foreign key, eg. djstripe.Charge",
+                        max_length=100,
+                    ),
+                ),
+                ("object_id", djstripe.fields.StripeIdField(max_length=255)),
+                (
+                    "field_name",
+                    models.CharField(
+                        help_text="The name of the foreign key to link",
+                        max_length=100,
+                    ),
+                ),
+                ("target_id", djstripe.fields.StripeIdField(max_length=255)),
+                (
+                    "stripe_account",
+                    djstripe.fields.StripeIdField(blank=True, max_length=255),
+                ),
+                (
+                    "attempt_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of failed hydration attempts"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, help_text="The error of the last failed attempt"
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "unique_together": {("model", "object_id", "field_name")},
+            },
+        ),
+        migrations.AddField(
+            model_name="charge",
+            name="stripe_disputed",
+            field=djstripe.fields.StripePromotedBooleanField(
+                blank=True, db_index=True, editable=False, key="disputed", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="charge",
+            name="stripe_paid",
+            field=djstripe.fields.StripePromotedBooleanField(
+                blank=True, db_index=True, editable=False, key="paid", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="charge",
+            name="stripe_refunded",
+            field=djstripe.fields.StripePromotedBooleanField(
+                blank=True, db_index=True, editable=False, key="refunded", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="stripe_amount_due",
+            field=djstripe.fields.StripePromotedAmountField(
+                blank=True, db_index=True, editable=False, key="amount_due", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="stripe_status",
+            field=djstripe.fields.StripePromotedCharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                key="status",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="stripe_cancel_at_period_end",
+            field=djstripe.fields.StripePromotedBooleanField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                default=False,
+                key="cancel_at_period_end",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="stripe_current_period_end",
+            field=djstripe.fields.StripePromotedDateTimeField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                key="current_period_end",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="stripe_status",
+            field=djstripe.fields.StripePromotedCharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                key="status",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="upcominginvoice",
+            name="stripe_amount_due",
+            field=djstripe.fields.StripePromotedAmountField(
+                blank=True, db_index=True, editable=False, key="amount_due", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="upcominginvoice",
+            name="stripe_status",
+            field=djstripe.fields.StripePromotedCharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                key="status",
+                max_length=255,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(
+            populate_promoted_fields, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.CreateModel(
+            name="CustomerBillingState",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="djstripe_billing_state",
+                        serialize=False,
+                        to="djstripe.customer",
+                    ),
+                ),
+                ("livemode", models.BooleanField(blank=True, default=None, null=True)),
+                (
+                    "subscription_id",
+                    djstripe.fields.StripeIdField(blank=True, max_length=255),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        blank=True,
+                        help_text="The status of the subscription.",
+                        max_length=255,
+                    ),
+                ),
+                ("price_ids", djstripe.fields.JSONField(default=list)),
+                ("product_ids", djstripe.fields.JSONField(default=list)),
+                ("trial_end", models.DateTimeField(blank=True, null=True)),
+                ("current_period_end", models.DateTimeField(blank=True, null=True)),
+                (
+                    "delinquent",
+                    models.BooleanField(
+                        default=False,
+                        help_text=(
+                            "Whether the customer is delinquent, has a past due "
+                            "or unpaid subscription, or an open invoice with a "
+                            "failed payment attempt."
+                        ),
+                    ),
+                ),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "subscriber",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="djstripe_billing_states",
+                        to=DJSTRIPE_SUBSCRIBER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="price",
+            name="lookup_key",
+            field=djstripe.fields.StripePromotedCharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                key="lookup_key",
+                max_length=250,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="price",
+            name="nickname",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="A brief description of the plan, hidden from customers.",
+                max_length=250,
+            ),
+        ),
+        migrations.RunPython(
+            clean_price_lookup_keys, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="price",
+            constraint=models.UniqueConstraint(
+                fields=("djstripe_owner_account", "livemode", "lookup_key"),
+                name="djstripe_price_unique_lookup_key",
+            ),
+        ),
     ]
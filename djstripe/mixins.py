@@ -5,7 +5,10 @@ dj-stripe mixins
 import sys
 import traceback
 
-from .models import Customer, Price
+from django.core.exceptions import PermissionDenied
+
+from .catalog import get_catalog
+from .middleware import get_customer
 from .settings import djstripe_settings
 
 
@@ -18,7 +21,7 @@ class PaymentsContextMixin:
         context.update(
             {
                 "STRIPE_PUBLIC_KEY": djstripe_settings.STRIPE_PUBLIC_KEY,
-                "prices": Price.objects.all(),
+                "prices": list(get_catalog().prices.values()),
             }
         )
         return context
@@ -28,13 +31,22 @@ class SubscriptionMixin(PaymentsContextMixin):
     """Adds customer subscription context to a view."""
 
     def get_context_data(self, *args, **kwargs):
-        """Inject is_prices_plural and customer into context_data."""
+        """
+        Inject is_prices_plural and customer into context_data.
+
+        Raises PermissionDenied if the request has no saved subscriber (eg. an
+        anonymous user), as it can't have a customer.
+        """
         context = super().get_context_data(**kwargs)
-        context["is_prices_plural"] = Price.objects.count() > 1
-        context["customer"], _created = Customer.get_or_create(
-            subscriber=djstripe_settings.subscriber_request_callback(self.request)
-        )
-        context["subscription"] = context["customer"].subscription
+        context["is_prices_plural"] = len(context["prices"]) > 1
+        customer = get_customer(self.request, create=True)
+        if customer is None:
+            raise PermissionDenied(
+                f"{type(self).__name__} requires a saved subscriber, see "
+                "DJSTRIPE_SUBSCRIBER_MODEL_REQUEST_CALLBACK."
+            )
+        context["customer"] = customer
+        context["subscription"] = customer.subscription
         return context
 
 
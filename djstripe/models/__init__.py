@@ -1,6 +1,6 @@
 from .account import Account, AccountV2
 from .api import APIKey
-from .base import IdempotencyKey, StripeModel
+from .base import HydrationTask, IdempotencyKey, StripeModel
 from .billing import (
     Coupon,
     Discount,
@@ -29,6 +29,7 @@ from .core import (
     BalanceTransaction,
     Charge,
     Customer,
+    CustomerBillingState,
     Dispute,
     Event,
     File,
@@ -75,6 +76,7 @@ __all__ = [
     "CountrySpec",
     "Coupon",
     "Customer",
+    "CustomerBillingState",
     "Discount",
     "Dispute",
     "DjstripePaymentMethod",
@@ -84,6 +86,7 @@ __all__ = [
     "File",
     "FileLink",
     "FileUpload",
+    "HydrationTask",
     "IdempotencyKey",
     "Invoice",
     "InvoiceItem",
@@ -1,20 +1,33 @@
 import json
 import logging
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import timedelta
+from typing import ClassVar
 
-from django.db import IntegrityError, models, transaction
+from django.apps import apps
+from django.db import IntegrityError, connection, models, transaction
 from django.utils import dateformat, timezone
-from stripe import APIResource, InvalidRequestError, convert_to_stripe_object
+from stripe import (
+    APIResource,
+    InvalidRequestError,
+    StripeError,
+    convert_to_stripe_object,
+)
 
 from .._stripe_errors import object_is_absent
 from ..exceptions import ImpossibleAPIRequest
 from ..fields import (
     JSONField,
+    LazyJSON,
     StripeDateTimeField,
     StripeForeignKey,
     StripeIdField,
     StripePercentField,
+    StripePromotedFieldMixin,
 )
 from ..managers import StripeModelManager
 from ..settings import djstripe_settings
@@ -22,17 +35,162 @@ from ..utils import get_id_from_stripe_data
 
 logger = logging.getLogger(__name__)
 
+# Identity map of the current sync: objects resolved by (model, stripe id)
+# while syncing an object or processing an event, so that each one is read
+# from the database (or retrieved from Stripe) at most once. None outside of
+# a sync scope.
+_sync_scope: ContextVar[dict | None] = ContextVar("djstripe_sync_scope", default=None)
+
+
+@contextmanager
+def sync_scope():
+    """
+    Share resolved objects for the duration of the block.
+
+    Scopes nest: an inner scope reuses the identity map of the outer one, which
+    is discarded when the outermost scope exits.
+    """
+    if _sync_scope.get() is not None:
+        yield
+        return
+
+    token = _sync_scope.set({})
+    try:
+        yield
+    finally:
+        _sync_scope.reset(token)
+
+
+# Whether nullable foreign keys to objects missing from the database are left
+# null and queued in HydrationTask instead of being retrieved straight away.
+_defer_hydration: ContextVar[bool] = ContextVar(
+    "djstripe_defer_hydration", default=False
+)
+
+
+@contextmanager
+def deferred_hydration():
+    """
+    Defer the retrieval of missing related objects while syncing in the block,
+    if DJSTRIPE_DEFERRED_HYDRATION is enabled. See HydrationTask.
+    """
+    token = _defer_hydration.set(djstripe_settings.DEFERRED_HYDRATION)
+    try:
+        yield
+    finally:
+        _defer_hydration.reset(token)
+
+
+def _get_from_sync_scope(model, id_):
+    scope = _sync_scope.get()
+    if scope is None or not id_:
+        return None
+    return scope.get((model, id_))
+
+
+def _add_to_sync_scope(instance):
+    scope = _sync_scope.get()
+    if scope is not None and instance is not None and instance.pk is not None:
+        scope[(type(instance), instance.id)] = instance
+    return instance
+
+
+def _pop_retrieved_from_sync_scope(model, id_):
+    """Return (once) the Stripe data prefetched for ``id_``, if any."""
+    scope = _sync_scope.get()
+    if scope is None:
+        return None
+    return scope.pop(("retrieved", model, id_), None)
+
+
+def _retrieve_concurrently(keys, stripe_account=None, api_key=None):
+    """
+    Retrieve the (model, id) ``keys`` from Stripe on up to
+    DJSTRIPE_SYNC_RETRIEVE_WORKERS threads. Failed retrieves return None: they
+    are retried, and their errors handled, when the foreign key is resolved.
+    """
+
+    def retrieve(key):
+        model, id_ = key
+        try:
+            return model(id=id_).api_retrieve(
+                stripe_account=stripe_account, api_key=api_key
+            )
+        except StripeError:
+            return None
+        finally:
+            connection.close()
+
+    workers = min(djstripe_settings.SYNC_RETRIEVE_WORKERS, len(keys))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(retrieve, keys))
+
+
+def _discard_from_sync_scope(model, id_=None):
+    """
+    Forget ``id_`` (or, without an id, everything: eg. after a rollback, when
+    cached instances may no longer exist).
+    """
+    scope = _sync_scope.get()
+    if scope is None:
+        return
+    if id_ is None:
+        scope.clear()
+    else:
+        scope.pop((model, id_), None)
+
 
 class StripeBaseModel(models.Model):
     stripe_class: type[APIResource] = APIResource
 
     djstripe_created = models.DateTimeField(auto_now_add=True, editable=False)
     djstripe_updated = models.DateTimeField(auto_now=True, editable=False)
-    stripe_data = JSONField(default=dict)
+    stripe_data = JSONField(default=dict, lazy=True)
+
+    # Set on each concrete model by _promoted_fields()
+    _promoted_fields_cache: ClassVar[dict | None] = None
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def _promoted_fields(cls) -> dict:
+        """The promoted columns of the model, by the stripe_data key they mirror."""
+        promoted = cls.__dict__.get("_promoted_fields_cache")
+        if promoted is None:
+            promoted = {
+                field.key: field
+                for field in cls._meta.concrete_fields
+                if isinstance(field, StripePromotedFieldMixin)
+            }
+            cls._promoted_fields_cache = promoted
+        return promoted
+
+    def _get_promoted(self, key: str):
+        """
+        Return the value of the promoted ``key``: from ``stripe_data`` when
+        it is loaded, else from its column (eg. after ``.defer("stripe_data")``),
+        without loading the JSON.
+        """
+        field = self._promoted_fields()[key]
+        # Undecoded lazy stripe_data (see DJSTRIPE_LAZY_STRIPE_DATA) matches
+        # the columns, so they're read instead of decoding it.
+        if "stripe_data" in self.__dict__ and not isinstance(
+            self.__dict__["stripe_data"], LazyJSON
+        ):
+            return field.stripe_to_db(self.stripe_data or {})
+        return getattr(self, field.attname)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "stripe_data" in update_fields:
+            # Promoted columns are derived from stripe_data in pre_save()
+            kwargs["update_fields"] = {
+                *update_fields,
+                *(field.name for field in self._promoted_fields().values()),
+            }
+        super().save(*args, **kwargs)
+
     @classmethod
     def get_expand_params(cls, api_key, **kwargs):
         """Populate `expand` kwarg in stripe api calls by updating the kwargs passed."""
@@ -87,7 +245,7 @@ class StripeModel(StripeBaseModel):
     expand_fields: list[str] = []
     stripe_dashboard_item_name = ""
 
-    objects = models.Manager()
+    objects = StripeModelManager()
     stripe_objects = StripeModelManager()
 
     djstripe_id = models.BigAutoField(
@@ -354,7 +512,7 @@ class StripeModel(StripeBaseModel):
         cls,
         data: dict,
         current_ids=None,
-        pending_relations: list | None = None,
+        pending_relations: dict | None = None,
         stripe_account: str | None = None,
         api_key=djstripe_settings.STRIPE_SECRET_KEY,
     ) -> dict:
@@ -370,7 +528,8 @@ class StripeModel(StripeBaseModel):
         :param data: the object, as sent by Stripe. Parsed from JSON, into a dict
         :param current_ids: stripe ids of objects that are currently being processed
         :type current_ids: set
-        :param pending_relations: list of tuples of relations to be attached post-save
+        :param pending_relations: relations to be attached post-save, keyed by
+            the id of the object they are waiting for
         :param stripe_account: The optional connected account \
             for which this request is being made.
         :return: All the members from the input, translated, mutated, etc
@@ -397,6 +556,13 @@ class StripeModel(StripeBaseModel):
         if current_ids is None:
             current_ids = set()
 
+        cls._prefetch_related_objects(
+            [manipulated_data],
+            current_ids=current_ids,
+            stripe_account=stripe_account,
+            api_key=api_key,
+        )
+
         # Iterate over all the fields that we know are related to Stripe,
         # let each field work its own magic
         ignore_fields = [
@@ -445,6 +611,7 @@ class StripeModel(StripeBaseModel):
 
                 if (
                     isinstance(field, (models.CharField, models.TextField))
+                    and not isinstance(field, StripePromotedFieldMixin)
                     and field_data is None
                 ):
                     # do not add empty secret field for WebhookEndpoint model
@@ -465,6 +632,74 @@ class StripeModel(StripeBaseModel):
 
         return result
 
+    @classmethod
+    def _prefetch_related_objects(
+        cls,
+        records,
+        current_ids=None,
+        stripe_account=None,
+        api_key=djstripe_settings.STRIPE_SECRET_KEY,
+    ):
+        """
+        Resolve the objects referenced by the foreign keys of ``records`` into
+        the sync scope ahead of ``_stripe_object_field_to_foreign_key``: the
+        existing ones with one ``in_bulk`` query per related model and, with
+        DJSTRIPE_SYNC_RETRIEVE_WORKERS > 1, the missing ones with concurrent
+        retrieves. Does nothing outside of a sync scope.
+
+        :param records: stripe objects of this model
+        :type records: list[dict]
+        :param current_ids: stripe ids of objects that are currently being processed
+        :type current_ids: set
+        """
+        scope = _sync_scope.get()
+        if scope is None:
+            return
+
+        current_ids = current_ids or set()
+        wanted = defaultdict(set)
+        to_retrieve = defaultdict(set)
+        for field in cls._meta.concrete_fields:
+            if not isinstance(field, models.ForeignKey) or field.name.startswith(
+                "djstripe_"
+            ):
+                continue
+            related_model = field.related_model
+            if not issubclass(related_model, StripeModel):
+                continue
+
+            for record in records:
+                raw_field_data = record.get(field.name)
+                if not raw_field_data:
+                    continue
+                id_ = get_id_from_stripe_data(raw_field_data)
+                if not id_ or id_ in current_ids or (related_model, id_) in scope:
+                    continue
+                wanted[related_model].add(id_)
+                if id_ == raw_field_data and not (
+                    field.null and _defer_hydration.get()
+                ):
+                    # Only referenced by id: needs a retrieve if it's missing
+                    to_retrieve[related_model].add(id_)
+
+        missing = []
+        for related_model, ids in wanted.items():
+            found = related_model.stripe_objects.in_bulk(ids, field_name="id")
+            for instance in found.values():
+                _add_to_sync_scope(instance)
+            missing += [
+                (related_model, id_)
+                for id_ in sorted(to_retrieve[related_model] - found.keys())
+            ]
+
+        if djstripe_settings.SYNC_RETRIEVE_WORKERS > 1 and len(missing) > 1:
+            retrieved = _retrieve_concurrently(
+                missing, stripe_account=stripe_account, api_key=api_key
+            )
+            for (related_model, id_), data in zip(missing, retrieved, strict=True):
+                if data is not None:
+                    scope[("retrieved", related_model, id_)] = data
+
     @classmethod
     def _stripe_object_field_to_foreign_key(
         cls,
@@ -485,8 +720,9 @@ class StripeModel(StripeBaseModel):
         :type manipulated_data: dict
         :param current_ids: stripe ids of objects that are currently being processed
         :type current_ids: set
-        :param pending_relations: list of tuples of relations to be attached post-save
-        :type pending_relations: list
+        :param pending_relations: relations to be attached post-save, keyed by
+            the id of the object they are waiting for
+        :type pending_relations: dict
         :param stripe_account: The optional connected account \
             for which this request is being made.
         :type stripe_account: string
@@ -532,9 +768,34 @@ class StripeModel(StripeBaseModel):
                 # created once "object_id" object exists
                 if pending_relations is not None:
                     object_id = manipulated_data["id"]
-                    pending_relations.append((object_id, field, id_))
+                    pending_relations.setdefault(id_, []).append((object_id, field))
                 skip = True
 
+            if (
+                not skip
+                and isinstance(raw_field_data, str)
+                and field.null
+                and _defer_hydration.get()
+                and manipulated_data.get("id")
+            ):
+                # Only referenced by id: link the object if we have it,
+                # otherwise leave the foreign key null for djstripe_hydrate
+                # instead of retrieving it now. Nested objects carry their
+                # data, so they are synced below as usual.
+                field_data = (
+                    _get_from_sync_scope(field.related_model, id_)
+                    or field.related_model.stripe_objects.filter(id=id_).first()
+                )
+                if field_data is None:
+                    HydrationTask.enqueue(
+                        cls,
+                        manipulated_data["id"],
+                        field_name,
+                        id_,
+                        stripe_account=stripe_account,
+                    )
+                return _add_to_sync_scope(field_data), False, False
+
             # sync only if field exists and is not null
             if not skip and not is_nulled:
                 # add the id of the current object to the list
@@ -616,33 +877,65 @@ class StripeModel(StripeBaseModel):
         :type data: dict
         """
 
-        unprocessed_pending_relations = []
-        if pending_relations is not None:
-            for post_save_relation in pending_relations:
-                object_id, field, id_ = post_save_relation
+        if pending_relations and self.id in pending_relations:
+            # the objects waiting for this instance can now be linked to it
+            self._attach_pending_relations(pending_relations.pop(self.id))
+
+    def _attach_pending_relations(self, relations):
+        """
+        Point the relations that were waiting for this instance to exist at it.
+
+        Forward foreign keys are set with one UPDATE per field, unless the
+        model has pre_save or post_save receivers, in which case each object
+        is saved (with ``update_fields``) so that they run. Instances of
+        the updated objects held by the sync scope, or cached on this
+        instance (eg. ``self.charge`` while ``charge.invoice = self`` is
+        attached), are updated in place instead of being reloaded.
 
-                if self.id == id_:
-                    # the target instance now exists
-                    target = field.model.objects.get(id=object_id)
+        :param relations: (object id, field) pairs
+        :type relations: list
+        """
+        object_ids_by_field = defaultdict(list)
+        for object_id, field in relations:
+            object_ids_by_field[field].append(object_id)
+
+        save = False
+        for field, object_ids in object_ids_by_field.items():
+            if isinstance(field, models.OneToOneRel):
+                # this is a reverse relationship, so the relation exists on self
+                for object_id in object_ids:
+                    target = _get_from_sync_scope(
+                        field.model, object_id
+                    ) or field.model.objects.get(id=object_id)
                     setattr(target, field.name, self)
-                    if isinstance(field, models.OneToOneRel):
-                        # this is a reverse relationship, so the relation exists on self
-                        self.save()
-                    else:
-                        # this is a forward relation on the target,
-                        # so we need to save it
-                        target.save()
-
-                        # reload so that indirect relations back to this object
-                        # eg self.charge.invoice = self are set
-                        # TODO - reverse the field reference here to avoid hitting the DB?
-                        self.refresh_from_db()
-                else:
-                    unprocessed_pending_relations.append(post_save_relation)
+                save = True
+                continue
 
-            if len(pending_relations) != len(unprocessed_pending_relations):
-                # replace in place so passed in list is updated in calling method
-                pending_relations[:] = unprocessed_pending_relations
+            # this is a forward relation on the targets
+            if models.signals.pre_save.has_listeners(
+                field.model
+            ) or models.signals.post_save.has_listeners(field.model):
+                # Receivers rely on save() being called, so save each target
+                for object_id in object_ids:
+                    target = _get_from_sync_scope(
+                        field.model, object_id
+                    ) or field.model.objects.get(id=object_id)
+                    setattr(target, field.name, self)
+                    target.save(update_fields=[field.name, "djstripe_updated"])
+            else:
+                field.model.objects.filter(id__in=object_ids).update(
+                    **{field.name: self, "djstripe_updated": timezone.now()}
+                )
+            targets = [_get_from_sync_scope(field.model, id_) for id_ in object_ids]
+            for related_field in self._meta.concrete_fields:
+                if related_field.is_relation and related_field.is_cached(self):
+                    targets.append(related_field.get_cached_value(self))
+            for target in targets:
+                if isinstance(target, field.model) and target.id in object_ids:
+                    setattr(target, field.name, self)
+
+        if save:
+            self.save()
 
     @classmethod
     def _create_from_stripe_object(
@@ -662,8 +955,9 @@ class StripeModel(StripeBaseModel):
         :type data: dict
         :param current_ids: stripe ids of objects that are currently being processed
         :type current_ids: set
-        :param pending_relations: list of tuples of relations to be attached post-save
-        :type pending_relations: list
+        :param pending_relations: relations to be attached post-save, keyed by
+            the id of the object they are waiting for
+        :type pending_relations: dict
         :param save: If True, the object is saved after instantiation.
         :type save: bool
         :param stripe_account: The optional connected account \
@@ -723,8 +1017,9 @@ class StripeModel(StripeBaseModel):
         :param refetch:
         :param current_ids: stripe ids of objects that are currently being processed
         :type current_ids: set
-        :param pending_relations: list of tuples of relations to be attached post-save
-        :type pending_relations: list
+        :param pending_relations: relations to be attached post-save, keyed by
+            the id of the object they are waiting for
+        :type pending_relations: dict
         :param save:
         :param stripe_account: The optional connected account \
             for which this request is being made.
@@ -737,7 +1032,7 @@ class StripeModel(StripeBaseModel):
         should_expand = False
 
         if pending_relations is None:
-            pending_relations = []
+            pending_relations = {}
 
         id_ = get_id_from_stripe_data(field)
 
@@ -756,8 +1051,12 @@ class StripeModel(StripeBaseModel):
             # A field like {"subscription": {"id": sub_6lsC8pt7IcFpjA", ...}}
             data = field
 
+        instance = _get_from_sync_scope(cls, id_)
+        if instance is not None:
+            return instance, False
+
         try:
-            return cls.stripe_objects.get(id=id_), False
+            return _add_to_sync_scope(cls.stripe_objects.get(id=id_)), False
         except cls.DoesNotExist:
             if is_nested_data and refetch:
                 # This is what `data` usually looks like:
@@ -766,7 +1065,9 @@ class StripeModel(StripeBaseModel):
                 # If field_name="default_source", we get_or_create the card instead.
                 cls_instance = cls(id=id_)
                 try:
-                    data = cls_instance.api_retrieve(
+                    data = _pop_retrieved_from_sync_scope(
+                        cls, id_
+                    ) or cls_instance.api_retrieve(
                         stripe_account=stripe_account, api_key=api_key
                     )
                 except InvalidRequestError as e:
@@ -803,16 +1104,13 @@ class StripeModel(StripeBaseModel):
             # avoid TransactionManagementError on subsequent queries in case
             # of the IntegrityError catch below. See PR #903
             with transaction.atomic():
-                return (
-                    cls._create_from_stripe_object(
-                        data,
-                        current_ids=current_ids,
-                        pending_relations=pending_relations,
-                        save=save,
-                        stripe_account=stripe_account,
-                        api_key=api_key,
-                    ),
-                    True,
+                instance = cls._create_from_stripe_object(
+                    data,
+                    current_ids=current_ids,
+                    pending_relations=pending_relations,
+                    save=save,
+                    stripe_account=stripe_account,
+                    api_key=api_key,
                 )
         except IntegrityError:
             # Handle the race condition that something else created the object
@@ -820,7 +1118,13 @@ class StripeModel(StripeBaseModel):
             # This is common during webhook handling, since Stripe sends
             # multiple webhook events simultaneously,
             # each of which will cause recursive syncs. See issue #429
-            return cls.stripe_objects.get(id=id_), False
+            # Objects created inside the rolled back block are gone too.
+            _discard_from_sync_scope(cls)
+            return _add_to_sync_scope(cls.stripe_objects.get(id=id_)), False
+
+        if save:
+            _add_to_sync_scope(instance)
+        return instance, True
 
     @classmethod
     def _stripe_object_to_customer(
@@ -911,8 +1215,11 @@ class StripeModel(StripeBaseModel):
         if not lines:
             return []
 
+        lines = list(lines.auto_paging_iter())
+        target_cls._prefetch_related_objects(lines, api_key=api_key)
+
         lineitems = []
-        for line in lines.auto_paging_iter():
+        for line in lines:
             if invoice.id:
                 save = True
                 line.setdefault("invoice", invoice.id)
@@ -958,8 +1265,11 @@ class StripeModel(StripeBaseModel):
         if not items:
             return []
 
+        items = list(items.auto_paging_iter())
+        target_cls._prefetch_related_objects(items, api_key=api_key)
+
         subscriptionitems = []
-        for item_data in items.auto_paging_iter():
+        for item_data in items:
             item, _ = target_cls._get_or_create_from_stripe_object(
                 item_data, refetch=False, api_key=api_key
             )
@@ -1018,6 +1328,11 @@ class StripeModel(StripeBaseModel):
         :type data: dict
         :rtype: cls
         """
+        with sync_scope():
+            return cls._sync_from_stripe_data(data, api_key=api_key)
+
+    @classmethod
+    def _sync_from_stripe_data(cls, data, api_key=None):
         # Resolve the key here rather than as a default argument so that it is
         # read at call time (the default would be frozen at import time).
         api_key = api_key or djstripe_settings.STRIPE_SECRET_KEY
@@ -1062,8 +1377,12 @@ class StripeModel(StripeBaseModel):
         Retrieve object from the db, if it exists. If it doesn't, query Stripe to fetch
         the object and sync with the db.
         """
+        instance = _get_from_sync_scope(cls, id)
+        if instance is not None:
+            return instance
+
         try:
-            return cls.objects.get(id=id)
+            return _add_to_sync_scope(cls.objects.get(id=id))
         except cls.DoesNotExist:
             pass
 
@@ -1105,3 +1424,145 @@ class IdempotencyKey(models.Model):
     @property
     def is_expired(self) -> bool:
         return timezone.now() > self.created + timedelta(hours=24)
+
+
+class HydrationTask(models.Model):
+    """
+    A foreign key left null while processing an event, because the object it
+    refers to wasn't in the database yet (see DJSTRIPE_DEFERRED_HYDRATION).
+    The djstripe_hydrate command retrieves the missing objects and links them.
+    """
+
+    model = models.CharField(
+        max_length=100,
+        help_text="The model holding the foreign key, eg. djstripe.Charge",
+    )
+    object_id = StripeIdField(help_text="The id of the object to link")
+    field_name = models.CharField(
+        max_length=100, help_text="The name of the foreign key to link"
+    )
+    target_id = StripeIdField(help_text="The id of the object to link it to")
+    stripe_account = StripeIdField(
+        blank=True,
+        help_text="The connected account the object to link it to belongs to",
+    )
+    attempt_count = models.PositiveIntegerField(
+        default=0, help_text="Number of failed hydration attempts"
+    )
+    last_error = models.TextField(
+        blank=True, help_text="The error of the last failed attempt"
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("model", "object_id", "field_name")
+
+    def __str__(self):
+        return f"{self.model}.{self.field_name} of {self.object_id} = {self.target_id}"
+
+    @classmethod
+    def enqueue(cls, model, object_id, field_name, target_id, stripe_account=None):
+        """Queue the foreign key ``field_name`` of ``object_id`` for hydration."""
+        task, _ = cls.objects.update_or_create(
+            model=model._meta.label,
+            object_id=object_id,
+            field_name=field_name,
+            defaults={
+                "target_id": target_id,
+                "stripe_account": stripe_account or "",
+                "attempt_count": 0,
+                "last_error": "",
+            },
+        )
+        return task
+
+    @classmethod
+    def hydrate_pending(
+        cls, limit: int | None = None, max_attempts: int = 5
+    ) -> tuple[int, int]:
+        """
+        Hydrate queued foreign keys, oldest first. Objects that are in the
+        database by now are loaded with one query per model; the others are
+        retrieved from Stripe. Each task runs in its own transaction, locked
+        with SKIP LOCKED where the database supports it.
+
+        :returns: The number of tasks hydrated and failed.
+        """
+        pending = cls.objects.filter(attempt_count__lt=max_attempts)
+        queued = pending.order_by("pk")
+        if limit is not None:
+            queued = queued[:limit]
+        tasks = list(queued)
+
+        hydrated = failed = 0
+        with sync_scope():
+            target_ids = defaultdict(set)
+            for task in tasks:
+                target_ids[task.field.related_model].add(task.target_id)
+            for model, ids in target_ids.items():
+                for instance in model.stripe_objects.in_bulk(
+                    ids, field_name="id"
+                ).values():
+                    _add_to_sync_scope(instance)
+
+            for task in tasks:
+                with transaction.atomic():
+                    qs = pending.filter(pk=task.pk)
+                    if connection.features.has_select_for_update_skip_locked:
+                        qs = qs.select_for_update(skip_locked=True)
+                    locked = qs.first()
+                    if locked is None:
+                        # Taken (or already hydrated) by another worker
+                        continue
+                    if locked.hydrate():
+                        hydrated += 1
+                    else:
+                        failed += 1
+
+        return hydrated, failed
+
+    @property
+    def field(self):
+        return apps.get_model(self.model)._meta.get_field(self.field_name)
+
+    def hydrate(self) -> bool:
+        """
+        Retrieve the object the foreign key refers to (unless it is in the
+        database already) and link it. The task is deleted once done, or
+        when either object turns out to be gone.
+
+        :returns: False if retrieving the object failed.
+        """
+        field = self.field
+        holder = field.model.stripe_objects.filter(id=self.object_id).first()
+        if holder is None or getattr(holder, field.attname) is not None:
+            # Deleted, or linked by a later sync
+            self.delete()
+            return True
+
+        try:
+            target = field.related_model._get_or_retrieve(
+                id=self.target_id,
+                stripe_account=self.stripe_account or None,
+                api_key=holder.default_api_key,
+            )
+        except InvalidRequestError as e:
+            if not object_is_absent(e):
+                return self._record_failure(e)
+            target = None
+        except StripeError as e:
+            return self._record_failure(e)
+
+        if target is not None:
+            field.model.stripe_objects.filter(
+                pk=holder.pk, **{f"{field.attname}__isnull": True}
+            ).update(**{field.name: target})
+        self.delete()
+        return True
+
+    def _record_failure(self, exception) -> bool:
+        self.attempt_count += 1
+        self.last_error = str(exception)
+        self.save(update_fields=["attempt_count", "last_error"])
+        logger.warning("Failed hydrating %s: %s", self, exception)
+        return False
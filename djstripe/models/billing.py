@@ -14,6 +14,10 @@ from ..fields import (
     StripeEnumField,
     StripeForeignKey,
     StripeIdField,
+    StripePromotedAmountField,
+    StripePromotedBooleanField,
+    StripePromotedCharField,
+    StripePromotedDateTimeField,
 )
 from ..managers import SubscriptionManager
 from ..settings import djstripe_settings
@@ -268,6 +272,10 @@ class BaseInvoice(StripeModel):
         help_text="The subscription that this invoice was prepared for, if any.",
     )
 
+    # Promoted from stripe_data, for filtering
+    stripe_status = StripePromotedCharField(key="status")
+    stripe_amount_due = StripePromotedAmountField(key="amount_due")
+
     # Property accessors for commonly used fields
     @property
     def currency(self):
@@ -295,7 +303,7 @@ class BaseInvoice(StripeModel):
 
     @property
     def status(self):
-        return self.stripe_data.get("status")
+        return self._get_promoted("status")
 
     @property
     def subtotal(self):
@@ -450,7 +458,7 @@ class BaseInvoice(StripeModel):
 
     @property
     def amount_due(self) -> int:
-        return self.stripe_data["amount_due"]
+        return self._get_promoted("amount_due")
 
     @property
     def attempt_count(self) -> int:
@@ -522,6 +530,22 @@ class Invoice(BaseInvoice):
         help_text="The tax rates applied to this invoice, if any.",
     )
 
+    def _attach_objects_post_save_hook(
+        self,
+        cls,
+        data,
+        api_key=djstripe_settings.STRIPE_SECRET_KEY,
+        pending_relations=None,
+    ):
+        super()._attach_objects_post_save_hook(
+            cls, data, api_key=api_key, pending_relations=pending_relations
+        )
+
+        if djstripe_settings.CUSTOMER_BILLING_STATE:
+            from .core import CustomerBillingState
+
+            CustomerBillingState.refresh_for(self.customer)
+
 
 class UpcomingInvoice(BaseInvoice):
     """
@@ -1011,6 +1035,13 @@ class Subscription(StripeModel):
         help_text="The customer associated with this subscription.",
     )
 
+    # Promoted from stripe_data, for SubscriptionManager
+    stripe_status = StripePromotedCharField(key="status")
+    stripe_current_period_end = StripePromotedDateTimeField(key="current_period_end")
+    stripe_cancel_at_period_end = StripePromotedBooleanField(
+        key="cancel_at_period_end", default=False
+    )
+
     objects = SubscriptionManager()  # type: ignore[misc]  # custom manager override (django-stubs)
 
     # Properties for Subscription model fields
@@ -1042,7 +1073,7 @@ class Subscription(StripeModel):
     @property
     def cancel_at_period_end(self):
         """If the subscription has been canceled with the at_period_end flag set to true."""
-        return self.stripe_data.get("cancel_at_period_end", False)
+        return self._get_promoted("cancel_at_period_end")
 
     @property
     def canceled_at(self):
@@ -1057,7 +1088,7 @@ class Subscription(StripeModel):
     @property
     def current_period_end(self):
         """End of the current period that the subscription has been invoiced for."""
-        return convert_tstamp(self.stripe_data.get("current_period_end"))
+        return self._get_promoted("current_period_end")
 
     @property
     def current_period_start(self):
@@ -1157,7 +1188,7 @@ class Subscription(StripeModel):
     @property
     def status(self):
         """The status of this subscription."""
-        return self.stripe_data.get("status")
+        return self._get_promoted("status")
 
     @property
     def test_clock(self):
@@ -1381,6 +1412,11 @@ class Subscription(StripeModel):
             target_cls=TaxRate, data=data, api_key=api_key
         )
 
+        if djstripe_settings.CUSTOMER_BILLING_STATE:
+            from .core import CustomerBillingState
+
+            CustomerBillingState.refresh_for(self.customer)
+
 
 class SubscriptionItem(StripeModel):
     """
@@ -11,6 +11,8 @@ from django.utils.translation import gettext_lazy as _
 from stripe import InvalidRequestError
 
 from .. import enums
+from ..catalog import bump_catalog_version
+from ..dispatch import event_registry
 from ..exceptions import MultipleSubscriptionException
 from ..fields import (
     JSONField,
@@ -20,13 +22,20 @@ from ..fields import (
     StripeEnumField,
     StripeForeignKey,
     StripeIdField,
+    StripePromotedBooleanField,
+    StripePromotedCharField,
     StripeQuantumCurrencyAmountField,
 )
-from ..managers import ChargeManager
+from ..managers import ChargeManager, CustomerManager, PriceManager
 from ..settings import djstripe_settings
-from ..signals import WEBHOOK_SIGNALS
 from ..utils import get_friendly_currency_amount, get_id_from_stripe_data
-from .base import IdempotencyKey, StripeModel, logger
+from .base import (
+    IdempotencyKey,
+    StripeModel,
+    deferred_hydration,
+    logger,
+    sync_scope,
+)
 
 
 class BalanceTransaction(StripeModel):
@@ -162,6 +171,11 @@ class Charge(StripeModel):
         enum=enums.ChargeStatus, help_text="The status of the payment."
     )
 
+    # Promoted from stripe_data, for ChargeManager
+    stripe_paid = StripePromotedBooleanField(key="paid")
+    stripe_refunded = StripePromotedBooleanField(key="refunded")
+    stripe_disputed = StripePromotedBooleanField(key="disputed")
+
     objects = ChargeManager()  # type: ignore[misc]  # custom manager override (django-stubs)
 
     # Property accessors for commonly used fields
@@ -199,7 +213,7 @@ class Charge(StripeModel):
 
     @property
     def disputed(self):
-        return self.stripe_data.get("disputed")
+        return self._get_promoted("disputed")
 
     @property
     def on_behalf_of(self):
@@ -211,7 +225,7 @@ class Charge(StripeModel):
 
     @property
     def paid(self):
-        return self.stripe_data.get("paid")
+        return self._get_promoted("paid")
 
     @property
     def payment_method_details(self):
@@ -231,7 +245,7 @@ class Charge(StripeModel):
 
     @property
     def refunded(self):
-        return self.stripe_data.get("refunded")
+        return self._get_promoted("refunded")
 
     @property
     def shipping(self):
@@ -477,6 +491,7 @@ class Product(StripeModel):
         )
 
         self._sync_product_features(api_key=api_key)
+        bump_catalog_version()
 
     def _sync_product_features(self, api_key=djstripe_settings.STRIPE_SECRET_KEY):
         from .entitlements import ProductFeature
@@ -563,6 +578,21 @@ class Customer(StripeModel):
     def entitlements(self):
         return self.stripe_data.get("entitlements", [])
 
+    def has_entitlement(self, lookup_key: str) -> bool:
+        """
+        Whether the customer has an active entitlement to the feature with the
+        given lookup key.
+
+        The lookup keys are read from DJSTRIPE_CACHE, where the
+        ``entitlements.active_entitlement_summary.updated`` webhook keeps them
+        up to date, so this doesn't need ``stripe_data``: it can be called on
+        ``Customer.objects.defer("stripe_data")``. On a cache miss, the active
+        entitlements are listed from Stripe.
+        """
+        from .entitlements import ActiveEntitlement
+
+        return lookup_key in ActiveEntitlement.get_lookup_keys(self)
+
     # dj-stripe fields
     subscriber = models.ForeignKey(
         djstripe_settings.get_subscriber_model_string(),
@@ -573,6 +603,8 @@ class Customer(StripeModel):
     )
     date_purged = models.DateTimeField(null=True, editable=False)
 
+    objects = CustomerManager()  # type: ignore[misc]  # custom manager override (django-stubs)
+
     def __str__(self):
         if self.subscriber:
             return str(self.subscriber)
@@ -642,6 +674,55 @@ class Customer(StripeModel):
                 True,
             )
 
+    @staticmethod
+    def _subscriber_cache_key(subscriber_pk, livemode) -> str:
+        return f"djstripe:subscriber-customer:{livemode}:{subscriber_pk}"
+
+    @classmethod
+    def get_cached_for_subscriber(
+        cls, subscriber, livemode=None
+    ) -> Union["Customer", None]:
+        """
+        Return the customer of ``subscriber``, or None if it has none yet.
+
+        The customer's fields, except for stripe_data (loaded on access), are
+        cached in DJSTRIPE_CACHE for DJSTRIPE_CUSTOMER_CACHE_TIMEOUT seconds,
+        until it is synced or purged. The subscriber itself is not cached: the
+        customer's subscriber is ``subscriber``.
+        """
+        if livemode is None:
+            livemode = djstripe_settings.STRIPE_LIVE_MODE
+        cache = djstripe_settings.get_cache()
+        cache_key = cls._subscriber_cache_key(subscriber.pk, livemode)
+        field_names = [
+            field.attname
+            for field in cls._meta.concrete_fields
+            if field.name != "stripe_data"
+        ]
+
+        values = cache.get(cache_key)
+        if values is None:
+            values = (
+                cls.objects.filter(subscriber=subscriber, livemode=livemode)
+                .values(*field_names)
+                .first()
+            )
+            if values is None:
+                return None
+            cache.set(cache_key, values, djstripe_settings.CUSTOMER_CACHE_TIMEOUT)
+
+        customer = cls.from_db(
+            cls.objects.db, field_names, [values[name] for name in field_names]
+        )
+        customer.subscriber = subscriber
+        return customer
+
+    @classmethod
+    def clear_cached_for_subscriber(cls, subscriber_pk, livemode) -> None:
+        djstripe_settings.get_cache().delete(
+            cls._subscriber_cache_key(subscriber_pk, livemode)
+        )
+
     @classmethod
     def create(
         cls,
@@ -953,6 +1034,7 @@ class Customer(StripeModel):
             # doesn't return the older Customer data
             idempotency_key_action = f"customer:create:{self.subscriber.pk}"
             IdempotencyKey.objects.filter(action=idempotency_key_action).delete()
+            self.clear_cached_for_subscriber(self.subscriber.pk, self.livemode)
 
         self.subscriber = None
 
@@ -963,14 +1045,19 @@ class Customer(StripeModel):
         self.date_purged = timezone.now()
         self.save()
 
+    def _has_prefetched_subscriptions(self):
+        """Whether subscriptions were prefetched, eg. with ``with_subscriptions()``."""
+        return "subscriptions" in getattr(self, "_prefetched_objects_cache", {})
+
     def _get_valid_subscriptions(self):
         """Get a list of this customer's valid subscriptions."""
-
-        return [
-            subscription
-            for subscription in self.subscriptions.all()
-            if subscription.is_valid()
-        ]
+        if self._has_prefetched_subscriptions():
+            return [
+                subscription
+                for subscription in self.subscriptions.all()
+                if subscription.is_valid()
+            ]
+        return list(self.subscriptions.current())
 
     def is_subscribed_to(self, product: Product | str) -> bool:
         """
@@ -985,11 +1072,17 @@ class Customer(StripeModel):
         if isinstance(product, StripeModel):
             product = product.id
 
-        for subscription in self._get_valid_subscriptions():
-            for item in subscription.items.all():
-                if item.price and item.price.product.id == product:
-                    return True
-        return False
+        if self._has_prefetched_subscriptions():
+            return any(
+                item.price and item.price.product.id == product
+                for subscription in self._get_valid_subscriptions()
+                for item in subscription.items.all()
+            )
+        return (
+            self.subscriptions.current()
+            .filter(items__price__product__id=product)
+            .exists()
+        )
 
     def has_any_active_subscription(self):
         """
@@ -997,8 +1090,9 @@ class Customer(StripeModel):
 
         :returns: True if there exists an active subscription, False otherwise.
         """
-
-        return len(self._get_valid_subscriptions()) != 0
+        if self._has_prefetched_subscriptions():
+            return len(self._get_valid_subscriptions()) != 0
+        return self.subscriptions.current().exists()
 
     @property
     def active_subscriptions(self):
@@ -1007,13 +1101,17 @@ class Customer(StripeModel):
         (subscriptions with an active status that end in the future).
         """
         now = timezone.now()
-        return [
-            subscription
-            for subscription in self.subscriptions.all()
-            if subscription.status == enums.SubscriptionStatus.active
-            and subscription.current_period_end
-            and subscription.current_period_end > now
-        ]
+        if self._has_prefetched_subscriptions():
+            return [
+                subscription
+                for subscription in self.subscriptions.all()
+                if subscription.status == enums.SubscriptionStatus.active
+                and subscription.current_period_end
+                and subscription.current_period_end > now
+            ]
+        return list(
+            self.subscriptions.active().filter(stripe_current_period_end__gt=now)
+        )
 
     @property
     def valid_subscriptions(self):
@@ -1026,16 +1124,18 @@ class Customer(StripeModel):
         ``payment_behavior="default_incomplete"``), so the customer is not yet
         paying for them.
         """
-        return [
-            subscription
-            for subscription in self.subscriptions.all()
-            if subscription.status
-            not in [
-                enums.SubscriptionStatus.canceled,
-                enums.SubscriptionStatus.incomplete,
-                enums.SubscriptionStatus.incomplete_expired,
-            ]
+        excluded_statuses = [
+            enums.SubscriptionStatus.canceled,
+            enums.SubscriptionStatus.incomplete,
+            enums.SubscriptionStatus.incomplete_expired,
         ]
+        if self._has_prefetched_subscriptions():
+            return [
+                subscription
+                for subscription in self.subscriptions.all()
+                if subscription.status not in excluded_statuses
+            ]
+        return list(self.subscriptions.exclude(stripe_status__in=excluded_statuses))
 
     @property
     def subscription(self):
@@ -1126,6 +1226,12 @@ class Customer(StripeModel):
                 discount, "coupon", api_key=api_key
             )
 
+        if self.subscriber_id:
+            self.clear_cached_for_subscriber(self.subscriber_id, self.livemode)
+
+        if djstripe_settings.CUSTOMER_BILLING_STATE:
+            CustomerBillingState.refresh_for(self)
+
     def _attach_objects_hook(
         self, cls, data, current_ids=None, api_key=djstripe_settings.STRIPE_SECRET_KEY
     ):
@@ -1175,6 +1281,126 @@ class Customer(StripeModel):
             Subscription.sync_from_stripe_data(stripe_subscription, api_key=api_key)
 
 
+class CustomerBillingState(models.Model):
+    """
+    A denormalised projection of a Customer's subscriptions, so that access
+    checks are a single indexed read, eg.
+    ``CustomerBillingState.objects.get(subscriber=request.user, livemode=False)``.
+
+    Maintained from the Customer, Subscription and Invoice sync hooks when
+    DJSTRIPE_CUSTOMER_BILLING_STATE is enabled, and rebuilt with the
+    djstripe_rebuild_billing_state command.
+    """
+
+    customer = models.OneToOneField(
+        "Customer",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="djstripe_billing_state",
+    )
+    subscriber = models.ForeignKey(
+        djstripe_settings.get_subscriber_model_string(),
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="djstripe_billing_states",
+    )
+    livemode = models.BooleanField(null=True, default=None, blank=True)
+    subscription_id = StripeIdField(
+        blank=True,
+        help_text="The subscription the status and periods are those of, if any.",
+    )
+    status = models.CharField(
+        max_length=255, blank=True, help_text="The status of the subscription."
+    )
+    price_ids = JSONField(
+        default=list, help_text="The prices of all the customer's subscriptions."
+    )
+    product_ids = JSONField(
+        default=list, help_text="The products of all the customer's subscriptions."
+    )
+    trial_end = models.DateTimeField(null=True, blank=True)
+    current_period_end = models.DateTimeField(null=True, blank=True)
+    delinquent = models.BooleanField(
+        default=False,
+        help_text=(
+            "Whether the customer is delinquent, has a past due or unpaid "
+            "subscription, or an open invoice with a failed payment attempt."
+        ),
+    )
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.status or 'no subscription'}"
+
+    @property
+    def is_active(self) -> bool:
+        """Whether the subscription's status and period are current."""
+        if self.status not in (
+            enums.SubscriptionStatus.trialing,
+            enums.SubscriptionStatus.active,
+        ):
+            return False
+        now = timezone.now()
+        return bool(
+            (self.current_period_end and self.current_period_end > now)
+            or (self.trial_end and self.trial_end > now)
+        )
+
+    @classmethod
+    def refresh_for(cls, customer: "Customer") -> "CustomerBillingState":
+        """Recompute and save the billing state of ``customer``."""
+        from .billing import SubscriptionItem
+
+        subscriptions = list(
+            customer.subscriptions.exclude(
+                stripe_status__in=[
+                    enums.SubscriptionStatus.canceled,
+                    enums.SubscriptionStatus.incomplete,
+                    enums.SubscriptionStatus.incomplete_expired,
+                ]
+            ).order_by("-created")
+        )
+        # The most recent current subscription, else the most recent one
+        subscription = next(
+            (subscription for subscription in subscriptions if subscription.is_valid()),
+            subscriptions[0] if subscriptions else None,
+        )
+        items = SubscriptionItem.objects.filter(
+            subscription__in=subscriptions, price__isnull=False
+        ).values_list("price__id", "price__product__id")
+
+        delinquent = (
+            customer.delinquent
+            or any(
+                subscription.status
+                in (enums.SubscriptionStatus.past_due, enums.SubscriptionStatus.unpaid)
+                for subscription in subscriptions
+            )
+            or customer.invoices.filter(
+                stripe_status="open", stripe_data__attempt_count__gt=0
+            ).exists()
+        )
+
+        state, _ = cls.objects.update_or_create(
+            customer=customer,
+            defaults={
+                "subscriber": customer.subscriber,
+                "livemode": customer.livemode,
+                "subscription_id": subscription.id if subscription else "",
+                "status": subscription.status if subscription else "",
+                "price_ids": sorted({price_id for price_id, _ in items}),
+                "product_ids": sorted({product_id for _, product_id in items}),
+                "trial_end": subscription.trial_end if subscription else None,
+                "current_period_end": (
+                    subscription.current_period_end if subscription else None
+                ),
+                "delinquent": delinquent,
+            },
+        )
+        return state
+
+
 class Dispute(StripeModel):
     """
     A dispute occurs when a customer questions your charge with their
@@ -1323,6 +1549,16 @@ class Event(StripeModel):
     idempotency_key = models.TextField(default="", blank=True)
     type = models.CharField(max_length=250, help_text="Stripe's event description code")
 
+    # When set, handlers sync objects from the event payload instead of
+    # retrieving them from Stripe (see djstripe_replay_events).
+    use_stored_payload = False
+    # Set when the handlers run again for an event already processed (see
+    # djstripe_replay_events), whose data may be outdated.
+    replayed = False
+
+    class Meta(StripeModel.Meta):
+        indexes = [models.Index(fields=["created"], name="djstripe_event_created_idx")]
+
     def __str__(self):
         return f"type={self.type}, id={self.id}"
 
@@ -1346,21 +1582,33 @@ class Event(StripeModel):
             self.request_id = request_obj or ""
 
     @classmethod
-    def process(cls, data, api_key=None):
+    def _stripe_object_to_record(cls, data, **kwargs):
+        result = super()._stripe_object_to_record(data, **kwargs)
+        if djstripe_settings.WEBHOOK_STORAGE == "compact":
+            # The payload is already stored in Event.data
+            result["stripe_data"] = {
+                k: v for k, v in result["stripe_data"].items() if k != "data"
+            }
+        return result
+
+    @classmethod
+    def process(cls, data, api_key=None, use_stored_payload=False):
         # Resolve the key here rather than as a default argument so that it is
         # read at call time (the default would be frozen at import time).
         api_key = api_key or djstripe_settings.STRIPE_SECRET_KEY
-        qs = cls.objects.filter(id=data["id"])
-        if qs.exists():
-            return qs.first()
+        existing = cls.objects.filter(id=data["id"]).first()
+        if existing is not None:
+            return existing
 
         # Rollback any DB operations in the case of failure so
         # we will retry creating and processing the event the
         # next time the webhook fires.
         try:
             with transaction.atomic():
-                # process the event and create an Event Object
-                ret = cls._create_from_stripe_object(data, api_key=api_key)
+                # Inserting the Event row claims it: the unique id constraint
+                # guarantees only one delivery gets to run the handlers.
+                ret = cls._insert_from_stripe_object(data, api_key=api_key)
+                ret.use_stored_payload = use_stored_payload
                 ret.invoke_webhook_handlers()
                 return ret
         except IntegrityError:
@@ -1376,6 +1624,21 @@ class Event(StripeModel):
                 return existing
             raise
 
+    @classmethod
+    def _insert_from_stripe_object(cls, data, api_key=None):
+        """
+        Build an Event from the Stripe data and INSERT it.
+
+        Unlike ``_create_from_stripe_object``, this does not look the Event up
+        first: ``process`` has already done so, and a concurrent insert of the
+        same event is reported by the database as an IntegrityError.
+        """
+        record = cls._stripe_object_to_record(data, api_key=api_key)
+        instance = cls(**record)
+        instance._attach_objects_hook(cls, data, api_key=api_key)
+        instance.save(force_insert=True)
+        return instance
+
     def invoke_webhook_handlers(self):
         """
         Invokes any webhook handlers that have been registered for this event
@@ -1384,10 +1647,12 @@ class Event(StripeModel):
         See event handlers registered in the ``djstripe.event_handlers`` module
         (or handlers registered in djstripe plugins or contrib packages).
         """
-        signal = WEBHOOK_SIGNALS.get(self.type)
+        route = event_registry.get(self.type)
 
-        if signal:
-            return signal.send(sender=Event, event=self)
+        if route is not None:
+            # Objects resolved by one handler are reused by the next ones
+            with sync_scope(), deferred_hydration():
+                return route.signal.send(sender=Event, event=self)
 
     @cached_property
     def parts(self):
@@ -1746,6 +2011,7 @@ class Price(StripeModel):
     nickname = models.CharField(
         max_length=250,
         blank=True,
+        db_index=True,
         help_text="A brief description of the plan, hidden from customers.",
     )
     product = StripeForeignKey(
@@ -1754,13 +2020,25 @@ class Price(StripeModel):
         related_name="prices",
         help_text="The product this price is associated with.",
     )
-    lookup_key = models.CharField(
+    lookup_key = StripePromotedCharField(
+        key="lookup_key",
         max_length=250,
-        null=True,
-        blank=True,
         help_text="A lookup key used to retrieve prices dynamically from a static string.",
     )
 
+    objects = PriceManager()  # type: ignore[misc]  # custom manager override (django-stubs)
+
+    class Meta(StripeModel.Meta):
+        constraints = [
+            # NULLs are distinct, so this doesn't apply to prices without an
+            # owner account (which by_lookup_keys() never returns). It can't
+            # use nulls_distinct=False, as most prices have no lookup key.
+            models.UniqueConstraint(
+                fields=["djstripe_owner_account", "livemode", "lookup_key"],
+                name="djstripe_price_unique_lookup_key",
+            )
+        ]
+
     @property
     def billing_scheme(self):
         return self.stripe_data.get("billing_scheme")
@@ -1877,6 +2155,44 @@ class Price(StripeModel):
 
         return format_lazy(template, **format_args)
 
+    def _attach_objects_hook(
+        self, cls, data, api_key=djstripe_settings.STRIPE_SECRET_KEY, current_ids=None
+    ):
+        super()._attach_objects_hook(
+            cls, data, api_key=api_key, current_ids=current_ids
+        )
+
+        lookup_key = data.get("lookup_key")
+        if lookup_key:
+            # The lookup key may have been transferred from another price
+            # (transfer_lookup_key), whose update hasn't been synced yet.
+            for other in Price.objects.filter(
+                djstripe_owner_account=self.djstripe_owner_account,
+                livemode=self.livemode,
+                lookup_key=lookup_key,
+            ).exclude(id=self.id):
+                other.stripe_data["lookup_key"] = None
+                other.save(update_fields=["stripe_data"])
+
+    def _attach_objects_post_save_hook(
+        self,
+        cls,
+        data,
+        api_key=djstripe_settings.STRIPE_SECRET_KEY,
+        pending_relations=None,
+    ):
+        super()._attach_objects_post_save_hook(
+            cls, data, api_key=api_key, pending_relations=pending_relations
+        )
+
+        if self.lookup_key:
+            Price.objects.clear_missing_lookup_key(
+                self.lookup_key,
+                self.livemode,
+                self.djstripe_owner_account.id if self.djstripe_owner_account else None,
+            )
+        bump_catalog_version()
+
 
 class Refund(StripeModel):
     """
@@ -1,7 +1,9 @@
 import stripe
 from django.db import models
+from django.utils import timezone
 
 from ..fields import StripeForeignKey
+from ..settings import djstripe_settings
 from .base import StripeModel
 
 
@@ -65,3 +67,62 @@ class ActiveEntitlement(StripeModel):
     @property
     def lookup_key(self) -> str:
         return self.stripe_data["lookup_key"]
+
+    @staticmethod
+    def _lookup_keys_cache_key(customer_id: str) -> str:
+        return f"djstripe:entitlement-lookup-keys:{customer_id}"
+
+    @classmethod
+    def cache_lookup_keys(
+        cls, customer_id: str, entitlements, as_of=None
+    ) -> frozenset[str]:
+        """
+        Cache the lookup keys of ``entitlements``, all the active entitlements
+        of the customer as of ``as_of`` (eg. the creation time of an active
+        entitlement summary event), now by default.
+
+        Keys cached as of a later time are kept, so that summaries delivered
+        out of order don't overwrite newer ones.
+
+        :returns: The cached lookup keys.
+        """
+        if as_of is None:
+            as_of = timezone.now()
+        lookup_keys = frozenset(
+            entitlement["lookup_key"] for entitlement in entitlements
+        )
+        cache = djstripe_settings.get_cache()
+        cache_key = cls._lookup_keys_cache_key(customer_id)
+        cached = cache.get(cache_key)
+        if cached is not None and cached[0] > as_of:
+            return cached[1]
+        cache.set(
+            cache_key,
+            (as_of, lookup_keys),
+            djstripe_settings.ENTITLEMENTS_CACHE_TIMEOUT,
+        )
+        return lookup_keys
+
+    @classmethod
+    def clear_cached_lookup_keys(cls, customer_id: str) -> None:
+        djstripe_settings.get_cache().delete(cls._lookup_keys_cache_key(customer_id))
+
+    @classmethod
+    def get_lookup_keys(cls, customer) -> frozenset[str]:
+        """
+        Return the lookup keys of the active entitlements of ``customer``, from
+        the cache or, on a miss, listed from Stripe and cached.
+        """
+        cached = djstripe_settings.get_cache().get(
+            cls._lookup_keys_cache_key(customer.id)
+        )
+        if cached is not None:
+            return cached[1]
+        api_key = customer.default_api_key
+        entitlements = cls.stripe_class.list(
+            customer=customer.id,
+            api_key=api_key,
+            stripe_version=djstripe_settings.STRIPE_API_VERSION,
+            stripe_account=customer._get_stripe_account_id(api_key),
+        ).auto_paging_iter()
+        return cls.cache_lookup_keys(customer.id, entitlements)
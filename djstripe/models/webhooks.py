@@ -2,6 +2,8 @@
 Module for dj-stripe Webhook models
 """
 
+import datetime
+import hashlib
 import json
 import warnings
 from traceback import format_exc
@@ -9,14 +11,17 @@ from uuid import uuid4
 
 import stripe
 from django.conf import settings
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.utils.datastructures import CaseInsensitiveMapping
+from django.utils import timezone
 from django.utils.functional import cached_property
 
-from .. import signals
+from .. import metrics, signals
+from ..batching import GroupCommitBuffer
 from ..enums import WebhookEndpointStatus, WebhookEndpointValidation
 from ..fields import JSONField, StripeEnumField, StripeForeignKey
 from ..settings import djstripe_settings
+from ..utils import LRUCache, compress_bytes, decompress_bytes
 from .base import StripeModel, logger
 from .core import Event
 
@@ -108,6 +113,71 @@ class WebhookEndpoint(StripeModel):
             self.djstripe_validation_method = djstripe_validation_method
 
 
+# Ids of events this process has recently seen processed successfully. Checked
+# before the database when DJSTRIPE_WEBHOOK_DEDUPLICATE is enabled, so that
+# back-to-back retries of the same event cost no queries at all.
+_processed_event_ids = LRUCache(maxsize=10_000)
+
+
+# Bodies smaller than this many bytes are not worth compressing.
+COMPRESSION_THRESHOLD = 1024
+
+# Group-commit buffers for deferred-mode ingestion, keyed by their settings.
+_ingest_buffers: dict[tuple[int, int], GroupCommitBuffer] = {}
+
+
+def _digest_event_data(data) -> str:
+    """A digest of an event's ``data``, independent of key order."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _flush_triggers(triggers) -> dict[int, Exception]:
+    """
+    Insert a batch of deferred triggers, with a single ``bulk_create`` where
+    the database returns the ids of the inserted rows.
+
+    Otherwise (eg. MySQL), or if the batch fails to insert, the triggers are
+    saved one by one, so each gets its id and a bad trigger (eg. with an
+    oversized header) only fails its own request.
+
+    :returns: The exceptions of the triggers which failed, by index.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        try:
+            with transaction.atomic():
+                WebhookEventTrigger.objects.bulk_create(triggers)
+        except Exception:
+            logger.warning(
+                "Batch insert of %d webhooks failed, retrying them one by one",
+                len(triggers),
+                exc_info=True,
+            )
+        else:
+            return {}
+
+    errors = {}
+    for index, trigger in enumerate(triggers):
+        try:
+            with transaction.atomic():
+                trigger.save(force_insert=True)
+        except Exception as e:
+            errors[index] = e
+    return errors
+
+
+def _get_ingest_buffer() -> GroupCommitBuffer:
+    window_ms = djstripe_settings.WEBHOOK_BATCH_WINDOW_MS
+    max_size = djstripe_settings.WEBHOOK_BATCH_SIZE
+    try:
+        return _ingest_buffers[(window_ms, max_size)]
+    except KeyError:
+        buffer = GroupCommitBuffer(
+            _flush_triggers, window=window_ms / 1000, max_size=max_size
+        )
+        return _ingest_buffers.setdefault((window_ms, max_size), buffer)
+
+
 def _get_version():
     from ..apps import __version__
 
@@ -174,6 +244,18 @@ class WebhookEventTrigger(models.Model):
     )
     headers = JSONField()
     body = models.TextField(blank=True)
+    compressed_body = models.BinaryField(
+        null=True,
+        blank=True,
+        help_text=(
+            "The compressed request body, used instead of body when "
+            "DJSTRIPE_WEBHOOK_STORAGE is set to compact"
+        ),
+    )
+    compacted = models.BooleanField(
+        default=False,
+        help_text="Whether the webhook is stored in compact storage",
+    )
     valid = models.BooleanField(
         default=False,
         help_text="Whether or not the webhook event has passed validation",
@@ -186,6 +268,23 @@ class WebhookEventTrigger(models.Model):
     traceback = models.TextField(
         blank=True, help_text="Traceback if an exception was thrown during processing"
     )
+    attempt_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of times processing the webhook has been attempted",
+    )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When processing the (failed) webhook will be retried",
+    )
+    dead_lettered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=(
+            "When the webhook was given up on after DJSTRIPE_WEBHOOK_MAX_ATTEMPTS "
+            "failed processing attempts"
+        ),
+    )
     event = StripeForeignKey(
         "Event",
         on_delete=models.SET_NULL,
@@ -216,9 +315,62 @@ class WebhookEventTrigger(models.Model):
         help_text="The endpoint this webhook was received on",
     )
 
+    # Set on the unsaved trigger from_request() returns for a re-delivery of an
+    # event that was already processed (see DJSTRIPE_WEBHOOK_DEDUPLICATE).
+    duplicate = False
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created"], name="djstripe_wet_created_idx"),
+            models.Index(
+                fields=["processed", "valid", "created"],
+                name="djstripe_wet_outcome_idx",
+            ),
+            models.Index(fields=["next_attempt_at"], name="djstripe_wet_retry_idx"),
+        ]
+
     def __str__(self):
         return f"id={self.id}, valid={self.valid}, processed={self.processed}"
 
+    def is_duplicate_delivery(self, *, secret: str) -> bool:
+        """
+        Whether the (unsaved) trigger is an authentic re-delivery of an event
+        that was already processed successfully.
+
+        Stripe delivers events at least once, so the same event id can reach
+        us several times. Duplicates can be acknowledged straight away without
+        storing the trigger or processing it again: the Event row only exists
+        once its processing transaction has committed. The trigger is still
+        validated, so that a forged request can't pass for a re-delivery.
+        """
+        local_data = self.json_body
+        event_id = local_data.get("id") if isinstance(local_data, dict) else None
+        if not isinstance(event_id, str) or not event_id:
+            return False
+
+        if event_id not in _processed_event_ids:
+            if not Event.objects.filter(id=event_id).exists():
+                return False
+            _processed_event_ids.set(event_id)
+
+        webhook_endpoint = self.webhook_endpoint
+        api_key = ""
+        if (
+            webhook_endpoint.djstripe_validation_method  # type: ignore[union-attr]
+            == WebhookEndpointValidation.retrieve_event
+        ):
+            # Only looked up when the event has to be retrieved
+            self.stripe_trigger_account = webhook_endpoint.djstripe_owner_account  # type: ignore[union-attr]
+            api_key = self.get_api_key()
+        if not self.validate(secret=secret, api_key=api_key):
+            return False
+
+        metrics.increment(
+            "webhook_duplicates_skipped",
+            key=str(webhook_endpoint.djstripe_uuid),  # type: ignore[union-attr]
+        )
+        return True
+
     @classmethod
     def from_request(cls, request, *, webhook_endpoint: WebhookEndpoint):
         """
@@ -229,6 +381,11 @@ class WebhookEventTrigger(models.Model):
         1. Create a WebhookEventTrigger object from a Django request.
         2. Validate the WebhookEventTrigger as a Stripe event using the API.
         3. If valid, process it into an Event object (and child resource).
+
+        With DJSTRIPE_WEBHOOK_PROCESSING_MODE = "deferred", step 3 is left to
+        the ``djstripe_process_webhooks`` worker command. With
+        DJSTRIPE_WEBHOOK_DEDUPLICATE, a valid re-delivery of an event that was
+        already processed is returned unsaved, with ``duplicate`` set.
         """
 
         try:
@@ -238,19 +395,26 @@ class WebhookEventTrigger(models.Model):
 
         ip = get_remote_ip(request)
 
-        stripe_account = webhook_endpoint.djstripe_owner_account
         secret = webhook_endpoint.secret
 
-        obj = cls.objects.create(
-            headers=dict(request.headers),
-            body=body,
+        obj = cls(
+            **cls._get_payload_kwargs(dict(request.headers), body),
             remote_ip=ip,
-            stripe_trigger_account=stripe_account,
             webhook_endpoint=webhook_endpoint,
         )
-        api_key = (
-            stripe_account.default_api_key if stripe_account else None
-        ) or djstripe_settings.get_default_api_key(webhook_endpoint.livemode)
+        if djstripe_settings.WEBHOOK_DEDUPLICATE and obj.is_duplicate_delivery(
+            secret=secret
+        ):
+            # Already processed: returned without being stored.
+            obj.valid = obj.duplicate = True
+            return obj
+        obj.stripe_trigger_account = webhook_endpoint.djstripe_owner_account
+
+        if djstripe_settings.WEBHOOK_PROCESSING_MODE == "deferred":
+            return cls._from_request_deferred(obj, secret=secret)
+
+        obj.save(force_insert=True)
+        api_key = obj.get_api_key()
 
         try:
             # Validate and process inside a transaction so a failure midway
@@ -284,18 +448,7 @@ class WebhookEventTrigger(models.Model):
                     )
         except Exception as e:
             # The atomic block above has rolled back any partial processing.
-            max_length = cls._meta.get_field("exception").max_length  # type: ignore[union-attr]  # concrete field
-            obj.exception = str(e)[:max_length]
-            obj.traceback = format_exc()
-
-            # Send the exception as the webhook_processing_error signal
-            signals.webhook_processing_error.send(
-                sender=cls,
-                instance=obj,
-                api_key=api_key,
-                exception=e,
-                data=getattr(e, "http_body", ""),
-            )
+            obj._record_exception(e, api_key=api_key)
 
             # Persist the trigger (with the recorded error) before re-raising, so
             # the record survives for debugging even though Django turns the
@@ -307,12 +460,234 @@ class WebhookEventTrigger(models.Model):
 
         obj.save()
 
+        if obj.processed and obj.event:
+            _processed_event_ids.set(obj.event.id)
+
         return obj
 
+    @classmethod
+    def _from_request_deferred(cls, obj, *, secret: str):
+        """
+        Validate an unsaved trigger and store it through the ingest buffer,
+        leaving processing to the ``djstripe_process_webhooks`` worker.
+
+        The trigger is written exactly once, together with any other webhooks
+        received within DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS, and this only returns
+        once that batch has been committed.
+        """
+        api_key = obj.get_api_key()
+        buffer = _get_ingest_buffer()
+
+        try:
+            signals.webhook_pre_validate.send(sender=cls, instance=obj)
+            obj.valid = obj.validate(secret=secret, api_key=api_key)
+            signals.webhook_post_validate.send(
+                sender=cls, instance=obj, valid=obj.valid
+            )
+        except Exception as e:
+            obj._record_exception(e, api_key=api_key)
+            try:
+                buffer.submit(obj)
+            except Exception:
+                # Don't let a failure to store the trigger hide the error
+                logger.exception("Failed to store webhook event trigger")
+            raise e
+
+        return buffer.submit(obj)
+
+    @classmethod
+    def process_pending(cls, limit: int | None = None) -> tuple[int, int]:
+        """
+        Process valid triggers which have been stored but not processed yet
+        (see DJSTRIPE_WEBHOOK_PROCESSING_MODE), and failed triggers that are
+        due to be retried, oldest first.
+
+        Each trigger is processed in its own transaction. Where the database
+        supports it, the trigger row is locked with SKIP LOCKED so that several
+        workers can run side by side.
+
+        :returns: The number of triggers processed and failed.
+        """
+        pending = cls.objects.filter(
+            models.Q(exception="") | models.Q(next_attempt_at__lte=timezone.now()),
+            valid=True,
+            processed=False,
+            dead_lettered_at__isnull=True,
+        )
+        pks = pending.order_by("pk").values_list("pk", flat=True)
+        if limit is not None:
+            pks = pks[:limit]
+
+        processed = failed = 0
+        for pk in list(pks):
+            with transaction.atomic():
+                qs = pending.filter(pk=pk)
+                if connection.features.has_select_for_update_skip_locked:
+                    qs = qs.select_for_update(skip_locked=True)
+                trigger = qs.first()
+                if trigger is None:
+                    # Taken (or already processed) by another worker
+                    continue
+                if trigger.process_deferred():
+                    processed += 1
+                else:
+                    failed += 1
+
+        return processed, failed
+
+    def process_deferred(self, use_stored_payload: bool = False) -> bool:
+        """
+        Process a trigger that was stored in deferred mode, recording any
+        exception on the trigger instead of raising it.
+
+        :param use_stored_payload: Sync objects from the stored payload instead
+            of retrieving them from Stripe.
+        :returns: Whether processing succeeded.
+        """
+        api_key = self.get_api_key()
+
+        try:
+            with transaction.atomic():
+                signals.webhook_pre_process.send(sender=type(self), instance=self)
+                self.process(
+                    save=False, api_key=api_key, use_stored_payload=use_stored_payload
+                )
+                signals.webhook_post_process.send(
+                    sender=type(self), instance=self, api_key=api_key
+                )
+        except Exception as e:
+            self._record_exception(e, api_key=api_key)
+            self.save()
+            logger.exception("Failed to process webhook event trigger %s", self.pk)
+            return False
+
+        self.save()
+        if self.event:
+            _processed_event_ids.set(self.event.id)
+        return True
+
+    def get_api_key(self) -> str:
+        """The API key to validate and process this trigger with."""
+        stripe_account = self.stripe_trigger_account
+        livemode = self.webhook_endpoint.livemode if self.webhook_endpoint else None
+        return (
+            stripe_account.default_api_key if stripe_account else None
+        ) or djstripe_settings.get_default_api_key(livemode)
+
+    def _record_exception(self, exception, api_key=None):
+        """
+        Store ``exception`` and the current traceback on the trigger and send
+        the webhook_processing_error signal. The trigger is not saved.
+        """
+        max_length = self._meta.get_field("exception").max_length
+        self.exception = str(exception)[:max_length]
+        self.traceback = format_exc()
+        if self.valid:
+            self._schedule_retry()
+
+        # Send the exception as the webhook_processing_error signal
+        signals.webhook_processing_error.send(
+            sender=type(self),
+            instance=self,
+            api_key=api_key,
+            exception=exception,
+            data=getattr(exception, "http_body", ""),
+        )
+
+    def _schedule_retry(self):
+        """
+        Schedule the next processing attempt of a failed trigger, with
+        exponential backoff, or dead-letter it once DJSTRIPE_WEBHOOK_MAX_ATTEMPTS
+        attempts have failed. The trigger is not saved.
+        """
+        attempts = max(self.attempt_count, 1)
+        if attempts >= djstripe_settings.WEBHOOK_MAX_ATTEMPTS:
+            self.next_attempt_at = None
+            self.dead_lettered_at = timezone.now()
+            logger.warning(
+                "Giving up on webhook event trigger %s after %d attempts",
+                self.pk,
+                attempts,
+            )
+        else:
+            delay = djstripe_settings.WEBHOOK_RETRY_BACKOFF * 2 ** (attempts - 1)
+            self.next_attempt_at = timezone.now() + datetime.timedelta(seconds=delay)
+
+    @classmethod
+    def requeue_dead_letters(cls, queryset=None) -> int:
+        """
+        Give dead-lettered triggers (in ``queryset``, or all of them) a fresh
+        set of attempts, starting right away.
+
+        :returns: The number of triggers requeued.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.filter(dead_lettered_at__isnull=False).update(
+            attempt_count=0, dead_lettered_at=None, next_attempt_at=timezone.now()
+        )
+
+    @classmethod
+    def _get_payload_kwargs(cls, headers: dict, body: str) -> dict:
+        """
+        The headers/body/compressed_body/compacted values to store for a
+        webhook, according to DJSTRIPE_WEBHOOK_STORAGE.
+        """
+        if djstripe_settings.WEBHOOK_STORAGE != "compact":
+            return {
+                "headers": headers,
+                "body": body,
+                "compressed_body": None,
+                "compacted": False,
+            }
+
+        allowlist = {
+            name.lower() for name in djstripe_settings.WEBHOOK_HEADERS_ALLOWLIST
+        }
+        headers = {k: v for k, v in headers.items() if k.lower() in allowlist}
+
+        encoded = body.encode("utf-8")
+        if len(encoded) < COMPRESSION_THRESHOLD:
+            return {
+                "headers": headers,
+                "body": body,
+                "compressed_body": None,
+                "compacted": True,
+            }
+        return {
+            "headers": headers,
+            "body": "",
+            "compressed_body": compress_bytes(encoded),
+            "compacted": True,
+        }
+
+    def compact(self) -> bool:
+        """
+        Convert the stored payload to compact storage, in place. The trigger
+        is not saved.
+
+        :returns: Whether anything changed.
+        """
+        if self.compacted:
+            return False
+        kwargs = self._get_payload_kwargs(self.headers or {}, self.body)
+        changed = any(getattr(self, attr) != value for attr, value in kwargs.items())
+        for attr, value in kwargs.items():
+            setattr(self, attr, value)
+        return changed
+
+    @property
+    def raw_body(self) -> str:
+        """The request body as received, decompressed if needed."""
+        if self.compressed_body is not None:
+            # A memoryview on PostgreSQL
+            return decompress_bytes(bytes(self.compressed_body)).decode("utf-8")
+        return self.body
+
     @cached_property
     def json_body(self):
         try:
-            return json.loads(self.body)
+            return json.loads(self.raw_body)
         except ValueError:
             return {}
 
@@ -325,7 +700,7 @@ class WebhookEventTrigger(models.Model):
 
         try:
             stripe.WebhookSignature.verify_header(
-                self.body, signature, secret, tolerance
+                self.raw_body, signature, secret, tolerance
             )
         except stripe.SignatureVerificationError:
             logger.exception("Failed to verify header")
@@ -372,6 +747,22 @@ class WebhookEventTrigger(models.Model):
                 tolerance=self.webhook_endpoint.djstripe_tolerance,  # type: ignore[union-attr]
             )
 
+        # Duplicate deliveries and retries of an event are compared against
+        # a digest of the data retrieved the first time around.
+        cache = djstripe_settings.get_cache()
+        cache_key = (
+            f"djstripe:event-data-digest:{local_data['id']}:"
+            f"{local_data.get('api_version')}"
+        )
+        local_digest = _digest_event_data(local_data["data"])
+        remote_digest = cache.get(cache_key)
+        if remote_digest is not None:
+            metrics.increment(
+                "webhook_validation_retrieves_avoided",
+                str(self.webhook_endpoint.djstripe_uuid),  # type: ignore[union-attr]
+            )
+            return local_digest == remote_digest
+
         livemode = local_data["livemode"]
         api_key = api_key or djstripe_settings.get_default_api_key(livemode)
 
@@ -381,16 +772,30 @@ class WebhookEventTrigger(models.Model):
             api_key=api_key,
             stripe_version=local_data["api_version"],
         )
+        remote_event_data = remote_data["data"]
+        if isinstance(remote_event_data, stripe.StripeObject):
+            # Not a dict, so neither comparable to nor digested like one
+            remote_event_data = remote_event_data.to_dict()
+        cache.set(
+            cache_key,
+            _digest_event_data(remote_event_data),
+            djstripe_settings.WEBHOOK_VALIDATION_CACHE_TIMEOUT,
+        )
 
-        return local_data["data"] == remote_data["data"]
+        return local_data["data"] == remote_event_data
 
-    def process(self, save=True, api_key: str | None = None):
+    def process(self, save=True, api_key: str | None = None, use_stored_payload=False):
         # Reset traceback and exception in case of reprocessing
         self.exception = ""
         self.traceback = ""
+        self.next_attempt_at = None
+        self.attempt_count += 1
 
-        self.event = Event.process(self.json_body, api_key=api_key)
+        self.event = Event.process(
+            self.json_body, api_key=api_key, use_stored_payload=use_stored_payload
+        )
         self.processed = True
+        self.dead_lettered_at = None
         if save:
             self.save()
 
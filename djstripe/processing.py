@@ -0,0 +1,282 @@
+"""
+Concurrent processing helpers for dj-stripe's bulk management commands.
+
+:class:`PartitionedExecutor` runs a callable over a stream of items on a pool
+of worker threads while preserving ordering per partition key: all items
+sharing a key (eg. the id of the Stripe object an Event is about) are handled
+by the same worker, in submission order.
+
+:func:`replay_events` and :func:`replay_webhook_event_triggers` use it to
+re-run webhook handlers over stored Events and WebhookEventTriggers.
+
+:func:`count_api_calls` counts the HTTP requests made to the Stripe API while
+it is active, so commands can report how many calls processing cost.
+"""
+
+import queue
+import re
+import threading
+import zlib
+from collections.abc import Callable
+from contextlib import contextmanager
+
+import stripe
+from django.db import connection, transaction
+
+from . import metrics
+from .exceptions import ReplayError
+
+_STOP = object()
+
+
+class PartitionedExecutor:
+    """
+    Process items on ``workers`` threads, partitioned by key.
+
+    :param process: Callable receiving a single item.
+    :param workers: Number of worker threads. With a single worker, items are
+        processed inline, in the submitting thread.
+    :param on_done: Optional callable ``(item, exception)`` called once an item
+        has been handled. ``exception`` is ``None`` on success. It is called
+        from the worker thread.
+    :param queue_size: Maximum number of items waiting per worker. Once a
+        worker's queue is full, :meth:`submit` blocks, so the producer never
+        runs too far ahead.
+    """
+
+    def __init__(
+        self,
+        process: Callable,
+        workers: int = 1,
+        on_done: Callable | None = None,
+        queue_size: int = 100,
+    ):
+        self.process = process
+        self.workers = max(workers, 1)
+        self.on_done = on_done
+
+        self._lock = threading.Lock()
+        self._items: dict[int, object] = {}
+        self._completed: set[int] = set()
+        self._next_seq = 0
+        self._watermark_seq = -1
+        self._watermark: object | None = None
+
+        self._queues: list[queue.Queue] = []
+        self._threads: list[threading.Thread] = []
+        if self.workers > 1:
+            for i in range(self.workers):
+                q: queue.Queue = queue.Queue(maxsize=queue_size)
+                thread = threading.Thread(
+                    target=self._work, args=(q,), name=f"djstripe-worker-{i}"
+                )
+                thread.daemon = True
+                thread.start()
+                self._queues.append(q)
+                self._threads.append(thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def watermark(self):
+        """
+        The most recently submitted item such that it, and every item submitted
+        before it, has been handled. ``None`` until the first item is done.
+        """
+        with self._lock:
+            return self._watermark
+
+    def partition(self, key: str) -> int:
+        """Return the index of the worker handling ``key``."""
+        return zlib.crc32(str(key).encode()) % self.workers
+
+    def submit(self, key: str, item) -> None:
+        """Schedule ``item`` on the worker owning ``key``."""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._items[seq] = item
+
+        if self.workers == 1:
+            self._run(seq, item)
+        else:
+            self._queues[self.partition(key)].put((seq, item))
+
+    def close(self) -> None:
+        """Wait for every submitted item to be handled and stop the workers."""
+        for q in self._queues:
+            q.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._queues = []
+        self._threads = []
+
+    def _work(self, q: queue.Queue) -> None:
+        try:
+            while True:
+                entry = q.get()
+                if entry is _STOP:
+                    return
+                self._run(*entry)
+        finally:
+            # Each worker thread has its own database connection.
+            connection.close()
+
+    def _run(self, seq: int, item) -> None:
+        error = None
+        try:
+            self.process(item)
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            self._completed.add(seq)
+            while self._watermark_seq + 1 in self._completed:
+                self._watermark_seq += 1
+                self._completed.remove(self._watermark_seq)
+                self._watermark = self._items.pop(self._watermark_seq)
+
+        if self.on_done is not None:
+            self.on_done(item, error)
+
+
+def get_partition_key(data: dict) -> str:
+    """
+    Return the key events are partitioned by: the id of the object the event
+    is about, or the event id for events without one.
+    """
+    obj = (data.get("data") or {}).get("object") or {}
+    return obj.get("id") or data["id"]
+
+
+def event_type_regex(pattern: str) -> str:
+    """
+    Translate an event type pattern using ``*`` as a wildcard (eg.
+    ``customer.subscription.*``) to a regex matching whole event types.
+    """
+    return "^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$"
+
+
+def replay_events(
+    queryset,
+    event_type: str | None = None,
+    workers: int = 1,
+    use_stored_payload: bool = False,
+    on_done: Callable | None = None,
+) -> None:
+    """
+    Invoke the webhook handlers of every Event in ``queryset`` again.
+
+    Events are replayed in creation order, each in its own transaction. Events
+    about the same object are replayed by the same worker, in order.
+
+    :param event_type: Only replay events of this type. ``*`` can be used as a
+        wildcard, eg. ``customer.subscription.*``.
+    :param use_stored_payload: Sync objects from the stored event payloads
+        instead of retrieving them from Stripe.
+    :param on_done: Called with ``(event, exception)`` for every event, see
+        :class:`PartitionedExecutor`.
+    """
+
+    def replay(event):
+        event.use_stored_payload = use_stored_payload
+        event.replayed = True
+        with transaction.atomic():
+            event.invoke_webhook_handlers()
+
+    if event_type:
+        queryset = queryset.filter(type__regex=event_type_regex(event_type))
+
+    with PartitionedExecutor(replay, workers=workers, on_done=on_done) as executor:
+        for event in queryset.order_by("created", "pk").iterator():
+            executor.submit(
+                get_partition_key({"id": event.id, "data": event.data}), event
+            )
+
+
+def replay_webhook_event_triggers(
+    queryset,
+    event_type: str | None = None,
+    workers: int = 1,
+    use_stored_payload: bool = False,
+    on_done: Callable | None = None,
+) -> None:
+    """
+    Process every valid WebhookEventTrigger in ``queryset`` again.
+
+    This is meant for triggers whose processing failed: their Event was rolled
+    back, so processing them creates it and runs its handlers. Triggers are
+    replayed in the order they were received. Each trigger is claimed the way
+    ``WebhookEventTrigger.process_pending()`` claims it, and skipped if it has
+    been processed in the meantime, so replaying doesn't race the
+    ``djstripe_process_webhooks`` worker.
+
+    :param event_type: Only replay triggers for this event type. ``*`` can be
+        used as a wildcard, eg. ``customer.subscription.*``.
+    :param use_stored_payload: Sync objects from the stored payloads instead of
+        retrieving them from Stripe.
+    :param on_done: Called with ``(trigger, exception)`` for every trigger, see
+        :class:`PartitionedExecutor`.
+    """
+
+    type_re = re.compile(event_type_regex(event_type)) if event_type else None
+
+    def replay(trigger):
+        with transaction.atomic():
+            qs = type(trigger).objects.filter(pk=trigger.pk, processed=False)
+            if connection.features.has_select_for_update_skip_locked:
+                qs = qs.select_for_update(skip_locked=True)
+            trigger = qs.first()
+            if trigger is None:
+                # Processed, or being processed, by another worker
+                return
+            succeeded = trigger.process_deferred(use_stored_payload=use_stored_payload)
+        if not succeeded:
+            raise ReplayError(trigger.exception)
+
+    with PartitionedExecutor(replay, workers=workers, on_done=on_done) as executor:
+        for trigger in queryset.filter(valid=True).order_by("pk").iterator():
+            data = trigger.json_body
+            if type_re and not type_re.match(data.get("type", "")):
+                continue
+            executor.submit(get_partition_key(data), trigger)
+
+
+class _CountingHTTPClient:
+    """Wraps a Stripe HTTP client, counting the requests it sends."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def request_with_retries(self, *args, **kwargs):
+        metrics.increment("stripe_api_calls")
+        return self._client.request_with_retries(*args, **kwargs)
+
+    def request_stream_with_retries(self, *args, **kwargs):
+        metrics.increment("stripe_api_calls")
+        return self._client.request_stream_with_retries(*args, **kwargs)
+
+
+@contextmanager
+def count_api_calls():
+    """
+    Count requests made to the Stripe API through ``stripe.default_http_client``
+    while the context is active, in the ``stripe_api_calls`` metric.
+
+    Yields a callable returning the number of requests made so far.
+    """
+    start = metrics.get_count("stripe_api_calls")
+    stripe.ensure_default_http_client()
+    client = stripe.default_http_client
+    stripe.default_http_client = _CountingHTTPClient(client)
+    try:
+        yield lambda: metrics.get_count("stripe_api_calls") - start
+    finally:
+        stripe.default_http_client = client
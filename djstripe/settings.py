@@ -5,6 +5,7 @@ dj-stripe settings
 import stripe
 from django.apps import apps as django_apps
 from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.module_loading import import_string
 
@@ -79,6 +80,184 @@ class DjstripeSettings:
     def WEBHOOK_VALIDATION(self):
         return getattr(settings, "DJSTRIPE_WEBHOOK_VALIDATION", "verify_signature")
 
+    @property
+    def WEBHOOK_DEDUPLICATE(self) -> bool:
+        """
+        Acknowledge valid deliveries of already-processed events without
+        storing another WebhookEventTrigger or processing them again.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_DEDUPLICATE", False)
+
+    @property
+    def WEBHOOK_PROCESSING_MODE(self) -> str:
+        """
+        "sync" processes webhooks in the request that delivered them.
+        "deferred" only stores and validates them; processing is left to the
+        djstripe_process_webhooks worker command.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_PROCESSING_MODE", "sync")
+
+    @property
+    def WEBHOOK_BATCH_WINDOW_MS(self) -> int:
+        """
+        In deferred mode, how long (in milliseconds) incoming webhooks are
+        buffered so that they can be written in a single batch.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS", 5)
+
+    @property
+    def WEBHOOK_BATCH_SIZE(self) -> int:
+        """In deferred mode, the maximum number of webhooks written per batch."""
+        return getattr(settings, "DJSTRIPE_WEBHOOK_BATCH_SIZE", 100)
+
+    @property
+    def WEBHOOK_MAX_ATTEMPTS(self) -> int:
+        """
+        Number of times processing a valid webhook is attempted before it is
+        dead-lettered.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_MAX_ATTEMPTS", 5)
+
+    @property
+    def WEBHOOK_RETRY_BACKOFF(self) -> float:
+        """
+        Seconds to wait before retrying a failed webhook. The delay doubles
+        after every failed attempt.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_RETRY_BACKOFF", 5)
+
+    @property
+    def WEBHOOK_STORAGE(self) -> str:
+        """
+        "full" stores webhook payloads as received. "compact" compresses large
+        WebhookEventTrigger bodies, keeps only allow-listed headers and stores
+        each Event's payload once.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_STORAGE", "full")
+
+    @property
+    def WEBHOOK_HEADERS_ALLOWLIST(self) -> list[str]:
+        """The request headers kept on WebhookEventTriggers in compact storage."""
+        return getattr(
+            settings,
+            "DJSTRIPE_WEBHOOK_HEADERS_ALLOWLIST",
+            [
+                "Content-Type",
+                "Stripe-Signature",
+                "User-Agent",
+                "X-Djstripe-Webhook-Secret",
+            ],
+        )
+
+    @property
+    def WEBHOOK_ENABLED_EVENTS(self) -> str:
+        """
+        "all" subscribes webhook endpoints created by dj-stripe to every event
+        type ("*"). "handled" subscribes them only to the event types that have
+        receivers connected, plus DJSTRIPE_WEBHOOK_EXTRA_EVENTS.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_ENABLED_EVENTS", "all")
+
+    @property
+    def WEBHOOK_EXTRA_EVENTS(self) -> list[str]:
+        """
+        Event types to subscribe webhook endpoints to in "handled" mode even
+        though no receiver is connected to them.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_EXTRA_EVENTS", [])
+
+    @property
+    def WEBHOOK_VALIDATION_CACHE_TIMEOUT(self) -> int:
+        """
+        Seconds for which the result of retrieving an event for the
+        "retrieve_event" validation method is cached. Stripe retries webhooks
+        for up to three days.
+        """
+        return getattr(
+            settings, "DJSTRIPE_WEBHOOK_VALIDATION_CACHE_TIMEOUT", 3 * 24 * 60 * 60
+        )
+
+    @property
+    def PRICE_LOOKUP_KEY_MISSING_TIMEOUT(self) -> int | None:
+        """
+        Seconds for which Price.objects.by_lookup_keys() remembers lookup keys
+        Stripe has no price for, instead of listing them again.
+        """
+        return getattr(settings, "DJSTRIPE_PRICE_LOOKUP_KEY_MISSING_TIMEOUT", 60)
+
+    @property
+    def SYNC_RETRIEVE_WORKERS(self) -> int:
+        """
+        Number of threads retrieving the missing objects referenced by an
+        object being synced. 1 (the default) retrieves them one at a time.
+        """
+        return getattr(settings, "DJSTRIPE_SYNC_RETRIEVE_WORKERS", 1)
+
+    @property
+    def DEFERRED_HYDRATION(self) -> bool:
+        """
+        While processing events, leave nullable foreign keys to objects that
+        are missing from the database null, and queue them for the
+        djstripe_hydrate command instead of retrieving them from Stripe.
+        """
+        return getattr(settings, "DJSTRIPE_DEFERRED_HYDRATION", False)
+
+    @property
+    def CUSTOMER_CACHE_TIMEOUT(self) -> int | None:
+        """
+        Seconds for which the customer of a subscriber is cached for
+        Customer.get_cached_for_subscriber() and request.djstripe_customer.
+        """
+        return getattr(settings, "DJSTRIPE_CUSTOMER_CACHE_TIMEOUT", 60)
+
+    @property
+    def LAZY_STRIPE_DATA(self) -> bool:
+        """
+        Decode the stripe_data of objects loaded from the database on first
+        access rather than when loading them. Read whenever objects are loaded.
+        """
+        return getattr(settings, "DJSTRIPE_LAZY_STRIPE_DATA", False)
+
+    @property
+    def CUSTOMER_BILLING_STATE(self) -> bool:
+        """
+        Maintain a CustomerBillingState row per customer while syncing
+        customers, subscriptions and invoices.
+        """
+        return getattr(settings, "DJSTRIPE_CUSTOMER_BILLING_STATE", False)
+
+    @property
+    def ENTITLEMENTS_CACHE_TIMEOUT(self) -> int | None:
+        """
+        Seconds for which the lookup keys of a customer's active entitlements
+        are cached for Customer.has_entitlement(). The cache is updated by the
+        entitlements summary webhook in the meantime.
+        """
+        return getattr(settings, "DJSTRIPE_ENTITLEMENTS_CACHE_TIMEOUT", 24 * 60 * 60)
+
+    @property
+    def CACHE(self) -> str:
+        """The alias of the Django cache used by dj-stripe."""
+        return getattr(settings, "DJSTRIPE_CACHE", "default")
+
+    @property
+    def EVENT_RETENTION_DAYS(self) -> int | None:
+        """
+        Number of days Events are kept before djstripe_prune deletes them.
+        None (the default) keeps them forever.
+        """
+        return getattr(settings, "DJSTRIPE_EVENT_RETENTION_DAYS", None)
+
+    @property
+    def WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS(self) -> int | dict | None:
+        """
+        Number of days WebhookEventTriggers are kept before djstripe_prune
+        deletes them. Either a number of days, or a dict mapping outcomes
+        ("processed", "valid", "failed", "invalid") to a number of days.
+        None (the default) keeps them forever.
+        """
+        return getattr(settings, "DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS", None)
+
     @property
     def SUBSCRIBER_CUSTOMER_KEY(self):
         return getattr(
@@ -196,6 +375,10 @@ class DjstripeSettings:
         # Livemode is false, use the test secret key
         return self.TEST_API_KEY or self.STRIPE_SECRET_KEY
 
+    def get_cache(self):
+        """Return the Django cache configured with DJSTRIPE_CACHE."""
+        return caches[self.CACHE]
+
     def get_subscriber_model_string(self) -> str:
         """Get the configured subscriber model as a module path string."""
         return getattr(settings, "DJSTRIPE_SUBSCRIBER_MODEL", settings.AUTH_USER_MODEL)
@@ -3,14 +3,31 @@ Utility functions related to the djstripe app.
 """
 
 import datetime
+import threading
+import zlib
+from collections import OrderedDict
 
 import stripe
 from django.apps import apps
 from django.conf import settings
 from django.contrib.humanize.templatetags.humanize import intcomma
+from django.core.exceptions import ImproperlyConfigured
 from django.db.models.query import QuerySet
 from django.utils import timezone
 
+# Which of these is missing depends on the Python version mypy runs with.
+try:
+    # Python 3.14+
+    from compression import zstd as _zstd  # type: ignore[import-not-found, unused-ignore]
+except ImportError:
+    try:
+        import zstandard as _zstd  # type: ignore[import-not-found, no-redef, unused-ignore]
+    except ImportError:
+        _zstd = None  # type: ignore[assignment, unused-ignore]
+
+# Every zstd frame starts with this magic number; zlib streams never do.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
 
 def get_supported_currency_choices(api_key):
     """
@@ -35,6 +52,32 @@ def clear_expired_idempotency_keys():
     IdempotencyKey.objects.filter(created__lt=threshold).delete()
 
 
+def compress_bytes(data: bytes) -> bytes:
+    """
+    Compress ``data`` with zstd when available (Python 3.14+, or the
+    ``dj-stripe[zstd]`` extra), falling back to zlib otherwise.
+    """
+    if _zstd is not None:
+        return _zstd.compress(data)
+    return zlib.compress(data)
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    """
+    Decompress data produced by :func:`compress_bytes`, whichever codec was
+    used to compress it.
+    """
+    data = bytes(data)
+    if data.startswith(_ZSTD_MAGIC):
+        if _zstd is None:
+            raise ImproperlyConfigured(
+                "zstd-compressed data found but no zstd module is available. "
+                "Install dj-stripe[zstd]."
+            )
+        return _zstd.decompress(data)
+    return zlib.decompress(data)
+
+
 def convert_tstamp(response) -> datetime.datetime | None:
     """
     Convert a Stripe API timestamp response (unix epoch) to a native datetime.
@@ -110,3 +153,51 @@ def get_timezone_utc():
     Returns the UTC timezone.
     """
     return datetime.UTC
+
+
+class LRUCache:
+    """
+    A small thread-safe, size-bounded mapping which evicts the least recently
+    used entry once ``maxsize`` is reached.
+
+    Used for process-local caches on hot paths (eg. recently processed event
+    ids) where a round trip to the database or the Django cache is too costly.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return True
+            return False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value=True) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
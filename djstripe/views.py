@@ -55,6 +55,10 @@ class ProcessWebhookView(View):
             request, webhook_endpoint=webhook_endpoint
         )
 
+        if trigger.duplicate:
+            # Already processed: acknowledge without storing anything.
+            return HttpResponse()
+
         if not trigger.valid:
             # Webhook Event did not validate, return 400
             logger.error("Trigger object did not validate")
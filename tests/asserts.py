@@ -30,6 +30,7 @@ COMMON_BLANK_FKS = frozenset(
         # Customer: optional links and back-references
         "djstripe.Customer.coupon",
         "djstripe.Customer.default_payment_method",
+        "djstripe.Customer.djstripe_billing_state (related name)",
         "djstripe.Customer.subscriber",
         # Invoice: default payment options + nested refs
         "djstripe.Invoice.default_payment_method",
@@ -11,6 +11,7 @@ from django.contrib.auth import get_user_model
 from stripe import InvalidRequestError, PermissionError
 
 from djstripe import models
+from djstripe.settings import djstripe_settings
 
 from . import FAKE_CUSTOMER, FAKE_PLATFORM_ACCOUNT
 
@@ -33,6 +34,12 @@ class CreateAccountMixin:
         FAKE_PLATFORM_ACCOUNT.create()
 
 
+@pytest.fixture(autouse=True)
+def clear_djstripe_cache():
+    """Don't leak cached Stripe data between tests."""
+    djstripe_settings.get_cache().clear()
+
+
 def pytest_collection_modifyitems(items, config):
     """Override Pytest config at run-time to run tests using Stripe API only if explictly specified using `-m stripe_api`"""
     # get passed in markers
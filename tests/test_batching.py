@@ -0,0 +1,82 @@
+"""
+dj-stripe Group Commit Buffer Tests.
+"""
+
+import threading
+
+import pytest
+
+from djstripe.batching import GroupCommitBuffer
+
+
+class TestGroupCommitBuffer:
+    def test_single_caller_is_flushed_immediately(self):
+        batches = []
+        buffer = GroupCommitBuffer(batches.append, window=0)
+
+        assert buffer.submit("a") == "a"
+        assert batches == [["a"]]
+
+    def test_concurrent_callers_share_a_batch(self):
+        batches = []
+        release = threading.Event()
+
+        def flush(items):
+            batches.append(list(items))
+
+        buffer = GroupCommitBuffer(flush, window=5, max_size=4)
+
+        def submit(item):
+            release.wait()
+            buffer.submit(item)
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        # Full batches are flushed without waiting for the (long) window
+        assert sorted(item for batch in batches for item in batch) == list(range(8))
+        assert all(len(batch) <= 4 for batch in batches)
+        assert len(batches) < 8
+
+    def test_flush_error_is_raised_in_every_caller(self):
+        def flush(items):
+            raise RuntimeError("database unavailable")
+
+        buffer = GroupCommitBuffer(flush, window=0)
+
+        with pytest.raises(RuntimeError, match="database unavailable"):
+            buffer.submit("a")
+
+        # The failed batch is not reused
+        with pytest.raises(RuntimeError):
+            buffer.submit("b")
+
+    def test_item_error_is_raised_in_its_caller_only(self):
+        release = threading.Event()
+        results = {}
+
+        def flush(items):
+            return {i: ValueError(item) for i, item in enumerate(items) if item == 1}
+
+        buffer = GroupCommitBuffer(flush, window=5, max_size=2)
+
+        def submit(item):
+            release.wait()
+            try:
+                results[item] = buffer.submit(item)
+            except ValueError as e:
+                results[item] = e
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        assert results[0] == 0
+        assert isinstance(results[1], ValueError)
@@ -0,0 +1,85 @@
+"""
+dj-stripe Catalog Tests.
+"""
+
+from copy import deepcopy
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from djstripe.catalog import bump_catalog_version, get_catalog
+from djstripe.models import Price
+
+from . import FAKE_PRICE, FAKE_PRICE_II, FAKE_PRODUCT, FAKE_CUSTOM_ACCOUNT
+from .conftest import CreateAccountMixin
+
+
+class TestCatalog(CreateAccountMixin, TestCase):
+    def setUp(self):
+        price_data = deepcopy(FAKE_PRICE)
+        price_data["lookup_key"] = "gold"
+        product_data = deepcopy(FAKE_PRODUCT)
+        product_data["default_price"] = FAKE_PRICE["id"]
+
+        with patch("stripe.Product.retrieve", return_value=product_data, autospec=True):
+            self.price = Price.sync_from_stripe_data(price_data)
+            Price.sync_from_stripe_data(deepcopy(FAKE_PRICE_II))
+
+    def test_get_catalog(self):
+        catalog = get_catalog()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), catalog)
+            price = catalog.get_price_by_lookup_key("gold", livemode=False)
+            self.assertEqual(price, self.price)
+            self.assertIs(price.product, catalog.get_product(FAKE_PRODUCT["id"]))
+            self.assertEqual(price.tiers, FAKE_PRICE.get("tiers"))
+            self.assertEqual(
+                [price.id for price in catalog.prices_for_product(FAKE_PRODUCT["id"])],
+                [FAKE_PRICE["id"], FAKE_PRICE_II["id"]],
+            )
+            self.assertEqual(catalog.default_price(FAKE_PRODUCT["id"]), self.price)
+
+        self.assertIsNone(catalog.get_price_by_lookup_key("gold", livemode=True))
+        self.assertIsNone(catalog.get_price("price_unknown"))
+
+    def test_lookup_keys_per_account(self):
+        account = FAKE_CUSTOM_ACCOUNT.create()
+        Price.objects.filter(id=FAKE_PRICE_II["id"]).update(
+            djstripe_owner_account=account, lookup_key="gold"
+        )
+
+        catalog = get_catalog()
+        self.assertEqual(
+            catalog.get_price_by_lookup_key("gold", livemode=False), self.price
+        )
+        self.assertEqual(
+            catalog.get_price_by_lookup_key(
+                "gold", livemode=False, stripe_account=account.id
+            ).id,
+            FAKE_PRICE_II["id"],
+        )
+
+    def test_reloaded_on_change(self):
+        catalog = get_catalog()
+
+        Price.objects.filter(id=FAKE_PRICE_II["id"]).delete()
+        # Not reloaded until the version is bumped, once committed
+        self.assertIs(get_catalog(), catalog)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_catalog_version()
+
+        self.assertIsNot(get_catalog(), catalog)
+        catalog = get_catalog()
+        self.assertIsNone(catalog.get_price(FAKE_PRICE_II["id"]))
+
+        price_data = deepcopy(FAKE_PRICE)
+        price_data["lookup_key"] = "platinum"
+        with self.captureOnCommitCallbacks(execute=True):
+            Price.sync_from_stripe_data(price_data)
+
+        catalog = get_catalog()
+        self.assertIsNone(catalog.get_price_by_lookup_key("gold", livemode=False))
+        self.assertEqual(
+            catalog.get_price_by_lookup_key("platinum", livemode=False), self.price
+        )
@@ -1645,6 +1645,23 @@ class TestCustomer(CreateAccountMixin, AssertStripeFksMixin, TestCase):
 
         assert self.customer.is_subscribed_to(product.id)
 
+    @patch("stripe.entitlements.ActiveEntitlement.list", autospec=True)
+    def test_has_entitlement(self, entitlement_list_mock):
+        entitlement_list_mock.return_value.auto_paging_iter.return_value = [
+            {"object": "entitlements.active_entitlement", "lookup_key": "pro"}
+        ]
+
+        self.assertTrue(self.customer.has_entitlement("pro"))
+        self.assertFalse(self.customer.has_entitlement("enterprise"))
+
+        # Listed once, then read from the cache
+        entitlement_list_mock.assert_called_once_with(
+            customer=self.customer.id,
+            api_key=djstripe_settings.STRIPE_SECRET_KEY,
+            stripe_version=djstripe_settings.STRIPE_API_VERSION,
+            stripe_account=self.account.id,
+        )
+
 
 class TestCustomerLegacy(CreateAccountMixin, AssertStripeFksMixin, TestCase):
     def setUp(self):
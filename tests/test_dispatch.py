@@ -0,0 +1,130 @@
+"""
+dj-stripe event dispatch registry tests
+"""
+
+from unittest.mock import Mock
+
+from django.core import checks
+from django.test import TestCase, override_settings
+
+from djstripe import models
+from djstripe.checks import check_webhook_enabled_events
+from djstripe.dispatch import (
+    CrudType,
+    EventRegistry,
+    event_registry,
+    get_enabled_events,
+)
+from djstripe.event_handlers import handle_other_event
+from djstripe.models import Event
+from djstripe.signals import ENABLED_EVENTS, WEBHOOK_SIGNALS
+
+
+class TestEventRegistry(TestCase):
+    def test_routes_every_enabled_event(self):
+        self.assertEqual(len(event_registry), len(ENABLED_EVENTS) - 1)
+        self.assertNotIn("*", event_registry)
+        for route in event_registry:
+            self.assertIs(route.signal, WEBHOOK_SIGNALS[route.type])
+
+    def test_route_of_handled_event(self):
+        route = event_registry.get("price.deleted")
+
+        self.assertEqual(route.crud_type, CrudType.DELETED)
+        self.assertIs(route.target_model, models.Price)
+        self.assertEqual(route.handlers, [handle_other_event])
+        self.assertTrue(route.has_receivers)
+
+    def test_route_of_unhandled_event(self):
+        route = event_registry.get("billing_portal.session.created")
+
+        self.assertIsNone(route.crud_type)
+        self.assertIsNone(route.target_model)
+        self.assertEqual(route.handlers, [])
+        self.assertFalse(route.has_receivers)
+
+    def test_unknown_event_type(self):
+        self.assertIsNone(event_registry.get("not.an.event"))
+
+    def test_register(self):
+        signal = Mock()
+        registry = EventRegistry({"thing.updated": signal})
+
+        def handler(sender, event, **kwargs):
+            pass
+
+        route = registry.register("thing.updated", handler, target_model=Event)
+        registry.register("thing.updated", handler)
+
+        self.assertIs(registry.get("thing.updated"), route)
+        self.assertEqual(route.handlers, [handler])
+        self.assertIs(route.target_model, Event)
+        self.assertEqual(route.crud_type, CrudType.UPDATED)
+
+
+class TestCrudType(TestCase):
+    def test_determine(self):
+        event = Event(type="customer.subscription.deleted")
+
+        self.assertEqual(CrudType.determine(event), CrudType.DELETED)
+        self.assertEqual(CrudType.determine(event, verb="updated"), CrudType.UPDATED)
+        self.assertIsNone(CrudType.determine(event, verb="created"))
+
+
+class TestGetEnabledEvents(TestCase):
+    def test_all(self):
+        self.assertEqual(get_enabled_events(), ["*"])
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled",
+        DJSTRIPE_WEBHOOK_EXTRA_EVENTS=["billing_portal.session.created"],
+    )
+    def test_handled(self):
+        enabled_events = get_enabled_events()
+
+        self.assertEqual(enabled_events, sorted(enabled_events))
+        self.assertIn("customer.subscription.updated", enabled_events)
+        self.assertIn("billing_portal.session.created", enabled_events)
+        self.assertNotIn("billing_portal.configuration.created", enabled_events)
+        self.assertNotIn("*", enabled_events)
+
+    @override_settings(DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled")
+    def test_handled_includes_receivers_connected_directly(self):
+        def handler(sender, event, **kwargs):
+            pass
+
+        signal = WEBHOOK_SIGNALS["billing_portal.configuration.created"]
+        signal.connect(handler, sender=Event)
+        self.addCleanup(signal.disconnect, handler, sender=Event)
+
+        self.assertIn("billing_portal.configuration.created", get_enabled_events())
+
+    def test_signals_sent_without_sender(self):
+        received = []
+
+        def handler(sender, event, **kwargs):
+            received.append(event)
+
+        signal = WEBHOOK_SIGNALS["billing_portal.configuration.created"]
+        signal.connect(handler)
+        self.addCleanup(signal.disconnect, handler)
+
+        signal.send(sender=None, event="evt_1")
+
+        self.assertEqual(received, ["evt_1"])
+
+    @override_settings(DJSTRIPE_WEBHOOK_ENABLED_EVENTS="some")
+    def test_check_invalid_mode(self):
+        messages = check_webhook_enabled_events()
+
+        self.assertEqual([m.id for m in messages], ["djstripe.E005"])
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled",
+        DJSTRIPE_WEBHOOK_EXTRA_EVENTS=["not.an.event"],
+    )
+    def test_check_unknown_extra_events(self):
+        messages = check_webhook_enabled_events()
+
+        self.assertEqual([m.id for m in messages], ["djstripe.E006"])
+        self.assertIsInstance(messages[0], checks.Error)
@@ -56,10 +56,10 @@ class EventTest(CreateAccountMixin, TestCase):
             pass
 
         invoke_webhook_handlers_mock.side_effect = HandlerException
-        real_create_from_stripe_object = Event._create_from_stripe_object
+        real_insert_from_stripe_object = Event._insert_from_stripe_object
 
         def side_effect(*args, **kwargs):
-            return real_create_from_stripe_object(*args, **kwargs)
+            return real_insert_from_stripe_object(*args, **kwargs)
 
         event_data = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
 
@@ -70,20 +70,42 @@ class EventTest(CreateAccountMixin, TestCase):
         with (
             self.assertRaises(HandlerException),
             patch(
-                "djstripe.models.Event._create_from_stripe_object",
+                "djstripe.models.Event._insert_from_stripe_object",
                 side_effect=side_effect,
                 autospec=True,
-            ) as create_from_stripe_object_mock,
+            ) as insert_from_stripe_object_mock,
         ):
             Event.process(data=event_data)
 
-        create_from_stripe_object_mock.assert_called_once_with(
+        insert_from_stripe_object_mock.assert_called_once_with(
             event_data, api_key=djstripe_settings.STRIPE_SECRET_KEY
         )
         self.assertFalse(
             Event.objects.filter(id=FAKE_EVENT_TRANSFER_CREATED["id"]).exists()
         )
 
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_process_event_inserts_without_lookup(
+        self, transfer_retrieve_mock, transfer__attach_object_post_save_hook_mock
+    ):
+        event_data = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+
+        with patch.object(
+            Event.stripe_objects, "get", wraps=Event.stripe_objects.get
+        ) as event_get_mock:
+            event = Event.process(data=event_data)
+
+        event_get_mock.assert_not_called()
+        self.assertEqual(event.id, event_data["id"])
+
+        # A duplicate is answered by a single query
+        with self.assertNumQueries(1):
+            duplicate = Event.process(data=deepcopy(event_data))
+        self.assertEqual(duplicate.pk, event.pk)
+
     #
     # Helpers
     #
@@ -173,11 +195,11 @@ class EventRaceConditionTest(TestCase):
         # the insert fails with an IntegrityError.
         with (
             patch(
-                "django.db.models.query.QuerySet.exists",
-                return_value=False,
+                "django.db.models.query.QuerySet.first",
+                side_effect=[None, event],
             ),
             patch(
-                "djstripe.models.Event._create_from_stripe_object",
+                "djstripe.models.Event._insert_from_stripe_object",
                 side_effect=IntegrityError(
                     "duplicate key value violates unique constraint"
                     ' "djstripe_event_stripe_id_key"'
@@ -212,7 +234,7 @@ class EventRaceConditionTest(TestCase):
         event_data = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
 
         with patch(
-            "djstripe.models.Event._create_from_stripe_object",
+            "djstripe.models.Event._insert_from_stripe_object",
             side_effect=IntegrityError("some unrelated constraint"),
             autospec=True,
         ):
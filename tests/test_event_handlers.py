@@ -850,6 +850,106 @@ class TestCustomerEvents(CreateAccountMixin, EventTestCase):
             customer.currency, fake_stripe_event["data"]["object"]["currency"]
         )
 
+    @patch("stripe.entitlements.ActiveEntitlement.list", autospec=True)
+    @patch("stripe.Customer.retrieve", return_value=FAKE_CUSTOMER, autospec=True)
+    @patch("stripe.Event.retrieve", autospec=True)
+    def test_entitlements_summary_updated(
+        self, event_retrieve_mock, customer_retrieve_mock, entitlement_list_mock
+    ):
+        fake_stripe_event = {
+            "id": "evt_fakefakefakefakefakeent1",
+            "object": "event",
+            "api_version": "2024-06-20",
+            "created": 1439229084,
+            "data": {
+                "object": {
+                    "object": "entitlements.active_entitlement_summary",
+                    "customer": self.customer.id,
+                    "entitlements": {
+                        "object": "list",
+                        "data": [
+                            {
+                                "id": "ent_fakefakefakefakefake01",
+                                "object": "entitlements.active_entitlement",
+                                "feature": "feat_fakefakefakefakefake01",
+                                "livemode": False,
+                                "lookup_key": "pro",
+                            }
+                        ],
+                        "has_more": False,
+                    },
+                    "livemode": False,
+                }
+            },
+            "livemode": False,
+            "pending_webhooks": 0,
+            "request": "req_fakefakefakefa",
+            "type": "entitlements.active_entitlement_summary.updated",
+        }
+        event_retrieve_mock.return_value = fake_stripe_event
+
+        event = Event.sync_from_stripe_data(fake_stripe_event)
+        event.invoke_webhook_handlers()
+
+        customer = Customer.objects.defer("stripe_data").get(id=self.customer.id)
+        self.assertTrue(customer.has_entitlement("pro"))
+        self.assertFalse(customer.has_entitlement("enterprise"))
+        entitlement_list_mock.assert_not_called()
+
+    def _entitlements_summary_event(self, id, created, lookup_key):
+        return {
+            "id": id,
+            "object": "event",
+            "api_version": "2024-06-20",
+            "created": created,
+            "data": {
+                "object": {
+                    "object": "entitlements.active_entitlement_summary",
+                    "customer": self.customer.id,
+                    "entitlements": {
+                        "object": "list",
+                        "data": [
+                            {
+                                "object": "entitlements.active_entitlement",
+                                "lookup_key": lookup_key,
+                            }
+                        ],
+                        "has_more": False,
+                    },
+                    "livemode": False,
+                }
+            },
+            "livemode": False,
+            "pending_webhooks": 0,
+            "request": "req_fakefakefakefa",
+            "type": "entitlements.active_entitlement_summary.updated",
+        }
+
+    @patch("stripe.entitlements.ActiveEntitlement.list", autospec=True)
+    @patch("stripe.Customer.retrieve", return_value=FAKE_CUSTOMER, autospec=True)
+    def test_entitlements_summary_out_of_order(
+        self, customer_retrieve_mock, entitlement_list_mock
+    ):
+        newer = Event.sync_from_stripe_data(
+            self._entitlements_summary_event("evt_ent_newer", 1439229090, "pro")
+        )
+        older = Event.sync_from_stripe_data(
+            self._entitlements_summary_event("evt_ent_older", 1439229084, "basic")
+        )
+        newer.invoke_webhook_handlers()
+        older.invoke_webhook_handlers()
+
+        self.assertTrue(self.customer.has_entitlement("pro"))
+        self.assertFalse(self.customer.has_entitlement("basic"))
+        entitlement_list_mock.assert_not_called()
+
+        # Replaying can't tell whether the summary is outdated
+        older.replayed = True
+        older.invoke_webhook_handlers()
+        entitlement_list_mock.return_value.auto_paging_iter.return_value = []
+        self.assertFalse(self.customer.has_entitlement("pro"))
+        entitlement_list_mock.assert_called_once()
+
     @patch("stripe.Customer.retrieve", autospec=True)
     @patch("stripe.Event.retrieve", autospec=True)
     def test_customer_metadata_created(
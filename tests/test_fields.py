@@ -9,7 +9,12 @@ import pytest
 from django.test.testcases import TestCase
 from django.test.utils import override_settings
 
-from djstripe.fields import StripeDateTimeField, StripeDecimalCurrencyAmountField
+from djstripe.fields import (
+    StripeDateTimeField,
+    StripeDecimalCurrencyAmountField,
+    StripePromotedBooleanField,
+    StripePromotedDateTimeField,
+)
 from djstripe.utils import get_timezone_utc
 from tests.fields.models import ExampleDecimalModel
 
@@ -48,6 +53,33 @@ class TestStripeDateTimeField(TestCase):
         )
 
 
+@override_settings(USE_TZ=get_timezone_utc())
+class TestStripePromotedField(TestCase):
+    def test_stripe_to_db(self):
+        field = StripePromotedDateTimeField(name="period_end", key="current_period_end")
+
+        self.assertEqual(
+            datetime(1997, 9, 18, 7, 48, 35, tzinfo=get_timezone_utc()),
+            field.stripe_to_db({"current_period_end": 874568915}),
+        )
+        self.assertIsNone(field.stripe_to_db({}))
+
+    def test_stripe_to_db_default(self):
+        field = StripePromotedBooleanField(name="flag", key="flag", default=False)
+
+        self.assertIs(field.stripe_to_db({}), False)
+        self.assertIs(field.stripe_to_db({"flag": True}), True)
+
+    def test_deconstruct(self):
+        field = StripePromotedBooleanField(name="flag", key="flag")
+
+        _, _, _, kwargs = field.deconstruct()
+
+        self.assertEqual(kwargs["key"], "flag")
+        self.assertIs(kwargs["db_index"], True)
+        self.assertIs(kwargs["null"], True)
+
+
 class TestStripePercentField:
     @pytest.mark.parametrize(
         "inputted,expected",
@@ -4,16 +4,27 @@ dj-stripe Model Manager Tests.
 
 import datetime
 import decimal
+from contextlib import redirect_stdout
 from copy import deepcopy
+from importlib import import_module
+from io import StringIO
 from unittest.mock import patch
 
+import pytest
+from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
 
+from djstripe.fields import LazyJSON
+from djstripe.management.commands.djstripe_create_indexes import get_indexes
 from djstripe.models import Charge, Customer, Price, Subscription, Transfer
 from djstripe.utils import get_timezone_utc
 
 from . import (
+    FAKE_CUSTOM_ACCOUNT,
     FAKE_PLATFORM_ACCOUNT,
     FAKE_PRICE,
     FAKE_PRICE_II,
@@ -156,6 +167,36 @@ class SubscriptionManagerTest(CreateAccountMixin, TestCase):
         for method in ("active", "canceled", "trialing", "past_due", "incomplete"):
             list(getattr(Subscription.objects, method)())
 
+    def test_status_column_follows_stripe_data(self):
+        subscription = Subscription.objects.get(id="sub_xxxxxxxxxxxxxx0")
+        subscription.stripe_data["status"] = "past_due"
+        subscription.save(update_fields=["stripe_data"])
+
+        self.assertEqual(Subscription.objects.active().count(), 10)
+        self.assertEqual(
+            list(Subscription.objects.past_due().values_list("id", flat=True)),
+            ["sub_xxxxxxxxxxxxxx0"],
+        )
+
+    def test_properties_read_promoted_columns_without_stripe_data(self):
+        subscription = Subscription.objects.defer("stripe_data").get(
+            id="sub_xxxxxxxxxxxxxx11"
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(subscription.status, "canceled")
+            self.assertIs(subscription.cancel_at_period_end, False)
+            self.assertIsNone(subscription.current_period_end)
+
+    def test_populate_promoted_fields(self):
+        migration = import_module("djstripe.migrations.0004_3_0")
+        Subscription.objects.update(stripe_status=None)
+
+        migration.populate_promoted_fields(apps, None)
+
+        self.assertEqual(Subscription.objects.active().count(), 11)
+        self.assertEqual(Subscription.objects.canceled().count(), 1)
+
 
 class TransferManagerTest(TestCase):
     @patch.object(Transfer, "_attach_objects_post_save_hook")
@@ -190,6 +231,141 @@ class TransferManagerTest(TestCase):
         self.assertEqual(totals["total_amount"], 19010)
 
 
+class StripeQuerySetTest(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Transfer.objects.create(
+                id=f"tr_{i}",
+                stripe_data={
+                    "id": f"tr_{i}",
+                    "amount": 100 * i,
+                    "currency": "usd",
+                    "reversed": False,
+                    "transfer_group": None,
+                },
+            )
+
+    def test_with_stripe_fields(self):
+        transfers = Transfer.objects.with_stripe_fields(
+            "amount", "currency", "transfer_group"
+        ).order_by("id")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [
+                    (transfer.amount, transfer.currency, transfer.transfer_group)
+                    for transfer in transfers
+                ],
+                [(0, "usd", None), (100, "usd", None), (200, "usd", None)],
+            )
+
+        transfer = transfers[1]
+        with self.assertNumQueries(1):
+            # Reading a key that wasn't selected loads stripe_data
+            self.assertIs(transfer.reversed, False)
+            self.assertEqual(transfer.stripe_data["id"], "tr_1")
+
+    def test_with_stripe_fields_missing_and_null_keys(self):
+        transfer = Transfer.objects.with_stripe_fields(
+            "transfer_group", "description"
+        ).get(id="tr_1")
+
+        with self.assertNumQueries(0):
+            # transfer_group is null, description is missing
+            self.assertIsNone(transfer.stripe_data["transfer_group"])
+            self.assertIsNone(transfer.stripe_data.get("transfer_group", "default"))
+            self.assertIn("transfer_group", transfer.stripe_data)
+            with self.assertRaises(KeyError):
+                transfer.stripe_data["description"]
+            self.assertEqual(
+                transfer.stripe_data.get("description", "default"), "default"
+            )
+            self.assertNotIn("description", transfer.stripe_data)
+
+    def test_with_stripe_fields_loads_once(self):
+        transfer = Transfer.objects.with_stripe_fields("amount").get(id="tr_1")
+        stripe_data = transfer.stripe_data
+
+        with self.assertNumQueries(1):
+            self.assertEqual(stripe_data["id"], "tr_1")
+            self.assertEqual(stripe_data["currency"], "usd")
+            stripe_data["description"] = "Payout"
+            self.assertEqual(len(stripe_data), len(transfer.stripe_data))
+        self.assertEqual(transfer.stripe_data["description"], "Payout")
+
+    def test_with_stripe_fields_save(self):
+        transfer = Transfer.objects.with_stripe_fields("amount").get(id="tr_1")
+        transfer.metadata = {"order": "1"}
+        transfer.save()
+
+        # stripe_data was deferred, so it isn't overwritten
+        transfer = Transfer.objects.get(id="tr_1")
+        self.assertEqual(transfer.metadata, {"order": "1"})
+        self.assertEqual(transfer.stripe_data["currency"], "usd")
+
+    @override_settings(DJSTRIPE_LAZY_STRIPE_DATA=True)
+    def test_lazy_stripe_data(self):
+        transfer = Transfer.objects.get(id="tr_2")
+        self.assertEqual(transfer.id, "tr_2")
+        self.assertIsInstance(transfer.__dict__["stripe_data"], LazyJSON)
+
+        # Decoded on first access
+        self.assertEqual(transfer.amount, 200)
+        self.assertEqual(transfer.__dict__["stripe_data"]["currency"], "usd")
+
+        transfer.metadata = {"order": "2"}
+        transfer.save()
+        transfer = Transfer.objects.get(id="tr_2")
+        self.assertEqual(transfer.metadata, {"order": "2"})
+        self.assertEqual(transfer.stripe_data["amount"], 200)
+
+    def test_lazy_stripe_data_disabled(self):
+        transfer = Transfer.objects.get(id="tr_2")
+        self.assertEqual(transfer.__dict__["stripe_data"]["amount"], 200)
+
+    @override_settings(DJSTRIPE_LAZY_STRIPE_DATA=True)
+    def test_lazy_stripe_data_values(self):
+        transfers = Transfer.objects.filter(id="tr_1")
+
+        self.assertEqual(transfers.values()[0]["stripe_data"]["amount"], 100)
+        self.assertEqual(
+            transfers.values_list("id", "stripe_data")[0][1]["amount"], 100
+        )
+        self.assertEqual(
+            transfers.values_list("stripe_data", named=True)[0].stripe_data["amount"],
+            100,
+        )
+        self.assertEqual(
+            transfers.values_list("stripe_data", flat=True)[0]["amount"], 100
+        )
+        self.assertEqual(
+            transfers.values_list("stripe_data__amount", flat=True)[0], 100
+        )
+        self.assertEqual(transfers.with_stripe_fields("amount")[0].amount, 100)
+        self.assertEqual(
+            transfers.annotate(data=F("stripe_data"))[0].data["amount"], 100
+        )
+
+    @override_settings(DJSTRIPE_LAZY_STRIPE_DATA=True)
+    def test_lazy_stripe_data_through_relation(self):
+        user = get_user_model().objects.create_user(
+            username="lazy", email="lazy@example.com"
+        )
+        Customer.objects.create(
+            id="cus_lazy", subscriber=user, stripe_data={"id": "cus_lazy"}
+        )
+
+        # Querysets of other models decode it as usual
+        self.assertEqual(
+            get_user_model()
+            .objects.filter(pk=user.pk)
+            .values_list("djstripe_customers__stripe_data", flat=True)[0],
+            {"id": "cus_lazy"},
+        )
+        customer = Customer.objects.select_related("subscriber").get(id="cus_lazy")
+        self.assertEqual(customer.stripe_data, {"id": "cus_lazy"})
+
+
 class ChargeManagerTest(TestCase):
     def setUp(self):
         customer = Customer.objects.create(id="cus_XXXXXXX", livemode=False)
@@ -356,3 +532,143 @@ class ChargeManagerTest(TestCase):
             paid_totals["total_refunded"],
             "Total amount refunded is not correct.",
         )
+
+
+class PriceManagerTest(CreateAccountMixin, TestCase):
+    def setUp(self):
+        price_data = deepcopy(FAKE_PRICE)
+        price_data["lookup_key"] = "gold"
+        with patch(
+            "stripe.Product.retrieve",
+            return_value=deepcopy(FAKE_PRODUCT),
+            autospec=True,
+        ):
+            self.price = Price.sync_from_stripe_data(price_data)
+            Price.sync_from_stripe_data(deepcopy(FAKE_PRICE_II))
+
+    @patch("stripe.Price.list", autospec=True)
+    def test_by_lookup_key(self, price_list_mock):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                Price.objects.by_lookup_key("gold", livemode=False), self.price
+            )
+        price_list_mock.assert_not_called()
+
+        self.assertIsNone(
+            Price.objects.get(id=FAKE_PRICE_II["id"]).lookup_key,
+            "Missing lookup keys should be stored as NULL",
+        )
+
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    @patch("stripe.Price.list", autospec=True)
+    def test_by_lookup_keys_lists_missing(self, price_list_mock, product_retrieve_mock):
+        price_data = deepcopy(FAKE_PRICE_II)
+        price_data["lookup_key"] = "silver"
+        price_list_mock.return_value.auto_paging_iter.return_value = [price_data]
+
+        prices = Price.objects.by_lookup_keys(
+            ["gold", "silver", "bronze"], livemode=False
+        )
+
+        self.assertEqual(set(prices), {"gold", "silver"})
+        self.assertEqual(prices["silver"].id, FAKE_PRICE_II["id"])
+        price_list_mock.assert_called_once()
+        self.assertCountEqual(
+            price_list_mock.call_args.kwargs["lookup_keys"], ["silver", "bronze"]
+        )
+
+        # Found keys are read from the database, missing ones are remembered
+        price_list_mock.reset_mock()
+        prices = Price.objects.by_lookup_keys(
+            ["gold", "silver", "bronze"], livemode=False
+        )
+        self.assertEqual(set(prices), {"gold", "silver"})
+        price_list_mock.assert_not_called()
+
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    def test_lookup_key_transferred(self, product_retrieve_mock):
+        price_data = deepcopy(FAKE_PRICE_II)
+        price_data["lookup_key"] = "gold"
+        price = Price.sync_from_stripe_data(price_data)
+
+        self.assertEqual(price.lookup_key, "gold")
+        self.price.refresh_from_db()
+        self.assertIsNone(self.price.lookup_key)
+        self.assertIsNone(self.price.stripe_data["lookup_key"])
+        self.assertEqual(Price.objects.by_lookup_key("gold", livemode=False), price)
+
+    @patch("stripe.Price.list", autospec=True)
+    def test_by_lookup_key_per_account(self, price_list_mock):
+        price_list_mock.return_value.auto_paging_iter.return_value = []
+        account = FAKE_CUSTOM_ACCOUNT.create()
+        Price.objects.filter(id=FAKE_PRICE_II["id"]).update(
+            djstripe_owner_account=account, lookup_key="gold"
+        )
+
+        self.assertEqual(
+            Price.objects.by_lookup_key("gold", livemode=False), self.price
+        )
+        self.assertEqual(
+            Price.objects.by_lookup_key(
+                "gold", livemode=False, stripe_account=account.id
+            ).id,
+            FAKE_PRICE_II["id"],
+        )
+        price_list_mock.assert_not_called()
+
+        # Missing keys are listed from the account, and remembered per account
+        self.assertIsNone(
+            Price.objects.by_lookup_key(
+                "silver", livemode=False, stripe_account=account.id
+            )
+        )
+        self.assertEqual(price_list_mock.call_args.kwargs["stripe_account"], account.id)
+        price_list_mock.reset_mock()
+        self.assertIsNone(Price.objects.by_lookup_key("silver", livemode=False))
+        price_list_mock.assert_called_once()
+        self.assertNotIn("stripe_account", price_list_mock.call_args.kwargs)
+
+
+class CreateIndexesTest(TransactionTestCase):
+    def test_index_names(self):
+        names = [index.name for _, index in get_indexes()]
+
+        self.assertEqual(len(names), len(set(names)))
+        self.assertTrue(all(len(name) <= 63 for name in names))
+
+    @pytest.mark.skipif(
+        connection.vendor == "postgresql", reason="PostgreSQL creates the indexes"
+    )
+    def test_skipped_on_other_databases(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            call_command("djstripe_create_indexes")
+
+        self.assertIn("only supported on PostgreSQL", out.getvalue())
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="requires PostgreSQL")
+    def test_managers_use_indexes(self):
+        call_command("djstripe_create_indexes", verbosity=0)
+        self.addCleanup(call_command, "djstripe_create_indexes", drop=True, verbosity=0)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        try:
+            self.assertIn(
+                "djstripe_subscription_trial_end_idx",
+                Subscription.objects.expiring_trials().explain(),
+            )
+            self.assertIn(
+                "djstripe_transfer_status_idx", Transfer.objects.pending().explain()
+            )
+            self.assertIn(
+                "djstripe_customer_metadata_gin",
+                Customer.objects.filter(metadata__contains={"plan": "pro"}).explain(),
+            )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("RESET enable_seqscan")
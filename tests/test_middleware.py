@@ -0,0 +1,87 @@
+"""
+dj-stripe Middleware Tests.
+"""
+
+from copy import deepcopy
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+
+from djstripe.middleware import CustomerMiddleware, get_customer
+from djstripe.models import Customer
+from djstripe.settings import djstripe_settings
+
+from . import FAKE_CUSTOMER
+from .conftest import CreateAccountMixin
+
+
+class TestCustomerMiddleware(CreateAccountMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="pydanny", email="pydanny@gmail.com"
+        )
+        self.customer = FAKE_CUSTOMER.create_for_user(self.user)
+        self.middleware = CustomerMiddleware(lambda request: HttpResponse())
+
+    def _request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        self.middleware(request)
+        return request
+
+    def test_djstripe_customer(self):
+        request = self._request(self.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(request.djstripe_customer, self.customer)
+            self.assertEqual(request.djstripe_customer.subscriber, self.user)
+            self.assertEqual(get_customer(request), self.customer)
+
+        # The next request reads it from the cache
+        request = self._request(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(request.djstripe_customer, self.customer)
+
+    def test_djstripe_customer_cache_leaves_out_related_objects(self):
+        self.assertTrue(self._request(self.user).djstripe_customer)
+
+        cached = djstripe_settings.get_cache().get(
+            Customer._subscriber_cache_key(self.user.pk, self.customer.livemode)
+        )
+        self.assertEqual(cached["id"], self.customer.id)
+        self.assertEqual(cached["subscriber_id"], self.user.pk)
+        self.assertNotIn("subscriber", cached)
+        self.assertNotIn("stripe_data", cached)
+
+    def test_djstripe_customer_cleared_on_sync(self):
+        self.assertEqual(
+            self._request(self.user).djstripe_customer.email,
+            "michael.smith@example.com",
+        )
+
+        data = deepcopy(FAKE_CUSTOMER)
+        data["email"] = "pydanny@example.com"
+        Customer.sync_from_stripe_data(data)
+
+        request = self._request(self.user)
+        self.assertEqual(request.djstripe_customer.email, "pydanny@example.com")
+
+    def test_djstripe_customer_anonymous(self):
+        request = self._request(AnonymousUser())
+
+        with self.assertNumQueries(0):
+            self.assertFalse(request.djstripe_customer)
+
+    def test_djstripe_customer_without_customer(self):
+        user = get_user_model().objects.create_user(
+            username="other", email="other@example.com"
+        )
+
+        with patch("stripe.Customer.create", autospec=True) as create_mock:
+            self.assertFalse(self._request(user).djstripe_customer)
+
+        create_mock.assert_not_called()
@@ -6,6 +6,8 @@ from copy import deepcopy
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
 from django.test.client import RequestFactory
 from django.test.testcases import TestCase
 
@@ -77,3 +79,19 @@ class TestSubscriptionMixin(CreateAccountMixin, TestCase):
         self.assertTrue(context["is_prices_plural"], "Incorrect is_prices_plural.")
 
         self.assertIn("customer", context, "customer missing from context.")
+
+    def test_get_context_data_anonymous(self):
+        class TestSuperView:
+            def get_context_data(self):
+                return {}
+
+        class TestView(SubscriptionMixin, TestSuperView):
+            pass
+
+        test_view = TestView()
+
+        test_view.request = RequestFactory()
+        test_view.request.user = AnonymousUser()
+
+        with self.assertRaises(PermissionDenied):
+            test_view.get_context_data()
@@ -0,0 +1,287 @@
+"""
+dj-stripe Event Processing and Replay Tests.
+"""
+
+import json
+import threading
+from copy import deepcopy
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from djstripe.models import Event, TaxId, WebhookEventTrigger
+from djstripe.processing import PartitionedExecutor, event_type_regex
+
+from . import (
+    FAKE_CUSTOMER,
+    FAKE_EVENT_TAX_ID_CREATED,
+    FAKE_EVENT_TAX_ID_UPDATED,
+    FAKE_TAX_ID,
+)
+from .conftest import CreateAccountMixin
+
+
+class TestPartitionedExecutor:
+    def test_single_worker_runs_inline(self):
+        threads = []
+        executor = PartitionedExecutor(
+            lambda item: threads.append(threading.current_thread())
+        )
+        with executor:
+            executor.submit("obj_1", 1)
+
+        assert threads == [threading.current_thread()]
+        assert executor.watermark == 1
+
+    def test_items_are_ordered_per_key(self):
+        handled = []
+        lock = threading.Lock()
+
+        def process(item):
+            key, index = item
+            with lock:
+                handled.append((key, index, threading.current_thread().name))
+
+        with PartitionedExecutor(process, workers=4) as executor:
+            for index in range(50):
+                for key in ("obj_a", "obj_b", "obj_c"):
+                    executor.submit(key, (key, index))
+
+        assert len(handled) == 150
+        for key in ("obj_a", "obj_b", "obj_c"):
+            entries = [entry for entry in handled if entry[0] == key]
+            assert [entry[1] for entry in entries] == list(range(50))
+            # Every item of a key went to the same worker
+            assert len({entry[2] for entry in entries}) == 1
+
+    def test_errors_are_reported_and_do_not_stop_processing(self):
+        results = []
+
+        def process(item):
+            if item == 2:
+                raise ValueError("boom")
+
+        executor = PartitionedExecutor(
+            process, workers=2, on_done=lambda item, e: results.append((item, e))
+        )
+        with executor:
+            for item in range(4):
+                executor.submit(str(item), item)
+
+        assert sorted(item for item, _ in results) == [0, 1, 2, 3]
+        errors = {item: e for item, e in results if e is not None}
+        assert list(errors) == [2]
+        assert str(errors[2]) == "boom"
+        assert executor.watermark == 3
+
+    def test_watermark_waits_for_earlier_items(self):
+        release = threading.Event()
+
+        def process(item):
+            if item == 0:
+                release.wait(timeout=10)
+
+        second_done = threading.Event()
+        executor = PartitionedExecutor(
+            process, workers=2, on_done=lambda item, e: item == 1 and second_done.set()
+        )
+        # "a" and "d" are on different workers
+        assert executor.partition("a") != executor.partition("d")
+        executor.submit("a", 0)
+        executor.submit("d", 1)
+        assert second_done.wait(timeout=10)
+
+        assert executor.watermark is None
+        release.set()
+        executor.close()
+        assert executor.watermark == 1
+
+
+class TestProcessEventsCommand:
+    def _events(self, count, start=0):
+        return [
+            {"id": f"evt_{i}", "data": {"object": {"id": f"obj_{i % 3}"}}}
+            for i in range(start, start + count)
+        ]
+
+    @patch.object(Event, "process")
+    @patch.object(Event, "api_list")
+    def test_interrupted_run_can_be_resumed(
+        self, api_list_mock, process_mock, tmp_path
+    ):
+        cursor_file = str(tmp_path / "cursor")
+
+        def process(data):
+            if data["id"] == "evt_5":
+                raise KeyboardInterrupt
+
+        process_mock.side_effect = process
+        api_list_mock.return_value = iter(self._events(10))
+
+        with pytest.raises(KeyboardInterrupt):
+            call_command(
+                "djstripe_process_events",
+                type="customer.*",
+                cursor_file=cursor_file,
+                verbosity=0,
+            )
+
+        with open(cursor_file) as f:
+            assert json.load(f) == {
+                "starting_after": "evt_4",
+                "filters": {"type": "customer.*"},
+            }
+
+        with pytest.raises(CommandError, match="different filters"):
+            call_command(
+                "djstripe_process_events",
+                resume=True,
+                cursor_file=cursor_file,
+                verbosity=0,
+            )
+
+        process_mock.side_effect = None
+        api_list_mock.reset_mock()
+        api_list_mock.return_value = iter(self._events(5, start=5))
+        call_command(
+            "djstripe_process_events",
+            type="customer.*",
+            resume=True,
+            cursor_file=cursor_file,
+            verbosity=0,
+        )
+
+        api_list_mock.assert_called_once_with(type="customer.*", starting_after="evt_4")
+        assert not (tmp_path / "cursor").exists()
+
+    @patch.object(Event, "process")
+    @patch.object(Event, "api_list")
+    def test_report(self, api_list_mock, process_mock, tmp_path, capsys):
+        process_mock.side_effect = lambda data: data["id"] == "evt_1" and 1 / 0
+        api_list_mock.return_value = iter(self._events(4))
+
+        call_command(
+            "djstripe_process_events",
+            workers=2,
+            cursor_file=str(tmp_path / "cursor"),
+        )
+
+        output = capsys.readouterr().out
+        assert "Processed 3 out of 4 Events" in output
+        assert "0.00 API calls/event, 1 failed" in output
+
+
+class TestReplayEventsCommand(CreateAccountMixin, TestCase):
+    def setUp(self):
+        customer_patcher = patch(
+            "stripe.Customer.retrieve",
+            return_value=deepcopy(FAKE_CUSTOMER),
+            autospec=True,
+        )
+        customer_patcher.start()
+        self.addCleanup(customer_patcher.stop)
+
+        self.event = Event.sync_from_stripe_data(deepcopy(FAKE_EVENT_TAX_ID_UPDATED))
+
+    @patch("stripe.TaxId.retrieve", autospec=True)
+    def test_replay_stored_events_with_stored_payload(self, tax_id_retrieve_mock):
+        call_command(
+            "djstripe_replay_events",
+            type="customer.tax_id.*",
+            use_stored_payload=True,
+            verbosity=0,
+        )
+
+        tax_id_retrieve_mock.assert_not_called()
+        tax_id = TaxId.objects.get()
+        self.assertEqual(tax_id.verification["status"], "verified")
+
+    @patch("stripe.TaxId.retrieve", autospec=True)
+    def test_replay_stored_payload_keeps_newer_state(self, tax_id_retrieve_mock):
+        fake_event = deepcopy(FAKE_EVENT_TAX_ID_CREATED)
+        fake_event["created"] -= 60
+        Event.sync_from_stripe_data(fake_event)
+        call_command(
+            "djstripe_replay_events",
+            type="customer.tax_id.updated",
+            use_stored_payload=True,
+            verbosity=0,
+        )
+
+        call_command(
+            "djstripe_replay_events",
+            type="customer.tax_id.created",
+            use_stored_payload=True,
+            verbosity=0,
+        )
+
+        tax_id_retrieve_mock.assert_not_called()
+        tax_id = TaxId.objects.get()
+        self.assertEqual(tax_id.verification["status"], "verified")
+
+    @patch("stripe.TaxId.retrieve", autospec=True)
+    def test_replay_filters(self, tax_id_retrieve_mock):
+        call_command(
+            "djstripe_replay_events",
+            type="customer.created",
+            use_stored_payload=True,
+            verbosity=0,
+        )
+        call_command(
+            "djstripe_replay_events",
+            until="2015-01-01",
+            use_stored_payload=True,
+            verbosity=0,
+        )
+
+        self.assertFalse(TaxId.objects.exists())
+
+    @patch("stripe.TaxId.retrieve", autospec=True)
+    def test_replay_failed_webhooks(self, tax_id_retrieve_mock):
+        fake_event = deepcopy(FAKE_EVENT_TAX_ID_CREATED)
+        trigger = WebhookEventTrigger.objects.create(
+            remote_ip="127.0.0.1",
+            headers={},
+            body=json.dumps(fake_event),
+            valid=True,
+            exception="KeyError",
+        )
+
+        call_command(
+            "djstripe_replay_events", failed=True, use_stored_payload=True, verbosity=0
+        )
+
+        tax_id_retrieve_mock.assert_not_called()
+        trigger.refresh_from_db()
+        self.assertTrue(trigger.processed)
+        self.assertEqual(trigger.exception, "")
+        self.assertEqual(trigger.event.id, fake_event["id"])
+        self.assertTrue(TaxId.objects.filter(id=FAKE_TAX_ID["id"]).exists())
+
+    @patch("stripe.TaxId.retrieve", autospec=True)
+    def test_replay_failed_webhooks_skips_pending(self, tax_id_retrieve_mock):
+        # Stored in deferred mode, waiting for djstripe_process_webhooks
+        trigger = WebhookEventTrigger.objects.create(
+            remote_ip="127.0.0.1",
+            headers={},
+            body=json.dumps(deepcopy(FAKE_EVENT_TAX_ID_CREATED)),
+            valid=True,
+        )
+
+        call_command(
+            "djstripe_replay_events", failed=True, use_stored_payload=True, verbosity=0
+        )
+
+        trigger.refresh_from_db()
+        self.assertFalse(trigger.processed)
+        self.assertIsNone(trigger.event)
+
+    def test_event_type_regex(self):
+        regex = event_type_regex("customer.subscription.*")
+        self.assertRegex("customer.subscription.updated", regex)
+        self.assertNotRegex("customer.subscriptionXupdated", regex)
+        self.assertNotRegex("customer.created", regex)
+        self.assertRegex("invoice.paid", event_type_regex("invoice.paid"))
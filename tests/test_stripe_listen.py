@@ -7,22 +7,22 @@ from urllib.parse import urlsplit
 from uuid import UUID
 
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 FIXED_UUID = UUID("12345678-1234-5678-1234-567812345678")
 COMMAND = "djstripe.management.commands.stripe_listen"
 
 
-def run_stripe_listen():
+def run_stripe_listen_command():
     """
     Run the command with the Stripe CLI subprocess mocked out, returning the
-    URL that gets passed to ``stripe listen --forward-to``.
+    arguments of the ``stripe listen --forward-to`` call.
     """
     captured = {}
 
     def fake_run(cmd, *args, **kwargs):
-        captured["forward_to"] = cmd[cmd.index("--forward-to") + 1]
+        captured["cmd"] = cmd
         return MagicMock()
 
     # Mock `stripe listen --print-secret`: first stdout line is the secret.
@@ -38,7 +38,13 @@ def run_stripe_listen():
     ):
         call_command("stripe_listen")
 
-    return captured["forward_to"]
+    return captured["cmd"]
+
+
+def run_stripe_listen():
+    """Return the URL that gets passed to ``stripe listen --forward-to``."""
+    cmd = run_stripe_listen_command()
+    return cmd[cmd.index("--forward-to") + 1]
 
 
 class TestStripeListenCommand(TestCase):
@@ -67,3 +73,18 @@ class TestStripeListenCommand(TestCase):
 
         self.assertNotIn("//", urlsplit(url).path, url)
         self.assertEqual(url, f"http://localhost:8000/djstripe/webhook/{FIXED_UUID}")
+
+
+class TestStripeListenEnabledEvents(TestCase):
+    def test_all_events(self):
+        cmd = run_stripe_listen_command()
+
+        self.assertNotIn("--events", cmd)
+
+    @override_settings(DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled")
+    def test_handled_events(self):
+        cmd = run_stripe_listen_command()
+
+        events = cmd[cmd.index("--events") + 1].split(",")
+        self.assertIn("customer.subscription.updated", events)
+        self.assertNotIn("billing_portal.session.created", events)
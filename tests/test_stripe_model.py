@@ -2,14 +2,38 @@
 dj-stripe StripeModel Model Tests.
 """
 
+from copy import deepcopy
 from unittest.mock import MagicMock, patch
 
 import pytest
-from django.test import TestCase
-
-from djstripe.models import Account, Customer, StripeModel
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from stripe import APIConnectionError, InvalidRequestError
+
+from djstripe.models import (
+    Account,
+    Charge,
+    Customer,
+    HydrationTask,
+    Invoice,
+    PaymentMethod,
+    StripeModel,
+    TaxRate,
+)
+from djstripe.models.base import (
+    _get_from_sync_scope,
+    _pop_retrieved_from_sync_scope,
+    deferred_hydration,
+    sync_scope,
+)
 from djstripe.settings import djstripe_settings
 
+from . import FAKE_CUSTOMER, FAKE_PAYMENT_METHOD_I, FAKE_TAX_RATE_EXAMPLE_1_VAT
+from .conftest import CreateAccountMixin
+
 pytestmark = pytest.mark.django_db
 
 
@@ -297,3 +321,328 @@ def test__find_owner_account_for_webhook_event_trigger(
             mock_get_or_retrieve_for_api_key.assert_called_once_with(
                 djstripe_settings.STRIPE_SECRET_KEY
             )
+
+
+class TestSyncScope(CreateAccountMixin, TestCase):
+    def setUp(self):
+        self.tax_rate = TaxRate.sync_from_stripe_data(
+            deepcopy(FAKE_TAX_RATE_EXAMPLE_1_VAT)
+        )
+
+    def test_objects_are_resolved_once_per_scope(self):
+        with sync_scope():
+            with self.assertNumQueries(1):
+                tax_rate = TaxRate._get_or_retrieve(id=self.tax_rate.id)
+                self.assertIs(TaxRate._get_or_retrieve(id=self.tax_rate.id), tax_rate)
+                self.assertIs(
+                    TaxRate._get_or_create_from_stripe_object(
+                        deepcopy(FAKE_TAX_RATE_EXAMPLE_1_VAT), refetch=False
+                    )[0],
+                    tax_rate,
+                )
+
+        # The identity map is discarded with the scope
+        with self.assertNumQueries(2):
+            self.assertIsNot(TaxRate._get_or_retrieve(id=self.tax_rate.id), tax_rate)
+            TaxRate._get_or_retrieve(id=self.tax_rate.id)
+
+    def test_nested_scopes_share_objects(self):
+        with sync_scope():
+            tax_rate = TaxRate._get_or_retrieve(id=self.tax_rate.id)
+            with sync_scope(), self.assertNumQueries(0):
+                self.assertIs(TaxRate._get_or_retrieve(id=self.tax_rate.id), tax_rate)
+
+    def test_sync_updates_the_scoped_instance(self):
+        data = deepcopy(FAKE_TAX_RATE_EXAMPLE_1_VAT)
+        data["display_name"] = "VAT (updated)"
+
+        with sync_scope():
+            tax_rate = TaxRate._get_or_retrieve(id=self.tax_rate.id)
+            synced = TaxRate.sync_from_stripe_data(data)
+
+        self.assertIs(synced, tax_rate)
+        self.assertEqual(tax_rate.display_name, "VAT (updated)")
+
+    def test_integrity_error_discards_scope(self):
+        with sync_scope():
+            tax_rate = TaxRate._get_or_retrieve(id=self.tax_rate.id)
+            with (
+                patch.object(
+                    TaxRate,
+                    "_create_from_stripe_object",
+                    side_effect=IntegrityError,
+                ),
+                patch("djstripe.models.base._get_from_sync_scope", return_value=None),
+            ):
+                TaxRate.stripe_objects.filter(id=self.tax_rate.id).delete()
+                with self.assertRaises(TaxRate.DoesNotExist):
+                    TaxRate._get_or_create_from_stripe_object(
+                        deepcopy(FAKE_TAX_RATE_EXAMPLE_1_VAT), refetch=False
+                    )
+
+            # tax_rate was dropped from the identity map with the rollback
+            with self.assertRaises(TaxRate.DoesNotExist):
+                TaxRate.objects.get(id=tax_rate.id)
+            self.assertIsNone(_get_from_sync_scope(TaxRate, tax_rate.id))
+
+
+class TestPrefetchRelatedObjects(CreateAccountMixin, TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="pydanny", email="pydanny@gmail.com"
+        )
+        self.customer = FAKE_CUSTOMER.create_for_user(user)
+
+    def test_prefetch_existing_objects_in_bulk(self):
+        records = [
+            {"customer": self.customer.id, "invoice": "in_missing0001"},
+            {"customer": {"id": self.customer.id}, "invoice": "in_missing0002"},
+            {"customer": None},
+        ]
+
+        with sync_scope():
+            # One in_bulk query for customers and one for invoices
+            with self.assertNumQueries(2):
+                Charge._prefetch_related_objects(records)
+
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    Customer._get_or_retrieve(id=self.customer.id), self.customer
+                )
+
+    def test_prefetch_outside_sync_scope(self):
+        with self.assertNumQueries(0):
+            Charge._prefetch_related_objects([{"customer": self.customer.id}])
+
+    @override_settings(DJSTRIPE_SYNC_RETRIEVE_WORKERS=4)
+    @patch.object(Invoice, "api_retrieve")
+    def test_prefetch_retrieves_missing_objects_concurrently(self, api_retrieve_mock):
+        api_retrieve_mock.side_effect = lambda **kwargs: {"object": "invoice"}
+        records = [{"invoice": "in_missing0001"}, {"invoice": "in_missing0002"}]
+
+        with sync_scope():
+            Charge._prefetch_related_objects(records)
+
+            self.assertEqual(api_retrieve_mock.call_count, 2)
+            self.assertEqual(
+                _pop_retrieved_from_sync_scope(Invoice, "in_missing0001"),
+                {"object": "invoice"},
+            )
+            # Prefetched data is only used once
+            self.assertIsNone(_pop_retrieved_from_sync_scope(Invoice, "in_missing0001"))
+
+    @patch.object(Invoice, "api_retrieve")
+    def test_prefetch_does_not_retrieve_by_default(self, api_retrieve_mock):
+        records = [{"invoice": "in_missing0001"}, {"invoice": "in_missing0002"}]
+
+        with sync_scope():
+            Charge._prefetch_related_objects(records)
+
+        api_retrieve_mock.assert_not_called()
+
+
+@override_settings(DJSTRIPE_DEFERRED_HYDRATION=True)
+class TestDeferredHydration(CreateAccountMixin, TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="pydanny", email="pydanny@gmail.com"
+        )
+        self.customer = FAKE_CUSTOMER.create_for_user(user)
+        self.field = Customer._meta.get_field("default_payment_method")
+        self.data = {
+            "id": self.customer.id,
+            "default_payment_method": FAKE_PAYMENT_METHOD_I["id"],
+        }
+
+    @patch.object(PaymentMethod, "api_retrieve")
+    def test_missing_object_is_queued(self, api_retrieve_mock):
+        with deferred_hydration():
+            result = Customer._stripe_object_field_to_foreign_key(
+                field=self.field, manipulated_data=self.data
+            )
+
+        self.assertEqual(result, (None, False, False))
+        api_retrieve_mock.assert_not_called()
+        task = HydrationTask.objects.get()
+        self.assertEqual(task.model, "djstripe.Customer")
+        self.assertEqual(task.object_id, self.customer.id)
+        self.assertEqual(task.field_name, "default_payment_method")
+        self.assertEqual(task.target_id, FAKE_PAYMENT_METHOD_I["id"])
+
+    def test_existing_object_is_linked(self):
+        payment_method = PaymentMethod.sync_from_stripe_data(
+            deepcopy(FAKE_PAYMENT_METHOD_I)
+        )
+
+        with deferred_hydration():
+            result = Customer._stripe_object_field_to_foreign_key(
+                field=self.field, manipulated_data=self.data
+            )
+
+        self.assertEqual(result, (payment_method, False, False))
+        self.assertFalse(HydrationTask.objects.exists())
+
+    @patch.object(PaymentMethod, "api_retrieve")
+    def test_nested_object_is_synced(self, api_retrieve_mock):
+        data = {
+            "id": self.customer.id,
+            "default_payment_method": deepcopy(FAKE_PAYMENT_METHOD_I),
+        }
+
+        with deferred_hydration():
+            field_data, _, _ = Customer._stripe_object_field_to_foreign_key(
+                field=self.field, manipulated_data=data
+            )
+
+        api_retrieve_mock.assert_not_called()
+        self.assertEqual(field_data.id, FAKE_PAYMENT_METHOD_I["id"])
+        self.assertTrue(
+            PaymentMethod.objects.filter(id=FAKE_PAYMENT_METHOD_I["id"]).exists()
+        )
+        self.assertFalse(HydrationTask.objects.exists())
+
+    @patch.object(PaymentMethod, "_get_or_create_from_stripe_object")
+    def test_not_deferred_outside_event_processing(self, get_or_create_mock):
+        get_or_create_mock.return_value = (None, False)
+
+        Customer._stripe_object_field_to_foreign_key(
+            field=self.field, manipulated_data=self.data
+        )
+
+        get_or_create_mock.assert_called_once()
+        self.assertFalse(HydrationTask.objects.exists())
+
+    def test_hydrate(self):
+        HydrationTask.enqueue(
+            Customer,
+            self.customer.id,
+            "default_payment_method",
+            FAKE_PAYMENT_METHOD_I["id"],
+        )
+
+        with patch(
+            "stripe.PaymentMethod.retrieve",
+            return_value=deepcopy(FAKE_PAYMENT_METHOD_I),
+            autospec=True,
+        ):
+            call_command("djstripe_hydrate", verbosity=0)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(
+            self.customer.default_payment_method.id, FAKE_PAYMENT_METHOD_I["id"]
+        )
+        self.assertFalse(HydrationTask.objects.exists())
+
+    def test_hydrate_failure(self):
+        task = HydrationTask.enqueue(
+            Customer,
+            self.customer.id,
+            "default_payment_method",
+            FAKE_PAYMENT_METHOD_I["id"],
+        )
+
+        with patch(
+            "stripe.PaymentMethod.retrieve",
+            side_effect=APIConnectionError("Boom!"),
+            autospec=True,
+        ):
+            self.assertEqual(HydrationTask.hydrate_pending(), (0, 1))
+            self.assertEqual(HydrationTask.hydrate_pending(max_attempts=1), (0, 0))
+
+        task.refresh_from_db()
+        self.assertEqual(task.attempt_count, 1)
+        self.assertEqual(task.last_error, "Boom!")
+
+    def test_hydrate_absent_object(self):
+        HydrationTask.enqueue(
+            Customer,
+            self.customer.id,
+            "default_payment_method",
+            FAKE_PAYMENT_METHOD_I["id"],
+        )
+
+        with patch(
+            "stripe.PaymentMethod.retrieve",
+            side_effect=InvalidRequestError(
+                "No such PaymentMethod: 'pm_fakefakefakefake0001'",
+                "id",
+                code="resource_missing",
+            ),
+            autospec=True,
+        ):
+            self.assertEqual(HydrationTask.hydrate_pending(), (1, 0))
+
+        self.customer.refresh_from_db()
+        self.assertIsNone(self.customer.default_payment_method)
+        self.assertFalse(HydrationTask.objects.exists())
+
+
+class TestPendingRelations(CreateAccountMixin, TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="pydanny", email="pydanny@gmail.com"
+        )
+        self.customer = FAKE_CUSTOMER.create_for_user(user)
+        self.payment_method = PaymentMethod.sync_from_stripe_data(
+            deepcopy(FAKE_PAYMENT_METHOD_I)
+        )
+        self.field = Customer._meta.get_field("default_payment_method")
+
+    def test_attach_pending_relations(self):
+        other = ("cus_fakefakefakefake0002", self.field)
+        pending_relations = {
+            self.payment_method.id: [(self.customer.id, self.field)],
+            "pm_fakefakefakefake0002": [other],
+        }
+
+        with sync_scope():
+            customer = Customer._get_or_retrieve(id=self.customer.id)
+            # A single UPDATE, no reload
+            with self.assertNumQueries(1):
+                StripeModel._attach_objects_post_save_hook(
+                    self.payment_method,
+                    PaymentMethod,
+                    {},
+                    pending_relations=pending_relations,
+                )
+
+        self.assertEqual(pending_relations, {"pm_fakefakefakefake0002": [other]})
+        self.assertEqual(customer.default_payment_method, self.payment_method)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.default_payment_method, self.payment_method)
+
+    def test_attach_pending_relations_sends_save_signals(self):
+        saved = []
+
+        def receiver(sender, instance, update_fields, **kwargs):
+            saved.append((instance.id, update_fields))
+
+        post_save.connect(receiver, sender=Customer)
+        self.addCleanup(post_save.disconnect, receiver, sender=Customer)
+
+        self.payment_method._attach_pending_relations([(self.customer.id, self.field)])
+
+        self.assertEqual(
+            saved,
+            [
+                (
+                    self.customer.id,
+                    frozenset({"default_payment_method", "djstripe_updated"}),
+                )
+            ],
+        )
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.default_payment_method, self.payment_method)
+
+    def test_attach_pending_relations_updates_cached_objects(self):
+        payment_method = PaymentMethod.objects.select_related("customer").get(
+            id=self.payment_method.id
+        )
+
+        payment_method._attach_pending_relations([(self.customer.id, self.field)])
+
+        # payment_method.customer.default_payment_method is set without a reload
+        with self.assertNumQueries(0):
+            self.assertIs(
+                payment_method.customer.default_payment_method, payment_method
+            )
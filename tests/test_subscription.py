@@ -10,12 +10,20 @@ import pytest
 import stripe
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from stripe import InvalidRequestError
 
 from djstripe.enums import SubscriptionStatus
-from djstripe.models import LineItem, Product, Subscription, SubscriptionItem
+from djstripe.models import (
+    Customer,
+    CustomerBillingState,
+    LineItem,
+    Product,
+    Subscription,
+    SubscriptionItem,
+)
 from djstripe.models.billing import Invoice
 
 from . import (
@@ -228,6 +236,35 @@ class SubscriptionTest(CreateAccountMixin, AssertStripeFksMixin, TestCase):
 
         self.assert_fks(subscription)
 
+    @patch("stripe.Plan.retrieve", return_value=deepcopy(FAKE_PLAN), autospec=True)
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    @patch(
+        "stripe.Customer.retrieve", return_value=deepcopy(FAKE_CUSTOMER), autospec=True
+    )
+    def test_customer_subscription_checks_query_count(
+        self, customer_retrieve_mock, product_retrieve_mock, plan_retrieve_mock
+    ):
+        subscription = Subscription.sync_from_stripe_data(deepcopy(FAKE_SUBSCRIPTION))
+        _set_period_end(subscription, timezone.now() + timezone.timedelta(days=7))
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.customer.is_subscribed_to(FAKE_PRODUCT["id"]))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.customer.is_subscribed_to("prod_unknown"))
+        with self.assertNumQueries(1):
+            self.assertTrue(self.customer.has_any_active_subscription())
+
+        customers = list(Customer.objects.with_subscriptions())
+        with self.assertNumQueries(0):
+            for customer in customers:
+                self.assertTrue(customer.is_subscribed_to(FAKE_PRODUCT["id"]))
+                self.assertFalse(customer.is_subscribed_to("prod_unknown"))
+                self.assertTrue(customer.has_any_active_subscription())
+                self.assertEqual(customer.active_subscriptions, [subscription])
+                self.assertEqual(customer.valid_subscriptions, [subscription])
+
     @patch("stripe.Plan.retrieve", return_value=deepcopy(FAKE_PLAN), autospec=True)
     @patch(
         "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
@@ -1145,3 +1182,83 @@ class StaleSubscriptionItemRegressionTest(CreateAccountMixin, TestCase):
 
         self.assertEqual(line_item.id, "il_test_2105")
         self.assertIsNone(line_item.subscription_item)
+
+
+@override_settings(DJSTRIPE_CUSTOMER_BILLING_STATE=True)
+class CustomerBillingStateTest(CreateAccountMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="pydanny", email="pydanny@gmail.com"
+        )
+        self.customer = FAKE_CUSTOMER.create_for_user(self.user)
+
+    @patch("stripe.Plan.retrieve", return_value=deepcopy(FAKE_PLAN), autospec=True)
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    @patch(
+        "stripe.Customer.retrieve", return_value=deepcopy(FAKE_CUSTOMER), autospec=True
+    )
+    def test_maintained_on_sync(
+        self, customer_retrieve_mock, product_retrieve_mock, plan_retrieve_mock
+    ):
+        subscription = Subscription.sync_from_stripe_data(deepcopy(FAKE_SUBSCRIPTION))
+
+        state = CustomerBillingState.objects.get(subscriber=self.user)
+        self.assertEqual(state.customer, self.customer)
+        self.assertEqual(state.subscription_id, subscription.id)
+        self.assertEqual(state.status, SubscriptionStatus.active)
+        self.assertEqual(state.price_ids, [FAKE_PLAN["id"]])
+        self.assertEqual(state.product_ids, [FAKE_PRODUCT["id"]])
+        self.assertEqual(state.current_period_end, subscription.current_period_end)
+        self.assertFalse(state.delinquent)
+
+        Subscription.sync_from_stripe_data(deepcopy(FAKE_SUBSCRIPTION_CANCELED))
+
+        state.refresh_from_db()
+        self.assertEqual(state.subscription_id, "")
+        self.assertEqual(state.status, "")
+        self.assertEqual(state.price_ids, [])
+        self.assertFalse(state.is_active)
+
+    @patch("stripe.Plan.retrieve", return_value=deepcopy(FAKE_PLAN), autospec=True)
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    @patch(
+        "stripe.Customer.retrieve", return_value=deepcopy(FAKE_CUSTOMER), autospec=True
+    )
+    def test_delinquent(
+        self, customer_retrieve_mock, product_retrieve_mock, plan_retrieve_mock
+    ):
+        subscription_fake = deepcopy(FAKE_SUBSCRIPTION)
+        subscription_fake["status"] = SubscriptionStatus.past_due
+        Subscription.sync_from_stripe_data(subscription_fake)
+
+        state = CustomerBillingState.objects.get(customer=self.customer)
+        self.assertEqual(state.status, SubscriptionStatus.past_due)
+        self.assertTrue(state.delinquent)
+        self.assertFalse(state.is_active)
+
+    @patch("stripe.Plan.retrieve", return_value=deepcopy(FAKE_PLAN), autospec=True)
+    @patch(
+        "stripe.Product.retrieve", return_value=deepcopy(FAKE_PRODUCT), autospec=True
+    )
+    @patch(
+        "stripe.Customer.retrieve", return_value=deepcopy(FAKE_CUSTOMER), autospec=True
+    )
+    def test_rebuild_command(
+        self, customer_retrieve_mock, product_retrieve_mock, plan_retrieve_mock
+    ):
+        with override_settings(DJSTRIPE_CUSTOMER_BILLING_STATE=False):
+            subscription = Subscription.sync_from_stripe_data(
+                deepcopy(FAKE_SUBSCRIPTION)
+            )
+        _set_period_end(subscription, timezone.now() + timezone.timedelta(days=7))
+        CustomerBillingState.objects.all().delete()
+
+        call_command("djstripe_rebuild_billing_state", verbosity=0)
+
+        state = CustomerBillingState.objects.get(customer=self.customer)
+        self.assertEqual(state.subscription_id, subscription.id)
+        self.assertTrue(state.is_active)
@@ -3,6 +3,7 @@ dj-stripe Utilities Tests.
 """
 
 import time
+import zlib
 from datetime import datetime
 from decimal import Decimal
 from unittest import skipIf
@@ -12,7 +13,10 @@ from django.test import TestCase
 from django.test.utils import override_settings
 
 from djstripe.utils import (
+    LRUCache,
+    compress_bytes,
     convert_tstamp,
+    decompress_bytes,
     get_friendly_currency_amount,
     get_supported_currency_choices,
     get_timezone_utc,
@@ -79,3 +83,30 @@ class TestUtils(TestCase):
         self.assertEqual(
             get_friendly_currency_amount(Decimal("9.99"), "eur"), "€9.99 EUR"
         )
+
+
+class TestLRUCache(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Touch "a" so that "b" becomes the least recently used entry
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(len(cache), 2)
+
+
+class TestCompression(TestCase):
+    def test_round_trip(self):
+        data = b'{"id": "evt_1"}' * 100
+        compressed = compress_bytes(data)
+        self.assertLess(len(compressed), len(data))
+        self.assertEqual(decompress_bytes(compressed), data)
+
+    def test_decompress_zlib(self):
+        # Data compressed before zstd became available must stay readable
+        self.assertEqual(decompress_bytes(zlib.compress(b"payload")), b"payload")
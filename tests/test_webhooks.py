@@ -5,21 +5,37 @@ dj-stripe Webhook Tests.
 import hashlib
 import hmac
 import json
+import os
+import tempfile
 import time
 import warnings
 from copy import deepcopy
+from datetime import timedelta
 from unittest.mock import patch
 from uuid import UUID
 
 import pytest
 from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
 from django.http.request import HttpHeaders
 from django.test import TestCase, override_settings
 from django.test.client import Client
 from django.urls import reverse
+from django.utils import timezone
+from stripe import convert_to_stripe_object
 
+from djstripe import metrics
+from djstripe.checks import check_webhook_enabled_events
+from djstripe.batching import GroupCommitBuffer
+from djstripe.dispatch import get_enabled_events
 from djstripe.models import Event, Transfer, WebhookEventTrigger
-from djstripe.models.webhooks import WebhookEndpoint, get_remote_ip
+from djstripe.models.webhooks import (
+    WebhookEndpoint,
+    _flush_triggers,
+    _processed_event_ids,
+    get_remote_ip,
+)
 from djstripe.settings import djstripe_settings
 
 from . import (
@@ -163,6 +179,55 @@ class TestWebhookEventTrigger(CreateAccountMixin, TestCase):
             id=FAKE_EVENT_TRANSFER_CREATED["id"],
         )
 
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    @patch(
+        "stripe.Event.retrieve",
+        return_value=deepcopy(FAKE_EVENT_TRANSFER_CREATED),
+        autospec=True,
+    )
+    def test_webhook_retrieve_event_cached(
+        self,
+        event_retrieve_mock,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        metrics.reset()
+        endpoint_key = str(self.webhook_endpoint.djstripe_uuid)
+        # Stripe returns a StripeObject, which isn't a dict
+        event_retrieve_mock.return_value = convert_to_stripe_object(
+            deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+        )
+
+        resp = self._send_event(
+            FAKE_EVENT_TRANSFER_CREATED, validation_method="retrieve_event"
+        )
+        self.assertEqual(resp.status_code, 200)
+        resp = self._send_event(
+            FAKE_EVENT_TRANSFER_CREATED, validation_method="retrieve_event"
+        )
+        self.assertEqual(resp.status_code, 200)
+
+        # A tampered re-delivery is still rejected
+        tampered_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+        tampered_event["data"]["object"]["amount"] += 1
+        resp = self._send_event(tampered_event, validation_method="retrieve_event")
+        self.assertEqual(resp.status_code, 400)
+
+        event_retrieve_mock.assert_called_once()
+        self.assertEqual(
+            metrics.get_count("webhook_validation_retrieves_avoided", endpoint_key), 2
+        )
+        self.assertEqual(WebhookEventTrigger.objects.filter(valid=True).count(), 2)
+
     @override_settings(
         DJSTRIPE_WEBHOOK_VALIDATION="verify_signature",
     )
@@ -586,6 +651,314 @@ class TestWebhookEventTrigger(CreateAccountMixin, TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(1, Event.objects.filter(type="transfer.created").count())
 
+    @override_settings(DJSTRIPE_WEBHOOK_DEDUPLICATE=True)
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_webhook_duplicate_delivery_short_circuit(
+        self,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        _processed_event_ids.clear()
+        metrics.reset()
+        fake_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+
+        resp = self._send_event(fake_event)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(WebhookEventTrigger.objects.count(), 1)
+        self.assertIn(fake_event["id"], _processed_event_ids)
+
+        # Redelivery is acknowledged without storing another trigger
+        with self.assertNumQueries(2):
+            # only the endpoint save in _send_event and the endpoint lookup
+            resp = self._send_event(fake_event)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(WebhookEventTrigger.objects.count(), 1)
+        self.assertEqual(transfer_retrieve_mock.call_count, 1)
+
+        # A cold process falls back to the indexed Event lookup
+        _processed_event_ids.clear()
+        resp = self._send_event(fake_event)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(WebhookEventTrigger.objects.count(), 1)
+
+        self.assertEqual(
+            metrics.get_count(
+                "webhook_duplicates_skipped",
+                key=str(self.webhook_endpoint.djstripe_uuid),
+            ),
+            2,
+        )
+
+    @override_settings(DJSTRIPE_WEBHOOK_DEDUPLICATE=True)
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_webhook_forged_duplicate_delivery(
+        self,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        _processed_event_ids.clear()
+        fake_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+        self.assertEqual(self._send_event(fake_event).status_code, 200)
+
+        # Same event id, but the signature doesn't verify
+        self.webhook_endpoint.secret = "whsec_XXXXX"
+        resp = self._send_event(fake_event, validation_method="verify_signature")
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(WebhookEventTrigger.objects.filter(valid=False).count(), 1)
+
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_webhook_compact_storage(
+        self,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        fake_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+        # Make sure the body is large enough to be compressed
+        fake_event["data"]["object"]["description"] = "x" * 2048
+
+        with override_settings(DJSTRIPE_WEBHOOK_STORAGE="compact"):
+            resp = self._send_event(fake_event)
+        self.assertEqual(resp.status_code, 200)
+
+        trigger = WebhookEventTrigger.objects.get()
+        self.assertEqual(trigger.body, "")
+        self.assertIsNotNone(trigger.compressed_body)
+        self.assertEqual(trigger.json_body, fake_event)
+        self.assertEqual(
+            {name.lower() for name in trigger.headers},
+            {"content-type", "stripe-signature"},
+        )
+
+        event = trigger.event
+        self.assertEqual(event.data, fake_event["data"])
+        self.assertNotIn("data", event.stripe_data)
+
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_compact_webhooks_command(
+        self,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        fake_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+        fake_event["data"]["object"]["description"] = "x" * 2048
+        resp = self._send_event(fake_event)
+        self.assertEqual(resp.status_code, 200)
+
+        trigger = WebhookEventTrigger.objects.get()
+        self.assertIsNone(trigger.compressed_body)
+        self.assertIn("data", trigger.event.stripe_data)
+
+        with override_settings(DJSTRIPE_WEBHOOK_STORAGE="compact"):
+            call_command("djstripe_compact_webhooks", batch_size=1, verbosity=0)
+
+        trigger.refresh_from_db()
+        self.assertEqual(trigger.body, "")
+        self.assertEqual(trigger.json_body, fake_event)
+        self.assertTrue(trigger.compacted)
+        event = Event.objects.get(id=fake_event["id"])
+        self.assertNotIn("data", event.stripe_data)
+        self.assertEqual(event.data, fake_event["data"])
+
+    def test_compact_webhooks_command_small_body(self):
+        trigger = WebhookEventTrigger.objects.create(
+            remote_ip="127.0.0.1", headers={"X-Other": "1"}, body="{}"
+        )
+
+        with override_settings(DJSTRIPE_WEBHOOK_STORAGE="compact"):
+            call_command("djstripe_compact_webhooks", verbosity=0)
+            trigger.refresh_from_db()
+            self.assertTrue(trigger.compacted)
+            self.assertEqual(trigger.body, "{}")
+            self.assertIsNone(trigger.compressed_body)
+            self.assertEqual(trigger.headers, {})
+
+            # Already compacted, so not read again
+            with self.assertNumQueries(2):
+                call_command("djstripe_compact_webhooks", verbosity=0)
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_PROCESSING_MODE="deferred",
+        DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS=0,
+    )
+    @patch.object(Transfer, "_attach_objects_post_save_hook")
+    @patch(
+        "stripe.Account.retrieve",
+        return_value=deepcopy(FAKE_STANDARD_ACCOUNT),
+        autospec=True,
+    )
+    @patch(
+        "stripe.Transfer.retrieve", return_value=deepcopy(FAKE_TRANSFER), autospec=True
+    )
+    def test_webhook_deferred_processing(
+        self,
+        transfer_retrieve_mock,
+        account_retrieve_mock,
+        transfer__attach_object_post_save_hook_mock,
+    ):
+        fake_event = deepcopy(FAKE_EVENT_TRANSFER_CREATED)
+
+        resp = self._send_event(fake_event)
+
+        # The trigger is stored and validated, but not processed yet
+        self.assertEqual(resp.status_code, 200)
+        trigger = WebhookEventTrigger.objects.get()
+        self.assertEqual(resp.content.decode(), str(trigger.id))
+        self.assertTrue(trigger.valid)
+        self.assertFalse(trigger.processed)
+        self.assertFalse(Event.objects.exists())
+        transfer_retrieve_mock.assert_not_called()
+
+        self.assertEqual(WebhookEventTrigger.process_pending(), (1, 0))
+
+        trigger.refresh_from_db()
+        self.assertTrue(trigger.processed)
+        self.assertEqual(trigger.event.id, fake_event["id"])
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 0))
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_PROCESSING_MODE="deferred",
+        DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS=0,
+    )
+    @patch.object(WebhookEventTrigger, "validate", autospec=True)
+    def test_webhook_deferred_validation_error_not_stored(self, validate_mock):
+        validate_mock.side_effect = KeyError("Test error")
+
+        with (
+            patch.object(
+                GroupCommitBuffer, "submit", side_effect=DatabaseError("Database down")
+            ),
+            self.assertLogs("djstripe", "ERROR"),
+            self.assertRaisesMessage(KeyError, "Test error"),
+        ):
+            self._send_event(deepcopy(FAKE_EVENT_TRANSFER_CREATED))
+
+    def test_flush_triggers_isolates_failures(self):
+        triggers = [
+            WebhookEventTrigger(remote_ip="127.0.0.1", headers={}),
+            WebhookEventTrigger(remote_ip=None, headers={}),
+            WebhookEventTrigger(remote_ip="127.0.0.2", headers={}),
+        ]
+
+        errors = _flush_triggers(triggers)
+
+        self.assertEqual(list(errors), [1])
+        self.assertEqual(
+            set(WebhookEventTrigger.objects.values_list("pk", flat=True)),
+            {triggers[0].pk, triggers[2].pk},
+        )
+
+    def test_flush_triggers_without_bulk_insert_returning(self):
+        triggers = [
+            WebhookEventTrigger(remote_ip="127.0.0.1", headers={}),
+            WebhookEventTrigger(remote_ip="127.0.0.2", headers={}),
+        ]
+
+        with patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ):
+            self.assertEqual(_flush_triggers(triggers), {})
+
+        # Saved one by one, so the view can answer with their ids
+        self.assertTrue(all(trigger.pk for trigger in triggers))
+        self.assertEqual(WebhookEventTrigger.objects.count(), 2)
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_PROCESSING_MODE="deferred",
+        DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS=0,
+    )
+    @patch.object(target=Event, attribute="invoke_webhook_handlers", autospec=True)
+    def test_webhook_deferred_processing_error(self, mock_invoke_webhook_handlers):
+        mock_invoke_webhook_handlers.side_effect = KeyError("Test error")
+
+        resp = self._send_event(deepcopy(FAKE_EVENT_TRANSFER_CREATED))
+        self.assertEqual(resp.status_code, 200)
+
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 1))
+        self.assertFalse(Event.objects.exists())
+
+        trigger = WebhookEventTrigger.objects.get()
+        self.assertFalse(trigger.processed)
+        self.assertEqual(trigger.exception, "'Test error'")
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_PROCESSING_MODE="deferred",
+        DJSTRIPE_WEBHOOK_BATCH_WINDOW_MS=0,
+        DJSTRIPE_WEBHOOK_MAX_ATTEMPTS=2,
+        DJSTRIPE_WEBHOOK_RETRY_BACKOFF=10,
+    )
+    @patch.object(target=Event, attribute="invoke_webhook_handlers", autospec=True)
+    def test_webhook_retries_and_dead_letters(self, mock_invoke_webhook_handlers):
+        mock_invoke_webhook_handlers.side_effect = KeyError("Test error")
+        self._send_event(deepcopy(FAKE_EVENT_TRANSFER_CREATED))
+
+        before = timezone.now()
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 1))
+        trigger = WebhookEventTrigger.objects.get()
+        self.assertEqual(trigger.attempt_count, 1)
+        self.assertGreaterEqual(trigger.next_attempt_at, before + timedelta(seconds=10))
+        self.assertIsNone(trigger.dead_lettered_at)
+
+        # Not due yet
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 0))
+
+        WebhookEventTrigger.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 1))
+        trigger.refresh_from_db()
+        self.assertEqual(trigger.attempt_count, 2)
+        self.assertIsNone(trigger.next_attempt_at)
+        self.assertIsNotNone(trigger.dead_lettered_at)
+
+        # Dead-lettered triggers are not retried
+        self.assertEqual(WebhookEventTrigger.process_pending(), (0, 0))
+
+        mock_invoke_webhook_handlers.side_effect = None
+        call_command(
+            "djstripe_process_webhooks", requeue_dead_letters=True, verbosity=0
+        )
+        trigger.refresh_from_db()
+        self.assertTrue(trigger.processed)
+        self.assertEqual(trigger.exception, "")
+        self.assertEqual(trigger.attempt_count, 1)
+        self.assertIsNone(trigger.next_attempt_at)
+        self.assertIsNone(trigger.dead_lettered_at)
+
     @patch.object(
         WebhookEventTrigger.validate, "__defaults__", (None, "whsec_XXXXX", 300, None)
     )
@@ -651,6 +1024,82 @@ class TestWebhookEventTrigger(CreateAccountMixin, TestCase):
         self.assertEqual(event_trigger.exception, "'Test error'")
 
 
+class TestPruneCommand(TestCase):
+    def _create_trigger(self, days_old, **kwargs):
+        trigger = WebhookEventTrigger.objects.create(
+            remote_ip="127.0.0.1", headers={}, body="{}", **kwargs
+        )
+        WebhookEventTrigger.objects.filter(pk=trigger.pk).update(
+            created=timezone.now() - timedelta(days=days_old)
+        )
+        return trigger
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS={"processed": 30, "failed": 90}
+    )
+    def test_prune_triggers_per_outcome(self):
+        old_processed = self._create_trigger(40, valid=True, processed=True)
+        recent_processed = self._create_trigger(10, valid=True, processed=True)
+        old_failed = self._create_trigger(100, valid=True, exception="KeyError")
+        recent_failed = self._create_trigger(40, valid=True, exception="KeyError")
+        old_invalid = self._create_trigger(100)
+
+        call_command("djstripe_prune", batch_size=1, verbosity=0)
+
+        self.assertCountEqual(
+            WebhookEventTrigger.objects.values_list("pk", flat=True),
+            [recent_processed.pk, recent_failed.pk, old_invalid.pk],
+        )
+        self.assertFalse(
+            WebhookEventTrigger.objects.filter(
+                pk__in=[old_processed.pk, old_failed.pk]
+            ).exists()
+        )
+
+    @override_settings(
+        DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS=30,
+        DJSTRIPE_WEBHOOK_PROCESSING_MODE="deferred",
+    )
+    def test_prune_keeps_pending_triggers(self):
+        pending = self._create_trigger(40, valid=True)
+        retrying = self._create_trigger(
+            40, valid=True, exception="KeyError", next_attempt_at=timezone.now()
+        )
+        self._create_trigger(
+            40, valid=True, exception="KeyError", dead_lettered_at=timezone.now()
+        )
+
+        call_command("djstripe_prune", verbosity=0)
+
+        self.assertCountEqual(
+            WebhookEventTrigger.objects.values_list("pk", flat=True),
+            [pending.pk, retrying.pk],
+        )
+
+    @override_settings(DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS=30)
+    def test_prune_dry_run(self):
+        self._create_trigger(40, valid=True, processed=True)
+
+        call_command("djstripe_prune", dry_run=True, verbosity=0)
+
+        self.assertEqual(WebhookEventTrigger.objects.count(), 1)
+
+    @override_settings(DJSTRIPE_WEBHOOK_EVENT_TRIGGER_RETENTION_DAYS=30)
+    def test_prune_archive(self):
+        trigger = self._create_trigger(40, valid=True, processed=True)
+
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command("djstripe_prune", archive_dir=archive_dir, verbosity=0)
+
+            (archive_name,) = os.listdir(archive_dir)
+            with open(os.path.join(archive_dir, archive_name)) as archive:
+                (row,) = [json.loads(line) for line in archive]
+
+        self.assertEqual(row["model"], "djstripe.webhookeventtrigger")
+        self.assertEqual(row["pk"], trigger.pk)
+        self.assertFalse(WebhookEventTrigger.objects.exists())
+
+
 class TestWebhookHandlers(TestCase):
     def test_webhook_event_trigger_invalid_body(self):
         trigger = WebhookEventTrigger(remote_ip="127.0.0.1", body="invalid json")
@@ -800,3 +1249,41 @@ class TestWebhookEndpoint(CreateAccountMixin):
             str(webhook_endpoint)
             == "https://dev.example.com/stripe/webhook/f6f9aa0e-cb6c-4e0f-b5ee-5e2b9e0716d8"
         )
+
+
+class TestUpdateWebhookEventsCommand(CreateAccountMixin, TestCase):
+    def setUp(self):
+        self.webhook_endpoint = WebhookEndpoint.sync_from_stripe_data(
+            deepcopy(FAKE_WEBHOOK_ENDPOINT_1)
+        )
+
+    @override_settings(DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled")
+    @patch("stripe.WebhookEndpoint.modify", autospec=True)
+    def test_update(self, modify_mock):
+        enabled_events = get_enabled_events()
+
+        self.assertEqual(
+            [m.id for m in check_webhook_enabled_events()], ["djstripe.W006"]
+        )
+
+        call_command("djstripe_update_webhook_events", verbosity=0)
+
+        modify_mock.assert_called_once()
+        self.assertEqual(modify_mock.call_args[0][0], self.webhook_endpoint.id)
+        self.assertEqual(modify_mock.call_args[1]["enabled_events"], enabled_events)
+        self.webhook_endpoint.refresh_from_db()
+        self.assertEqual(self.webhook_endpoint.enabled_events, enabled_events)
+        self.assertEqual(check_webhook_enabled_events(), [])
+
+        # Up to date endpoints are left alone
+        call_command("djstripe_update_webhook_events", verbosity=0)
+        modify_mock.assert_called_once()
+
+    @override_settings(DJSTRIPE_WEBHOOK_ENABLED_EVENTS="handled")
+    @patch("stripe.WebhookEndpoint.modify", autospec=True)
+    def test_dry_run(self, modify_mock):
+        call_command("djstripe_update_webhook_events", dry_run=True, verbosity=0)
+
+        modify_mock.assert_not_called()
+        self.webhook_endpoint.refresh_from_db()
+        self.assertEqual(self.webhook_endpoint.enabled_events, ["*"])